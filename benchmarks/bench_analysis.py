@@ -0,0 +1,70 @@
+"""
+Time analyze_data and save_to_db against the previous two-connection, two-scan analysis
+on a large synthetic DataFrame.
+
+Run from the repository root:
+    python -m benchmarks.bench_analysis --files 1000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, Tuple
+
+import pandas as pd
+
+from benchmarks.game_tree import synthetic_snapshot
+from hsr_size_analyzer.size_trie import build_size_trie
+from hsr_size_analyzer.sqlite import (analyze_data, create_proportion_query, execute_duckdb_query,
+                                      save_analysis_to_db, save_to_db)
+
+
+def legacy_analyze_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """One connection, registration and full scan per proportion table, as analyze_data used to do."""
+    file_ext_df = execute_duckdb_query(create_proportion_query('Extension'), df)
+    file_dir_df = execute_duckdb_query(create_proportion_query('Directory'), df)
+    return file_ext_df, file_dir_df
+
+
+def legacy_save_to_db(df: pd.DataFrame, db: str) -> None:
+    file_ext_df, file_dir_df = legacy_analyze_data(df)
+    save_analysis_to_db(df, file_ext_df, file_dir_df, db, {'HsrDirTree': build_size_trie(df).to_dataframe()})
+
+
+def best_time(function: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=1000000, help='number of rows in the synthetic DataFrame')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs, the best one is kept')
+    args = parser.parse_args()
+
+    df = synthetic_snapshot(args.files, seed=1)
+    df['Allocated Size'] = (df['Size'] + 4095) // 4096 * 4096
+
+    work_dir = tempfile.mkdtemp(dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    try:
+        db = os.path.join(work_dir, 'bench.db')
+        timings = {
+            'analyze_data before': best_time(lambda: legacy_analyze_data(df), args.repeat),
+            'analyze_data after': best_time(lambda: analyze_data(df), args.repeat),
+            'save_to_db before': best_time(lambda: legacy_save_to_db(df, db), args.repeat),
+            'save_to_db after': best_time(lambda: save_to_db(df, db), args.repeat),
+        }
+    finally:
+        shutil.rmtree(work_dir)
+
+    for label, seconds in timings.items():
+        print(f'{label:>20}: {seconds * 1000:9.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
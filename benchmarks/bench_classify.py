@@ -0,0 +1,35 @@
+"""
+Time classify_files with the shipped rules file on a large synthetic scan result.
+
+Run from the repository root:
+    python -m benchmarks.bench_classify --files 1000000
+"""
+import argparse
+import time
+
+from benchmarks.game_tree import synthetic_snapshot
+from hsr_size_analyzer.classify import classify_files, load_rules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=1000000, help='number of rows in the synthetic DataFrame')
+    parser.add_argument('--rules', default='classification_rules.json', help='path of the rules file')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs, the best one is kept')
+    args = parser.parse_args()
+
+    df = synthetic_snapshot(args.files, seed=1)
+    categorical_df = df.astype({'Extension': 'category', 'Directory': 'category'})
+    rules, default = load_rules(args.rules)
+
+    for name, frame in (('object columns', df), ('categorical columns', categorical_df)):
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            categories = classify_files(frame, rules, default)
+            best = min(best, time.perf_counter() - start)
+        print(f'{args.files} rows, {name}: {best * 1000:.1f} ms, {categories.nunique()} categories')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Compare the memory of the create_dataframe output with the compact categorical DataFrame
+on a synthetic in-memory scan result.
+
+Run from the repository root:
+    python -m benchmarks.bench_compact --files 1000000
+"""
+import argparse
+import gc
+import os
+import tracemalloc
+from array import array
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from hsr_size_analyzer.hsr_size_analyzer import create_compact_dataframe, create_dataframe
+
+EXTENSIONS = ['.block', '.pck', '.usm', '.bytes', '.json', '.dll', '.ress', '.bnk', '.wem', 'No extension']
+
+
+def synthetic_rows(files: int, files_per_dir: int = 500):
+    """Yield (directory, file name, extension, size) rows of an HSR-like install."""
+    directory = None
+    for i in range(files):
+        if i % files_per_dir == 0:
+            dir_index = i // files_per_dir
+            directory = os.path.join('StarRail_Data', 'StreamingAssets', f'Folder{dir_index % 40}',
+                                     f'Bundle{dir_index}')
+        extension = EXTENSIONS[i % len(EXTENSIONS)]
+        name = f'asset{i}' + ('' if extension == 'No extension' else extension)
+        yield directory, name, extension, (i * 7919) % (64 * 2 ** 20)
+
+
+def build_full(files: int) -> pd.DataFrame:
+    """Build the DataFrame the way collect_file_data and create_dataframe do."""
+    file_data: Dict[str, List[Any]] = {'Extension': [], 'Size': [], 'Directory': [], 'Full Path': [],
+                                       'Allocated Size': []}
+    for directory, name, extension, size in synthetic_rows(files):
+        file_data['Extension'].append(extension)
+        file_data['Size'].append(size)
+        file_data['Directory'].append(directory)
+        file_data['Full Path'].append(directory + os.sep + name)
+        file_data['Allocated Size'].append(size)
+    return create_dataframe(file_data)
+
+
+def build_compact(files: int) -> pd.DataFrame:
+    """Build the DataFrame the way collect_compact_file_data and create_compact_dataframe do."""
+    directories: List[str] = []
+    dir_ids, ext_codes, sizes = array('i'), array('i'), array('q')
+    names: List[str] = []
+    ext_lookup = {extension: code for code, extension in enumerate(EXTENSIONS)}
+    for directory, name, extension, size in synthetic_rows(files):
+        if not directories or directories[-1] != directory:
+            directories.append(directory)
+        dir_ids.append(len(directories) - 1)
+        ext_codes.append(ext_lookup[extension])
+        sizes.append(size)
+        names.append(name)
+    return create_compact_dataframe({
+        'directories': directories,
+        'extensions': EXTENSIONS,
+        'dir_ids': np.frombuffer(dir_ids, dtype=np.int32),
+        'ext_codes': np.frombuffer(ext_codes, dtype=np.int32),
+        'names': names,
+        'sizes': np.frombuffer(sizes, dtype=np.int64),
+        'allocated_sizes': np.frombuffer(sizes, dtype=np.int64).copy(),
+    })
+
+
+def measure(label: str, build: Callable[[int], pd.DataFrame], files: int) -> None:
+    """Print the traced memory held by the built DataFrame, the peak while building it, and pandas' estimate."""
+    gc.collect()
+    tracemalloc.start()
+    df = build(files)
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    deep = df.memory_usage(deep=True).sum()
+    print(f'{label:>16}: held {held / 2 ** 20:8.1f} MiB  peak {peak / 2 ** 20:8.1f} MiB  '
+          f'memory_usage(deep) {deep / 2 ** 20:8.1f} MiB')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=1000000, help='number of synthetic files')
+    args = parser.parse_args()
+
+    measure('create_dataframe', build_full, args.files)
+    measure('compact', build_compact, args.files)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Time diff_snapshots on two synthetic scan results that differ like a game patch.
+
+Run from the repository root:
+    python -m benchmarks.bench_diff --files 500000
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from benchmarks.game_tree import synthetic_snapshot
+from hsr_size_analyzer.diff import diff_snapshots
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=500000, help='number of files in each snapshot')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs, the best one is kept')
+    args = parser.parse_args()
+
+    old_df = synthetic_snapshot(args.files, seed=1)
+    # The patch rewrites 5% of the files, removes 1% and adds 1% new ones
+    new_df = old_df.copy()
+    changed = new_df.sample(frac=0.05, random_state=2).index
+    new_df.loc[changed, 'Size'] += 4096
+    new_df = new_df.drop(new_df.sample(frac=0.01, random_state=3).index)
+    added = synthetic_snapshot(args.files // 100, seed=4)
+    added['Full Path'] = 'patch' + os.sep + added['Full Path']
+    new_df = pd.concat([new_df, added], ignore_index=True)
+
+    best = float('inf')
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        file_diff_df, dir_diff_df, ext_diff_df = diff_snapshots(old_df, new_df)
+        best = min(best, time.perf_counter() - start)
+
+    print(f'{args.files} vs {len(new_df)} rows: {best * 1000:.1f} ms, '
+          f'{len(file_diff_df)} changed files, {len(dir_diff_df)} directories, {len(ext_diff_df)} extensions')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare the write time and the size on disk of the SQLite and the Parquet output of a scan.
+
+Run from the repository root:
+    python -m benchmarks.bench_parquet --files 100000 1000000
+
+Both outputs hold the raw table and every analysis table, save_to_db in one database file,
+save_to_parquet in one dataset per table.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, Tuple
+
+from benchmarks.game_tree import synthetic_snapshot
+from hsr_size_analyzer.parquet import save_to_parquet
+from hsr_size_analyzer.sqlite import save_to_db
+
+
+def disk_usage(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def best_time(function: Callable[[str], None], work_dir: str, name: str, repeat: int) -> Tuple[float, int]:
+    best, size = float('inf'), 0
+    for run in range(repeat):
+        # A fresh output per run, so every write starts from nothing
+        path = os.path.join(work_dir, f'{name}-{run}')
+        start = time.perf_counter()
+        function(path)
+        best = min(best, time.perf_counter() - start)
+        size = disk_usage(path)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    return best, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, nargs='+', default=[100000, 1000000],
+                        help='numbers of rows in the synthetic scan results')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs, the best one is kept')
+    parser.add_argument('--dir', default=None, help='directory for the output files (default: a temp directory)')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(dir=args.dir)
+    try:
+        for files in args.files:
+            df = synthetic_snapshot(files, seed=1)
+            df['Allocated Size'] = (df['Size'] + 4095) // 4096 * 4096
+            results = {
+                'SQLite (save_to_db)': best_time(lambda path: save_to_db(df, path), work_dir, 'sqlite', args.repeat),
+                'Parquet (save_to_parquet)':
+                    best_time(lambda path: save_to_parquet(df, path), work_dir, 'parquet', args.repeat),
+            }
+            print(f'{files} rows')
+            baseline_seconds, baseline_size = results['SQLite (save_to_db)']
+            for name, (seconds, size) in results.items():
+                print(f'  {name:<28} {seconds:8.3f} s  {baseline_seconds / seconds:5.2f}x  '
+                      f'{size / 2 ** 20:8.1f} MiB  {size / baseline_size:5.1%}')
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main()
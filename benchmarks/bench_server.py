@@ -0,0 +1,63 @@
+"""
+Measure the requests per second of the HTTP query service, with full responses and with 304 revalidations.
+
+Run from the repository root:
+    python -m benchmarks.bench_server --files 100000 --requests 5000
+
+The server runs in a child process and the client sends requests one after another on a keep-alive connection,
+as a polling dashboard does, so on one core the two processes share it.
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.game_tree import synthetic_snapshot
+from hsr_size_analyzer.server import create_server
+from hsr_size_analyzer.sqlite import save_to_db
+
+
+def run_server(db: str, ready: multiprocessing.Queue) -> None:
+    with create_server(db, port=0) as server:
+        ready.put(server.server_address)
+        server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=100000, help='number of rows in the synthetic scan result')
+    parser.add_argument('--requests', type=int, default=5000, help='requests per endpoint and mode')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db = os.path.join(work_dir, 'bench.db')
+        save_to_db(synthetic_snapshot(args.files, seed=1), db)
+
+        ready = multiprocessing.Queue()
+        process = multiprocessing.Process(target=run_server, args=(db, ready), daemon=True)
+        process.start()
+        conn = http.client.HTTPConnection(*ready.get(timeout=30))
+        try:
+            for path in ('/extensions', '/directories', '/top'):
+                conn.request('GET', path)
+                response = conn.getresponse()
+                body = response.read()
+                etag = response.getheader('ETag')
+                for mode, headers in (('200', {}), ('304', {'If-None-Match': etag})):
+                    start = time.perf_counter()
+                    for _ in range(args.requests):
+                        conn.request('GET', path, headers=headers)
+                        response = conn.getresponse()
+                        response.read()
+                    elapsed = time.perf_counter() - start
+                    print(f'{path:<13} {mode} ({len(body) if mode == "200" else 0:>8} bytes): '
+                          f'{args.requests / elapsed:8.0f} requests/s')
+        finally:
+            conn.close()
+            process.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Time writing the HsrSizeAnalysis table with write_to_sqlite against DataFrame.to_sql.
+
+Run from the repository root:
+    python -m benchmarks.bench_sqlite_writer --files 100000 1000000
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from typing import Callable
+
+import pandas as pd
+
+from benchmarks.game_tree import synthetic_snapshot
+from hsr_size_analyzer.sqlite import bulk_load, create_indexes, get_data_type, write_to_sqlite
+
+
+def to_sql_load(df: pd.DataFrame, db: str) -> None:
+    """The previous writer: DataFrame.to_sql with the default journal, which indexes the index column up front."""
+    with sqlite3.connect(db) as conn:
+        df.to_sql('HsrSizeAnalysis', con=conn, if_exists='replace', dtype=get_data_type())
+        create_indexes(conn, 'HsrSizeAnalysis', ['Extension', 'Directory'])
+    conn.close()
+
+
+def bulk_writer_load(df: pd.DataFrame, db: str, wal: bool) -> None:
+    with sqlite3.connect(db) as conn:
+        if wal:
+            with bulk_load(conn):
+                write_to_sqlite(conn, df, 'HsrSizeAnalysis', dtype=get_data_type())
+                create_indexes(conn, 'HsrSizeAnalysis', ['Extension', 'Directory'])
+        else:
+            write_to_sqlite(conn, df, 'HsrSizeAnalysis', dtype=get_data_type())
+            create_indexes(conn, 'HsrSizeAnalysis', ['Extension', 'Directory'])
+    conn.close()
+
+
+def best_time(function: Callable[[str], None], work_dir: str, repeat: int) -> float:
+    best = float('inf')
+    for run in range(repeat):
+        # A fresh file per run, so every load starts from an empty database
+        db = os.path.join(work_dir, f'bench-{run}.db')
+        start = time.perf_counter()
+        function(db)
+        best = min(best, time.perf_counter() - start)
+        os.remove(db)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, nargs='+', default=[100000, 1000000],
+                        help='numbers of rows in the synthetic DataFrames')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs, the best one is kept')
+    parser.add_argument('--dir', default=None, help='directory for the database files (default: a temp directory)')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(dir=args.dir)
+    try:
+        for files in args.files:
+            df = synthetic_snapshot(files, seed=1)
+            df['Allocated Size'] = (df['Size'] + 4095) // 4096 * 4096
+            timings = {
+                'DataFrame.to_sql': best_time(lambda db: to_sql_load(df, db), work_dir, args.repeat),
+                'write_to_sqlite': best_time(lambda db: bulk_writer_load(df, db, wal=False), work_dir, args.repeat),
+                'write_to_sqlite + WAL, synchronous=OFF':
+                    best_time(lambda db: bulk_writer_load(df, db, wal=True), work_dir, args.repeat),
+            }
+            print(f'{files} rows')
+            baseline = timings['DataFrame.to_sql']
+            for name, seconds in timings.items():
+                print(f'  {name:<40} {seconds:8.3f} s  {baseline / seconds:5.2f}x')
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Compare the peak Python memory of saving a scan in one DataFrame against streaming it in batches.
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming --files 100000 --batch-size 10000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from typing import Optional
+
+from benchmarks.bench_walk import make_tree
+from hsr_size_analyzer.hsr_size_analyzer import get_file_distribution
+from hsr_size_analyzer.sqlite import save_to_db
+
+
+def measure(tree: str, db: str, batch_size: Optional[int] = None) -> None:
+    """Scan the tree and save it to the database, printing wall time and peak traced memory."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    save_to_db(get_file_distribution(tree, batch_size=batch_size), db)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mode = 'single DataFrame' if batch_size is None else f'batches of {batch_size}'
+    print(f'{mode:>20}: {elapsed * 1000:9.1f} ms  peak {peak / 2 ** 20:8.1f} MiB')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=50000, help='number of files in the synthetic tree')
+    parser.add_argument('--batch-size', type=int, default=5000, help='files per streamed batch')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    try:
+        tree = os.path.join(work_dir, 'game')
+        make_tree(tree, args.files)
+        measure(tree, os.path.join(work_dir, 'full.db'))
+        measure(tree, os.path.join(work_dir, 'batches.db'), args.batch_size)
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main()
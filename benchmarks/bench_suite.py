@@ -0,0 +1,213 @@
+"""
+Time each stage of a run (scan, DataFrame build, analysis, SQLite write) on synthetic game trees of several sizes,
+and store the results as JSON so runs can be compared over time.
+
+Run from the repository root:
+    python -m benchmarks.bench_suite --files 10000 100000 1000000
+    python -m benchmarks.bench_suite --files 1000000 --dir /tmp
+    python -m benchmarks.bench_suite --files 10000 --compare benchmark_results/<earlier run>.json
+
+For every stage the suite reports wall and CPU time, files per second, the peak RSS reached during the stage,
+the read and write syscalls from /proc/self/io and the directory listings seen by the os.scandir audit event.
+Peak RSS is reset before each stage through /proc/self/clear_refs where Linux allows it, otherwise
+it is the peak of the whole process so far.
+
+The trees go to /dev/shm by default. A tmpfs limits its number of inodes, by default to about one per 8 KiB
+of RAM, so trees of a million files may need --dir pointing to a disk.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from benchmarks.game_tree import generate_game_tree
+from hsr_size_analyzer.hsr_size_analyzer import collect_file_data, create_dataframe
+from hsr_size_analyzer.sqlite import analyze_data, save_analysis_to_db
+
+# Directory listings seen by the audit hook while it is active
+scandir_calls = 0
+counting = False
+
+
+def audit_hook(event: str, _args: Any) -> None:
+    global scandir_calls
+    if counting and event == 'os.scandir':
+        scandir_calls += 1
+
+
+def read_proc_counters() -> Dict[str, int]:
+    """Read the syscall counters of this process, empty where /proc/self/io does not exist."""
+    try:
+        with open('/proc/self/io') as f:
+            fields = dict(line.split(':') for line in f)
+    except OSError:
+        return {}
+    return {name: int(fields[name]) for name in ('syscr', 'syscw')}
+
+
+def reset_peak_rss() -> bool:
+    """Reset the peak RSS of this process, returning False when the kernel does not allow it."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_kib() -> int:
+    """Peak RSS of this process in KiB, from /proc/self/status or getrusage."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # getrusage reports bytes on macOS and KiB elsewhere
+    return max_rss // 1024 if sys.platform == 'darwin' else max_rss
+
+
+def measure(stage: Callable[[], Any], files: int) -> Dict[str, Any]:
+    """Run one stage and measure its wall time, CPU time, peak RSS and syscalls."""
+    global counting, scandir_calls
+    peak_reset = reset_peak_rss()
+    counters_before = read_proc_counters()
+    scandir_calls = 0
+    counting = True
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        result = stage()
+    finally:
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        counting = False
+    counters_after = read_proc_counters()
+
+    metrics = {
+        'wall_s': round(wall, 4),
+        'cpu_s': round(cpu, 4),
+        'files_per_s': round(files / wall) if wall else None,
+        'peak_rss_kib': peak_rss_kib(),
+        'peak_rss_is_per_stage': peak_reset,
+        'scandir_calls': scandir_calls,
+        **{name: counters_after[name] - counters_before[name] for name in counters_after},
+    }
+    return {'metrics': metrics, 'result': result}
+
+
+def run_tier(files: int, work_dir: str, tree_options: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate a tree of the given size and measure every stage on it."""
+    tree = os.path.join(work_dir, f'tree-{files}')
+    db = os.path.join(work_dir, f'bench-{files}.db')
+    start = time.perf_counter()
+    total_size = generate_game_tree(tree, files, **tree_options)
+    generate_s = time.perf_counter() - start
+
+    try:
+        stages = {}
+        collected = measure(lambda: collect_file_data(tree), files)
+        stages['collect_file_data'] = collected['metrics']
+        built = measure(lambda: create_dataframe(collected.pop('result')), files)
+        stages['create_dataframe'] = built['metrics']
+        df = built.pop('result')
+        analyzed = measure(lambda: analyze_data(df), files)
+        stages['analyze_data'] = analyzed['metrics']
+        file_ext_df, file_dir_df = analyzed.pop('result')
+        stages['save_analysis_to_db'] = measure(
+            lambda: save_analysis_to_db(df, file_ext_df, file_dir_df, db), files)['metrics']
+    finally:
+        shutil.rmtree(tree)
+        if os.path.exists(db):
+            os.remove(db)
+
+    return {'files': files, 'total_size': total_size, 'generate_s': round(generate_s, 2), 'stages': stages}
+
+
+def get_git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]) -> None:
+    """Print the wall time of every stage next to the same stage of a previous run."""
+    previous_tiers = {tier['files']: tier for tier in previous['tiers']}
+    print(f"Compared with {previous.get('commit') or 'unknown commit'} from {previous.get('timestamp')}:")
+    for tier in current['tiers']:
+        previous_tier = previous_tiers.get(tier['files'])
+        if previous_tier is None:
+            continue
+        for stage, metrics in tier['stages'].items():
+            previous_metrics = previous_tier['stages'].get(stage)
+            if previous_metrics:
+                ratio = previous_metrics['wall_s'] / metrics['wall_s'] if metrics['wall_s'] else float('nan')
+                print(f"  {tier['files']:>8} files  {stage:<20} {previous_metrics['wall_s']:8.3f} s -> "
+                      f"{metrics['wall_s']:8.3f} s  {ratio:5.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='numbers of files in the synthetic trees')
+    parser.add_argument('--depth', type=int, default=2, help='levels of subdirectories under each asset directory')
+    parser.add_argument('--files-per-dir', type=int, default=200, help='average number of files per directory')
+    parser.add_argument('--size-sigma', type=float, default=1.5, help='sigma of the log-normal file sizes')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the tree generator')
+    parser.add_argument('--dir', default='/dev/shm' if os.path.isdir('/dev/shm') else None,
+                        help='directory to create the trees in (default: /dev/shm when it exists)')
+    parser.add_argument('--output', help='JSON file for the results (default: benchmark_results/<timestamp>.json)')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    args = parser.parse_args()
+
+    sys.addaudithook(audit_hook)
+    timestamp = datetime.now(timezone.utc)
+    tree_options = {'depth': args.depth, 'files_per_dir': args.files_per_dir, 'size_sigma': args.size_sigma,
+                    'seed': args.seed}
+    results = {
+        'timestamp': timestamp.isoformat(timespec='seconds'),
+        'commit': get_git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'tree_options': tree_options,
+        'tiers': [],
+    }
+
+    work_dir = tempfile.mkdtemp(dir=args.dir)
+    try:
+        for files in args.files:
+            tier = run_tier(files, work_dir, tree_options)
+            results['tiers'].append(tier)
+            print(f"{files} files ({tier['total_size'] / 2 ** 30:.1f} GiB apparent, generated in "
+                  f"{tier['generate_s']:.1f} s)")
+            for stage, metrics in tier['stages'].items():
+                print(f"  {stage:<20} {metrics['wall_s']:8.3f} s  {metrics['files_per_s'] or 0:>10} files/s  "
+                      f"peak RSS {metrics['peak_rss_kib'] / 1024:7.1f} MiB  syscr {metrics.get('syscr', '-')}  "
+                      f"syscw {metrics.get('syscw', '-')}  scandir {metrics['scandir_calls']}")
+    finally:
+        shutil.rmtree(work_dir)
+
+    output = args.output or os.path.join('benchmark_results', timestamp.strftime('%Y%m%dT%H%M%SZ') + '.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results written to {output}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
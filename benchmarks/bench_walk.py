@@ -0,0 +1,143 @@
+"""
+Compare the os.walk based file scan with the os.scandir walker used by collect_file_data,
+serially and on 8 threads.
+
+Run from the repository root:
+    python -m benchmarks.bench_walk --files 50000
+
+Syscalls are counted with strace when it is installed. Otherwise the script counts the calls made
+from Python: directory listings through the os.scandir audit event, explicit os.stat calls
+(os.path.getsize goes through os.stat) and DirEntry.stat calls, one per file for the walker.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from hsr_size_analyzer.hsr_size_analyzer import append_file_info, collect_file_data, get_file_info
+
+
+def legacy_collect_file_data(directory: str) -> Dict[str, List[Any]]:
+    """The os.walk + os.path.getsize + os.path.relpath implementation collect_file_data replaced."""
+    file_data: Dict[str, List[Any]] = {'Extension': [], 'Size': [], 'Directory': [], 'Full Path': []}
+    for root, _, files in os.walk(directory):
+        for file in files:
+            append_file_info(file_data, get_file_info(root, file, directory))
+    return file_data
+
+
+SCANNERS = {
+    'os.walk': legacy_collect_file_data,
+    'scandir': collect_file_data,
+    'parallel': lambda directory: collect_file_data(directory, max_workers=8),
+}
+
+
+def make_tree(directory: str, files: int, files_per_dir: int = 200) -> None:
+    """Create a synthetic tree of small files, a few levels deep."""
+    for i in range(files):
+        dir_index = i // files_per_dir
+        sub_dir = os.path.join(directory, f'group{dir_index % 10}', f'bundle{dir_index}')
+        if i % files_per_dir == 0:
+            os.makedirs(sub_dir, exist_ok=True)
+        with open(os.path.join(sub_dir, f'asset{i}.block'), 'wb') as f:
+            f.write(b'x' * (i % 4096))
+
+
+def count_python_calls(scanner: str, directory: str) -> Dict[str, int]:
+    """Count the directory listings and stat calls issued from Python by one scan."""
+    counts = {'scandir': 0, 'os.stat': 0, 'DirEntry.stat': 0}
+    active = True
+
+    def audit_hook(event: str, _args: Any) -> None:
+        if active and event == 'os.scandir':
+            counts['scandir'] += 1
+
+    original_stat = os.stat
+
+    def counting_stat(*args: Any, **kwargs: Any) -> os.stat_result:
+        counts['os.stat'] += 1
+        return original_stat(*args, **kwargs)
+
+    sys.addaudithook(audit_hook)
+    os.stat = counting_stat
+    try:
+        file_data = SCANNERS[scanner](directory)
+    finally:
+        os.stat = original_stat
+        # Audit hooks cannot be removed, so switch this one off instead
+        active = False
+
+    if scanner != 'os.walk':
+        counts['DirEntry.stat'] = len(file_data['Size'])
+    return counts
+
+
+def count_strace_calls(scanner: str, directory: str) -> Dict[str, int]:
+    """Count the syscalls issued by one scan in a child process traced by strace."""
+    with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+        output_path = f.name
+    try:
+        subprocess.run(
+            ['strace', '-f', '-c', '-o', output_path, sys.executable, '-m', 'benchmarks.bench_walk',
+             '--scan-only', scanner, '--directory', directory],
+            check=True)
+        counts = {}
+        with open(output_path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 5 and parts[3].isdigit():
+                    counts[parts[-1]] = int(parts[3])
+        return {name: calls for name, calls in counts.items()
+                if 'stat' in name or name in ('getdents64', 'openat', 'total')}
+    finally:
+        os.remove(output_path)
+
+
+def time_scanner(scanner: str, directory: str, repeat: int) -> float:
+    """Return the best wall time in seconds over the given number of runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        SCANNERS[scanner](directory)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=20000, help='number of files in the synthetic tree')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per scanner, the best one is kept')
+    parser.add_argument('--directory', help='scan an existing directory instead of a synthetic tree')
+    parser.add_argument('--scan-only', choices=SCANNERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scan_only:
+        SCANNERS[args.scan_only](args.directory)
+        return
+
+    tree = args.directory or tempfile.mkdtemp(dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    try:
+        if not args.directory:
+            make_tree(tree, args.files)
+
+        use_strace = shutil.which('strace') is not None
+        timings = {}
+        for scanner in SCANNERS:
+            timings[scanner] = time_scanner(scanner, tree, args.repeat)
+            calls = count_strace_calls(scanner, tree) if use_strace else count_python_calls(scanner, tree)
+            print(f'{scanner:>8}: {timings[scanner] * 1000:9.1f} ms  calls: {calls}')
+
+        for scanner in ('scandir', 'parallel'):
+            print(f'{scanner} speedup over os.walk: {timings["os.walk"] / timings[scanner]:.2f}x')
+    finally:
+        if not args.directory:
+            shutil.rmtree(tree)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Deterministic generators of synthetic trees laid out like a Honkai Star Rail install, and of scan results.
+
+Files are created sparse with os.ftruncate, so their sizes follow a realistic distribution
+without using the space, and the tree is best written to a tmpfs such as /dev/shm.
+
+Run from the repository root to create a tree:
+    python -m benchmarks.game_tree /dev/shm/hsr-tree --files 100000
+"""
+import argparse
+import math
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Share of the files per extension, and the directory and median size of those files
+EXTENSION_MIX = {
+    '.block': 0.55,
+    '.bytes': 0.15,
+    '.pck': 0.08,
+    '.wem': 0.06,
+    '.json': 0.05,
+    '.ress': 0.05,
+    '.usm': 0.03,
+    '.dll': 0.02,
+    '.exe': 0.01,
+}
+EXTENSION_AREAS = {
+    '.block': os.path.join('StarRail_Data', 'StreamingAssets', 'Asb', 'Windows'),
+    '.bytes': os.path.join('StarRail_Data', 'StreamingAssets', 'DesignData', 'Windows'),
+    '.pck': os.path.join('StarRail_Data', 'StreamingAssets', 'Audio', 'AudioPackage', 'Windows'),
+    '.wem': os.path.join('StarRail_Data', 'StreamingAssets', 'Audio', 'AudioPackage', 'Windows'),
+    '.json': os.path.join('StarRail_Data', 'StreamingAssets'),
+    '.ress': os.path.join('StarRail_Data'),
+    '.usm': os.path.join('StarRail_Data', 'StreamingAssets', 'Video', 'Windows'),
+    '.dll': '',
+    '.exe': '',
+}
+MEDIAN_SIZES = {
+    '.block': 256 * 1024,
+    '.bytes': 16 * 1024,
+    '.pck': 20 * 1024 * 1024,
+    '.wem': 512 * 1024,
+    '.json': 2 * 1024,
+    '.ress': 4 * 1024 * 1024,
+    '.usm': 50 * 1024 * 1024,
+    '.dll': 8 * 1024 * 1024,
+    '.exe': 1024 * 1024,
+}
+LANGUAGES = ('Chinese(PRC)', 'English(US)', 'Japanese', 'Korean')
+# Share of the files that also have a patched copy in the Persistent directory
+PERSISTENT_SHARE = 0.1
+# Extensions of the synthetic scan results, assigned to the files in turn
+SNAPSHOT_EXTENSIONS = np.array(['.block', '.pck', '.usm', '.bytes', '.json', '.dll', '.ress', '.bnk', '.wem'])
+
+
+def generate_game_tree(directory: str, files: int, depth: int = 2, files_per_dir: int = 200,
+                       size_sigma: float = 1.5, extension_mix: Optional[Dict[str, float]] = None,
+                       seed: int = 0) -> int:
+    """
+    Create a synthetic game tree. The same arguments always create the same tree.
+
+    :param directory: Directory to create the tree in. It is created if needed.
+    :param files: Number of files to create.
+    :param depth: Levels of numbered subdirectories under each asset directory.
+    :param files_per_dir: Average number of files per leaf directory.
+    :param size_sigma: Sigma of the log-normal size distribution around each extension's median size.
+    :param extension_mix: Share of the files per extension, from the keys of EXTENSION_MIX (default EXTENSION_MIX).
+    :param seed: Seed of the random generator.
+    :return: Total apparent size of the created files in bytes
+    """
+    extension_mix = extension_mix or EXTENSION_MIX
+    rng = np.random.default_rng(seed)
+    extensions = list(extension_mix)
+    weights = np.array([extension_mix[extension] for extension in extensions], dtype=float)
+    file_extensions = rng.choice(len(extensions), size=files, p=weights / weights.sum())
+    medians = np.array([MEDIAN_SIZES[extension] for extension in extensions], dtype=float)
+    sizes = np.maximum(rng.lognormal(np.log(medians[file_extensions]), size_sigma), 1).astype(np.int64)
+    persistent = rng.random(files) < PERSISTENT_SHARE
+
+    total_size = 0
+    created = set()
+    counters = dict.fromkeys(extensions, 0)
+    for file_index in range(files):
+        extension = extensions[file_extensions[file_index]]
+        number = counters[extension]
+        counters[extension] += 1
+
+        area = EXTENSION_AREAS[extension]
+        if extension in ('.pck', '.wem'):
+            area = os.path.join(area, LANGUAGES[number % len(LANGUAGES)])
+        if persistent[file_index] and area:
+            area = area.replace('StreamingAssets', 'Persistent', 1)
+
+        # Number the leaf directories so each holds about files_per_dir files, spread over depth levels
+        leaf = number // files_per_dir
+        fanout = max(2, math.ceil((files / files_per_dir + 1) ** (1 / depth))) if depth else 1
+        parts = [f'{leaf // fanout ** level % fanout:02x}' for level in reversed(range(depth))]
+        sub_dir = os.path.join(directory, area, *parts)
+        if sub_dir not in created:
+            os.makedirs(sub_dir, exist_ok=True)
+            created.add(sub_dir)
+
+        fd = os.open(os.path.join(sub_dir, f'{number:08x}{extension}'), os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        try:
+            os.ftruncate(fd, int(sizes[file_index]))
+        finally:
+            os.close(fd)
+        total_size += int(sizes[file_index])
+    return total_size
+
+
+def synthetic_snapshot(files: int, seed: int) -> pd.DataFrame:
+    """Build a scan result with files spread over 1000 directories, without creating the files."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(files)
+    directories = pd.Series(ids // 500).map(lambda d: os.path.join('StreamingAssets', f'Bundle{d}'))
+    extensions = SNAPSHOT_EXTENSIONS[ids % len(SNAPSHOT_EXTENSIONS)]
+    return pd.DataFrame({
+        'Extension': extensions,
+        'Size': rng.integers(1, 64 * 2 ** 20, files),
+        'Directory': directories,
+        'Full Path': directories + os.sep + pd.Series(ids).astype(str) + extensions,
+    })
+
+
+def parse_extension_mix(value: str) -> Dict[str, float]:
+    """Parse an extension mix given as .block=0.6,.pck=0.4 on the command line."""
+    extension_mix = {}
+    for item in value.split(','):
+        extension, _, share = item.partition('=')
+        if extension not in MEDIAN_SIZES:
+            raise argparse.ArgumentTypeError(f'unknown extension {extension}, choose from {", ".join(MEDIAN_SIZES)}')
+        extension_mix[extension] = float(share)
+    return extension_mix
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('directory', help='directory to create the tree in')
+    parser.add_argument('--files', type=int, default=100000, help='number of files')
+    parser.add_argument('--depth', type=int, default=2, help='levels of subdirectories under each asset directory')
+    parser.add_argument('--files-per-dir', type=int, default=200, help='average number of files per directory')
+    parser.add_argument('--size-sigma', type=float, default=1.5, help='sigma of the log-normal file sizes')
+    parser.add_argument('--extensions', type=parse_extension_mix, default=None,
+                        help='share of the files per extension, e.g. .block=0.6,.pck=0.4')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random generator')
+    args = parser.parse_args()
+
+    total_size = generate_game_tree(args.directory, args.files, args.depth, args.files_per_dir, args.size_sigma,
+                                    args.extensions, args.seed)
+    print(f'Created {args.files} files, {total_size / 2 ** 30:.1f} GiB apparent size, in {args.directory}')
+
+
+if __name__ == '__main__':
+    main()
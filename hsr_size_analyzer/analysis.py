@@ -0,0 +1,300 @@
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import duckdb
+import pandas as pd
+
+# Dimensions the aggregate query can group by. Directory Prefix is the Directory cut to the first depth components.
+DIMENSIONS = {
+    'Extension': '"Extension"',
+    'Directory': '"Directory"',
+    'Install': '"Install"',
+    'Directory Prefix': ("CASE WHEN \"Directory\" = 'Root Directory' THEN \"Directory\" "
+                         "ELSE array_to_string(list_slice(string_split(\"Directory\", $2), 1, $1), $2) END"),
+}
+
+# Measures the aggregate query can compute, with the name of their result column
+MEASURES = {
+    'sum': ('CAST(SUM(COALESCE(Size, 0)) AS BIGINT)', 'Total Size'),
+    'count': ('COUNT(*)', 'File Count'),
+    'proportion': ('SUM(COALESCE(Size, 0)) / CAST(SUM(SUM(COALESCE(Size, 0))) {over} AS DOUBLE) * 100',
+                   'Proportion'),
+    'min': ('MIN(Size)', 'Min Size'),
+    'max': ('MAX(Size)', 'Max Size'),
+    'median': ('MEDIAN(Size)', 'Median Size'),
+}
+
+
+def quote(column: str) -> str:
+    """
+    Quote a column name for DuckDB.
+
+    :param column: Column name, which may contain spaces.
+    :return: The double-quoted column name
+    """
+    return '"' + column.replace('"', '""') + '"'
+
+
+def get_grouping_id(dimensions: Sequence[str], dimension: str) -> int:
+    """
+    :param dimensions: Dimensions of a GROUPING SETS query, each in its own grouping set.
+    :param dimension: One of the dimensions.
+    :return: Value of GROUPING() over all dimensions in the rows of that dimension's grouping set
+    """
+    # GROUPING() sets the bit of every dimension that is aggregated away, the first dimension is the highest bit
+    all_bits = (1 << len(dimensions)) - 1
+    return all_bits & ~(1 << (len(dimensions) - 1 - list(dimensions).index(dimension)))
+
+
+def create_grouping_sets_query(dimensions: Sequence[str], allocated: bool = False,
+                               partition_column: Optional[str] = None) -> str:
+    """
+    Create one query computing the size proportion of every value of each dimension.
+    All dimensions are grouped in a single GROUPING SETS pass over the data. Each proportion is taken
+    against the total of its own grouping set, which a window over the aggregated rows provides.
+
+    :param dimensions: Columns to group by, each in its own grouping set.
+    :param allocated: Also compute the proportion of the Allocated Size column.
+    :param partition_column: Column kept in every grouping set, proportions are then taken within each of its values.
+    :return: SQL query over the registered df view with a grouping_id column telling the grouping sets apart
+    """
+    dimension_list = ', '.join(quote(dimension) for dimension in dimensions)
+    prefix = f'{quote(partition_column)}, ' if partition_column else ''
+    grouping_sets = ', '.join(f'({prefix}{quote(dimension)})' for dimension in dimensions)
+    over = f'OVER (PARTITION BY GROUPING({dimension_list}){", " + quote(partition_column) if partition_column else ""})'
+
+    select_columns = [f'{prefix}{dimension_list}', f'GROUPING({dimension_list}) AS grouping_id',
+                      f'SUM(COALESCE(Size, 0)) / CAST(SUM(SUM(COALESCE(Size, 0))) {over} AS DOUBLE) * 100 '
+                      f'AS Proportion']
+    if allocated:
+        select_columns.append(f'SUM(COALESCE("Allocated Size", 0)) / '
+                              f'CAST(SUM(SUM(COALESCE("Allocated Size", 0))) {over} AS DOUBLE) * 100 '
+                              f'AS "Allocated Proportion"')
+    select = ',\n        '.join(select_columns)
+
+    return f'''
+    SELECT
+        {select}
+    FROM
+        df
+    GROUP BY GROUPING SETS ({grouping_sets});
+    '''
+
+
+def create_aggregate_query(dimensions: Sequence[str], measures: Sequence[str]) -> str:
+    """
+    Create a parameterized aggregate query for any combination of dimensions and measures.
+    Only the names in DIMENSIONS and MEASURES are accepted, so no user value is interpolated into the SQL.
+    The Directory Prefix dimension takes the depth as $1 and the path separator as $2.
+    Proportions are taken within each install when Install is one of the dimensions.
+
+    :param dimensions: Names from DIMENSIONS to group by, may be empty for a grand total.
+    :param measures: Names from MEASURES to compute.
+    :return: SQL query over the registered df view
+    """
+    if not measures or any(name not in MEASURES for name in measures) \
+            or any(name not in DIMENSIONS for name in dimensions):
+        raise ValueError(f"Unsupported dimensions {list(dimensions)} or measures {list(measures)}")
+
+    over = 'OVER (PARTITION BY "Install")' if 'Install' in dimensions else 'OVER ()'
+    select_columns = [f'{DIMENSIONS[dimension]} AS {quote(dimension)}' for dimension in dimensions]
+    select_columns += [f'{MEASURES[measure][0].format(over=over)} AS {quote(MEASURES[measure][1])}'
+                       for measure in measures]
+    select = ',\n        '.join(select_columns)
+    positions = ', '.join(str(position) for position in range(1, len(dimensions) + 1))
+    group_by = f"\n    GROUP BY {positions}" if dimensions else ''
+
+    return f'''
+    SELECT
+        {select}
+    FROM
+        df{group_by};
+    '''
+
+
+def create_size_histogram_query(dimensions: Sequence[str], partition_column: Optional[str] = None) -> str:
+    """
+    Create one query computing a log2 size histogram and the p50, p90 and p99 sizes of every value of each dimension.
+    Bucket k holds the files of 2^k up to 2^(k+1) - 1 bytes, bucket -1 the empty files.
+    Every dimension is one grouping set of a single GROUPING SETS pass. The histogram of each group is collected
+    as a map from bucket to file count and unnested afterwards, so the quantiles are computed in the same pass.
+
+    :param dimensions: Columns to group by, each in its own grouping set.
+    :param partition_column: Column kept in every grouping set, e.g. Install.
+    :return: SQL query over the registered df view, with one row per group and non-empty bucket
+    """
+    dimension_list = ', '.join(quote(dimension) for dimension in dimensions)
+    prefix = f'{quote(partition_column)}, ' if partition_column else ''
+    grouping_sets = ', '.join(f'({prefix}{quote(dimension)})' for dimension in dimensions)
+    dimension_cases = ' '.join(f"WHEN {get_grouping_id(dimensions, dimension)} THEN '{dimension}'"
+                               for dimension in dimensions)
+    value_cases = ' '.join(f"WHEN {get_grouping_id(dimensions, dimension)} THEN CAST({quote(dimension)} AS VARCHAR)"
+                           for dimension in dimensions)
+
+    return f'''
+    WITH Bucketed AS (
+        SELECT
+            {prefix}{dimension_list},
+            Size,
+            -- log2 of sizes close below a power of two rounds up to it, the shift puts those back
+            CASE WHEN Size > 0 THEN
+                CAST(floor(log2(Size)) AS INTEGER)
+                - CAST((CAST(1 AS BIGINT) << CAST(floor(log2(Size)) AS INTEGER)) > Size AS INTEGER)
+            ELSE -1 END AS Bucket
+        FROM
+            df
+    ), Grouped AS (
+        SELECT
+            {prefix}GROUPING({dimension_list}) AS grouping_id,
+            CASE GROUPING({dimension_list}) {value_cases} END AS Value,
+            histogram(Bucket) AS Buckets,
+            quantile_cont(Size, [0.5, 0.9, 0.99]) AS Quantiles
+        FROM
+            Bucketed
+        GROUP BY GROUPING SETS ({grouping_sets})
+    ), Unnested AS (
+        SELECT
+            {prefix}grouping_id,
+            Value,
+            unnest(map_keys(Buckets)) AS Bucket,
+            unnest(map_values(Buckets)) AS "File Count",
+            Quantiles
+        FROM
+            Grouped
+    )
+    SELECT
+        {prefix}CASE grouping_id {dimension_cases} END AS Dimension,
+        Value,
+        Bucket,
+        CASE WHEN Bucket < 0 THEN 0 ELSE CAST(1 AS BIGINT) << Bucket END AS "Min Size",
+        CASE WHEN Bucket < 0 THEN 0 ELSE (CAST(1 AS BIGINT) << Bucket) * 2 - 1 END AS "Max Size",
+        CAST("File Count" AS BIGINT) AS "File Count",
+        Quantiles[1] AS "P50 Size",
+        Quantiles[2] AS "P90 Size",
+        Quantiles[3] AS "P99 Size"
+    FROM
+        Unnested
+    ORDER BY
+        {prefix}grouping_id DESC, Value, Bucket;
+    '''
+
+
+class AnalysisSession:
+    """
+    One DuckDB connection with the scan result registered once, shared by every analysis query.
+    """
+
+    def __init__(self, df: pd.DataFrame, copy: bool = False) -> None:
+        """
+        :param df: DataFrame from get_file_distribution to analyze.
+        :param copy: Copy the data into a DuckDB table instead of reading the DataFrame in place,
+                    so that replace() can swap the data of a long-lived session.
+        """
+        self.columns = list(df.columns)
+        self.copy = copy
+        self.con = duckdb.connect(':memory:')
+        if copy:
+            self.replace(df)
+        else:
+            self.con.register('df', df)
+        # Prepared statement name for each (dimensions, measures) shape
+        self.prepared: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], str] = {}
+
+    def __enter__(self) -> 'AnalysisSession':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the DuckDB connection.
+
+        :return: None
+        """
+        self.con.close()
+
+    def replace(self, df: pd.DataFrame) -> None:
+        """
+        Replace the analyzed data of a session created with copy=True, keeping its prepared statements.
+        They are bound again to the new table, while a statement prepared on a registered DataFrame
+        would keep reading the DataFrame it was prepared on.
+
+        :param df: DataFrame from get_file_distribution to analyze from now on.
+        :return: None
+        """
+        if not self.copy:
+            raise ValueError("Only the data of a session created with copy=True can be replaced")
+        self.columns = list(df.columns)
+        self.con.register('replacement', df)
+        self.con.execute('CREATE OR REPLACE TEMP TABLE df AS SELECT * FROM replacement')
+        self.con.unregister('replacement')
+
+    def query(self, query: str) -> pd.DataFrame:
+        """
+        Run a query against the registered df view.
+
+        :param query: The SQL query to be executed.
+        :return: DataFrame containing the result after executing the query.
+        """
+        return self.con.execute(query).fetchdf()
+
+    def proportions(self, dimensions: Sequence[str]) -> Dict[str, pd.DataFrame]:
+        """
+        Calculate the size proportion of every value of each dimension in one scan of the data.
+        Allocated Size proportions are included when the data has that column,
+        and proportions are taken within each install when it has an Install column.
+
+        :param dimensions: Columns to group by, e.g. ['Extension', 'Directory'].
+        :return: Dictionary mapping each dimension to a DataFrame with the dimension
+                (after Install, if present) and the proportion columns
+        """
+        allocated = 'Allocated Size' in self.columns
+        partition_column = 'Install' if 'Install' in self.columns else None
+        result = self.query(create_grouping_sets_query(dimensions, allocated, partition_column))
+
+        proportion_columns: List[str] = ['Proportion', 'Allocated Proportion'] if allocated else ['Proportion']
+        key_columns = [partition_column] if partition_column else []
+        tables = {}
+        for dimension in dimensions:
+            rows = result.loc[result['grouping_id'] == get_grouping_id(dimensions, dimension),
+                              key_columns + [dimension] + proportion_columns]
+            tables[dimension] = rows.reset_index(drop=True)
+        return tables
+
+    def size_histogram(self, dimensions: Sequence[str]) -> pd.DataFrame:
+        """
+        Calculate the log2 size histogram and size quantiles of every value of each dimension in one scan of the data,
+        see create_size_histogram_query. Histograms are kept per install when the data has an Install column.
+
+        :param dimensions: Columns to group by, e.g. ['Extension', 'Directory'].
+        :return: DataFrame with Dimension, Value, Bucket, Min Size, Max Size, File Count,
+                P50 Size, P90 Size and P99 Size columns, after Install if present
+        """
+        partition_column = 'Install' if 'Install' in self.columns else None
+        return self.query(create_size_histogram_query(dimensions, partition_column))
+
+    def aggregate(self, dimensions: Sequence[str], measures: Sequence[str], depth: int = 1) -> pd.DataFrame:
+        """
+        Run an aggregate query, see create_aggregate_query.
+        The query is generated and prepared once per shape of dimensions and measures,
+        later calls with the same shape only execute the prepared statement.
+
+        :param dimensions: Names from DIMENSIONS to group by.
+        :param measures: Names from MEASURES to compute.
+        :param depth: Number of Directory components kept by the Directory Prefix dimension.
+        :return: DataFrame with one column per dimension and per measure
+        """
+        shape = (tuple(dimensions), tuple(measures))
+        name = self.prepared.get(shape)
+        if name is None:
+            name = f'aggregate_{len(self.prepared)}'
+            self.con.execute(f'PREPARE {name} AS {create_aggregate_query(dimensions, measures).strip()}')
+            self.prepared[shape] = name
+
+        # EXECUTE does not take bound parameters, so the values are passed as literals
+        statement = f'EXECUTE {name}'
+        if 'Directory Prefix' in dimensions:
+            separator = os.sep.replace("'", "''")
+            statement += f"({int(depth)}, '{separator}')"
+        return self.con.execute(statement).fetchdf()
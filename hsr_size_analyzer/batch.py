@@ -0,0 +1,95 @@
+import glob
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Union
+
+import pandas as pd
+
+from hsr_size_analyzer.hsr_size_analyzer import get_file_distribution, normalize_directory_path
+from hsr_size_analyzer.logger_config import main_logger
+from hsr_size_analyzer.metrics import instrument
+from hsr_size_analyzer.size_trie import build_size_trie
+from hsr_size_analyzer.sqlite import SingleTransactionConnection, analyze_data, bulk_load, \
+    get_dimensions, write_analysis_tables
+from hsr_size_analyzer.top_n import find_top_sizes
+
+
+def resolve_install_directories(directories: Union[str, Sequence[str]]) -> List[str]:
+    """
+    Expand the install directories to analyze.
+
+    :param directories: A glob pattern, or a list of directories and glob patterns.
+    :return: Sorted list of unique existing directories
+    """
+    patterns = [directories] if isinstance(directories, str) else list(directories)
+    resolved = set()
+    for pattern in patterns:
+        pattern = normalize_directory_path(pattern)
+        matches = glob.glob(pattern) if glob.has_magic(pattern) else [pattern]
+        resolved.update(os.path.abspath(match) for match in matches if os.path.isdir(match))
+    return sorted(resolved)
+
+
+def get_install_labels(directories: Sequence[str]) -> List[str]:
+    """
+    Label each install with its folder name, or its full path when folder names repeat.
+
+    :param directories: Absolute paths of the install directories.
+    :return: One label per directory
+    """
+    names = [os.path.basename(directory.rstrip('/\\')) or directory for directory in directories]
+    if len(set(names)) == len(names):
+        return names
+    return list(directories)
+
+
+@instrument()
+def get_installs_distribution(directories: Union[str, Sequence[str]],
+                              max_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Scan several install directories in parallel worker processes.
+
+    :param directories: A glob pattern, or a list of directories and glob patterns.
+    :param max_workers: Number of worker processes (default is one per install, up to the CPU count).
+    :return: DataFrame with an Install column followed by the get_file_distribution columns for every install
+    """
+    install_directories = resolve_install_directories(directories)
+    if not install_directories:
+        raise ValueError(f"No install directory found for {directories}")
+
+    if max_workers is None:
+        max_workers = min(len(install_directories), os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        install_dfs = list(executor.map(get_file_distribution, install_directories))
+
+    for label, install_df in zip(get_install_labels(install_directories), install_dfs):
+        install_df.insert(0, 'Install', label)
+    return pd.concat(install_dfs, ignore_index=True)
+
+
+@instrument()
+def save_installs_to_db(df: pd.DataFrame, db: str = 'hsr_size_analyzer.db') -> None:
+    """
+    Analyze several installs in one pass and save all results to an SQLite database in one transaction.
+
+    :param df: DataFrame from get_installs_distribution.
+    :param db: Name of the SQLite database file to save the analysis results (default is 'hsr_size_analyzer.db').
+    :return: None
+    """
+    file_ext_df, file_dir_df, *category_dfs, histogram_df = analyze_data(df, get_dimensions(df), size_histogram=True)
+    top_files_df, top_dirs_df = find_top_sizes(df)
+    extra_tables = {'HsrDirTree': build_size_trie(df).to_dataframe(), 'HsrTopFiles': top_files_df,
+                    'HsrTopDirs': top_dirs_df, 'HsrSizeHistogram': histogram_df}
+    if category_dfs:
+        extra_tables['HsrCategoryDist'] = category_dfs[0]
+
+    try:
+        with sqlite3.connect(db, factory=SingleTransactionConnection) as conn, bulk_load(conn):
+            conn.execute('BEGIN')
+            write_analysis_tables(conn, df, file_ext_df, file_dir_df, extra_tables)
+    except sqlite3.OperationalError as e:
+        main_logger.error(f"OperationalError during saving to database {db}: {e}", exc_info=True)
+    except Exception as e:
+        main_logger.error(f"Unexpected error during saving to database {db}: {e}", exc_info=True)
@@ -0,0 +1,135 @@
+import fnmatch
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CATEGORY = 'Other'
+RULE_KEYS = {'category', 'path', 'regex', 'extensions'}
+
+
+class ClassificationRule:
+    """
+    One compiled classification rule: a category, an optional pattern on the Directory and an optional set of
+    extensions. A rule without a pattern or extensions matches every directory or every extension.
+    """
+    __slots__ = ('category', 'pattern', 'extensions')
+
+    def __init__(self, category: str, pattern: Optional[Pattern[str]], extensions: Optional[frozenset]) -> None:
+        self.category = category
+        self.pattern = pattern
+        self.extensions = extensions
+
+
+def compile_rule(rule: Dict[str, Any]) -> ClassificationRule:
+    """
+    Compile one rule of a rules file.
+    The path glob and the regex are matched against the whole Directory with '/' separators, ignoring case,
+    and extensions are compared in lower case.
+
+    :param rule: Dictionary with a category, and optionally a path glob or a regex, and a list of extensions.
+    :return: The compiled rule
+    """
+    unknown = set(rule) - RULE_KEYS
+    if unknown or 'category' not in rule or ('path' in rule and 'regex' in rule):
+        raise ValueError(f"Invalid classification rule {rule}: it needs a category, "
+                         f"at most one of path and regex, and no keys besides {sorted(RULE_KEYS)}")
+
+    pattern = None
+    if 'path' in rule:
+        pattern = re.compile(fnmatch.translate(rule['path']), re.IGNORECASE)
+    elif 'regex' in rule:
+        pattern = re.compile(rf"(?:{rule['regex']})\Z", re.IGNORECASE)
+    extensions = frozenset(extension.lower() for extension in rule['extensions']) if 'extensions' in rule else None
+    return ClassificationRule(rule['category'], pattern, extensions)
+
+
+def load_rules(path: str) -> Tuple[List[ClassificationRule], str]:
+    """
+    Load a classification rules file: a JSON object with a list of rules and an optional default category.
+    The first matching rule gives a file its category.
+
+    :param path: Path of the rules file.
+    :return: The compiled rules and the category of files no rule matches
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return [compile_rule(rule) for rule in data['rules']], data.get('default', DEFAULT_CATEGORY)
+
+
+def factorize(series: pd.Series) -> Tuple[np.ndarray, List[str]]:
+    """
+    Split a text column into integer codes and unique values, reusing the codes of a categorical column.
+
+    :param series: Text column, missing values are treated as empty strings.
+    :return: Codes for each row and the unique values they index
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        values = [str(value) for value in series.cat.categories]
+        if (codes < 0).any():
+            codes = np.where(codes < 0, len(values), codes)
+            values.append('')
+        return codes, values
+
+    codes, uniques = pd.factorize(series.fillna(''))
+    return codes, [str(value) for value in uniques]
+
+
+def classify_files(df: pd.DataFrame, rules: List[ClassificationRule],
+                   default: str = DEFAULT_CATEGORY) -> pd.Series:
+    """
+    Label every file of a scan result with the category of the first rule it matches.
+
+    The rules are evaluated once per unique (Directory, Extension) pair instead of once per file, pattern matching
+    runs once per unique directory and rule, and the labels are spread back to the files with a NumPy take.
+
+    :param df: DataFrame from get_file_distribution.
+    :param rules: Compiled rules, see load_rules.
+    :param default: Category of the files no rule matches.
+    :return: Categorical Series of categories, aligned with df
+    """
+    categories = list(dict.fromkeys([rule.category for rule in rules] + [default]))
+    category_codes = {category: code for code, category in enumerate(categories)}
+
+    directory_codes, directories = factorize(df['Directory'])
+    extension_codes, extensions = factorize(df['Extension'])
+    pairs = directory_codes.astype(np.int64) * len(extensions) + extension_codes
+    unique_pairs, inverse = np.unique(pairs, return_inverse=True)
+    pair_directories = unique_pairs // max(len(extensions), 1)
+    pair_extensions = unique_pairs % max(len(extensions), 1)
+
+    directories = [directory.replace(os.sep, '/') for directory in directories]
+    lower_extensions = np.array([extension.lower() for extension in extensions], dtype=object)
+    pair_labels = np.full(len(unique_pairs), category_codes[default], dtype=np.int32)
+    unlabeled = np.ones(len(unique_pairs), dtype=bool)
+
+    for rule in rules:
+        match = unlabeled.copy()
+        if rule.pattern is not None:
+            directory_match = np.fromiter((rule.pattern.match(directory) is not None for directory in directories),
+                                          dtype=bool, count=len(directories))
+            match &= directory_match[pair_directories]
+        if rule.extensions is not None:
+            extension_match = np.isin(lower_extensions, list(rule.extensions))
+            match &= extension_match[pair_extensions]
+        pair_labels[match] = category_codes[rule.category]
+        unlabeled &= ~match
+
+    return pd.Series(pd.Categorical.from_codes(pair_labels[inverse], categories=categories), index=df.index,
+                     name='Category')
+
+
+def add_category(df: pd.DataFrame, rules_path: str) -> pd.DataFrame:
+    """
+    Add a Category column to a scan result, see classify_files.
+
+    :param df: DataFrame from get_file_distribution.
+    :param rules_path: Path of the rules file.
+    :return: A copy of the DataFrame with a Category column
+    """
+    rules, default = load_rules(rules_path)
+    return df.assign(Category=classify_files(df, rules, default))
@@ -0,0 +1,91 @@
+import sqlite3
+from typing import Tuple, Union
+
+import duckdb
+import pandas as pd
+
+from hsr_size_analyzer.hsr_size_analyzer import add_full_path
+
+FILE_DIFF_QUERY = '''
+    CREATE TEMP TABLE file_diff AS
+    SELECT
+        COALESCE(new."Full Path", old."Full Path") AS "Full Path",
+        COALESCE(CAST(new.Directory AS VARCHAR), CAST(old.Directory AS VARCHAR)) AS Directory,
+        COALESCE(CAST(new.Extension AS VARCHAR), CAST(old.Extension AS VARCHAR)) AS Extension,
+        CAST(old.Size AS BIGINT) AS "Old Size",
+        CAST(new.Size AS BIGINT) AS "New Size",
+        COALESCE(CAST(new.Size AS BIGINT), 0) - COALESCE(CAST(old.Size AS BIGINT), 0) AS Delta,
+        CASE
+            WHEN old."Full Path" IS NULL THEN 'added'
+            WHEN new."Full Path" IS NULL THEN 'removed'
+            WHEN new.Size > old.Size THEN 'grown'
+            WHEN new.Size < old.Size THEN 'shrunk'
+            ELSE 'unchanged'
+        END AS Status
+    FROM old_snapshot AS old
+    FULL OUTER JOIN new_snapshot AS new
+        ON old."Full Path" = new."Full Path";
+'''
+
+GROUP_DIFF_QUERY = '''
+    SELECT
+        Directory,
+        Extension,
+        GROUPING(Directory) AS by_extension,
+        -- SUM of BIGINT is a HUGEINT, which fetchdf turns into float64
+        CAST(SUM(COALESCE("Old Size", 0)) AS BIGINT) AS "Old Size",
+        CAST(SUM(COALESCE("New Size", 0)) AS BIGINT) AS "New Size",
+        CAST(SUM(Delta) AS BIGINT) AS Delta,
+        COUNT(*) FILTER (WHERE Status = 'added') AS "Added Files",
+        COUNT(*) FILTER (WHERE Status = 'removed') AS "Removed Files",
+        COUNT(*) FILTER (WHERE Status IN ('grown', 'shrunk')) AS "Changed Files"
+    FROM file_diff
+    GROUP BY GROUPING SETS ((Directory), (Extension))
+    ORDER BY Delta DESC;
+'''
+
+
+def load_snapshot(db: str, table_name: str = 'HsrSizeAnalysis') -> pd.DataFrame:
+    """
+    Load a stored scan result from an SQLite database.
+
+    :param db: Path of the SQLite database file.
+    :param table_name: Name of the table holding the scan result.
+    :return: DataFrame with columns for Extension, Size, Directory, and Full Path
+    """
+    with sqlite3.connect(db) as conn:
+        return pd.read_sql_query(f'SELECT Extension, Size, Directory, "Full Path" FROM "{table_name}"', conn)
+
+
+def diff_snapshots(old: Union[pd.DataFrame, str],
+                   new: Union[pd.DataFrame, str]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Compare two scan results of the game directory, joined on Full Path in DuckDB.
+
+    :param old: Scan result of the older version, or the path of an SQLite database holding it.
+    :param new: Scan result of the newer version, or the path of an SQLite database holding it.
+    :return: A tuple of three DataFrames: the added, removed, grown and shrunk files with their size delta,
+            and the net growth per directory and per file extension, largest growth first.
+    """
+    old_df = load_snapshot(old) if isinstance(old, str) else add_full_path(old)
+    new_df = load_snapshot(new) if isinstance(new, str) else add_full_path(new)
+    columns = ['Extension', 'Size', 'Directory', 'Full Path']
+
+    con = duckdb.connect(':memory:')
+    try:
+        con.register('old_snapshot', old_df[columns])
+        con.register('new_snapshot', new_df[columns])
+        con.execute(FILE_DIFF_QUERY)
+
+        file_diff_df = con.execute(
+            "SELECT * FROM file_diff WHERE Status != 'unchanged' ORDER BY ABS(Delta) DESC, \"Full Path\""
+        ).fetchdf()
+        group_diff_df = con.execute(GROUP_DIFF_QUERY).fetchdf()
+    finally:
+        con.close()
+
+    by_extension = group_diff_df['by_extension'] == 1
+    group_diff_df = group_diff_df.drop(columns='by_extension')
+    dir_diff_df = group_diff_df.loc[~by_extension].drop(columns='Extension').reset_index(drop=True)
+    ext_diff_df = group_diff_df.loc[by_extension].drop(columns='Directory').reset_index(drop=True)
+    return file_diff_df, dir_diff_df, ext_diff_df
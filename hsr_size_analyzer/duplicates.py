@@ -0,0 +1,157 @@
+import hashlib
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from hsr_size_analyzer.hsr_size_analyzer import add_full_path
+from hsr_size_analyzer.logger_config import main_logger
+
+# Bytes hashed from the start and from the end of a file before hashing it fully
+EDGE_SIZE = 64 * 1024
+# Read size when a file cannot be memory-mapped
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file_edges(file_path: str, size: int) -> bytes:
+    """
+    Hash the first and last EDGE_SIZE bytes of a file.
+    Files no larger than twice EDGE_SIZE are hashed completely.
+
+    :param file_path: Path to the file.
+    :param size: Size of the file in bytes.
+    :return: Digest of the file's edges
+    """
+    if size <= 2 * EDGE_SIZE:
+        return hash_file(file_path)
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        digest.update(mapped[:EDGE_SIZE])
+        digest.update(mapped[-EDGE_SIZE:])
+    return digest.digest()
+
+
+def hash_file(file_path: str) -> bytes:
+    """
+    Hash the whole content of a file through a memory map.
+
+    :param file_path: Path to the file.
+    :return: Digest of the file content
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        except ValueError:
+            # Empty files cannot be memory-mapped
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+    return digest.digest()
+
+
+def get_file_id(file_path: str) -> Optional[Tuple[int, int]]:
+    """
+    :param file_path: Path to the file.
+    :return: Device and inode number of the file, shared by all its hard links. None if it cannot be read.
+    """
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        return None
+    return file_stat.st_dev, file_stat.st_ino
+
+
+def group_by_hash(paths: List[str], sizes: List[int], hash_function: Callable[[str, int], bytes],
+                  executor: ThreadPoolExecutor) -> List[Tuple[bytes, List[int]]]:
+    """
+    Hash the files on the thread pool and group them by size and digest.
+
+    :param paths: Absolute paths of the files.
+    :param sizes: Sizes of the files in bytes.
+    :param hash_function: Function hashing one file from its path and size.
+    :param executor: Thread pool to hash the files on.
+    :return: Digest and positions in paths of each group of more than one file sharing the same size and digest.
+            Files that cannot be read are left out.
+    """
+    def safe_hash(position: int) -> Optional[bytes]:
+        try:
+            return hash_function(paths[position], sizes[position])
+        except OSError as e:
+            main_logger.warning(f"Cannot hash {paths[position]}: {e}")
+            return None
+
+    groups: Dict[Tuple[int, bytes], List[int]] = {}
+    for position, digest in enumerate(executor.map(safe_hash, range(len(paths)))):
+        if digest is not None:
+            groups.setdefault((sizes[position], digest), []).append(position)
+    return [(digest, group) for (_, digest), group in groups.items() if len(group) > 1]
+
+
+def find_duplicates(df: pd.DataFrame, directory: str, max_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Find files with byte-identical content in a scan result.
+
+    Files are grouped by Size first. Only files sharing their size with another file have their
+    first and last 64 KiB hashed, and only files that still collide are hashed completely.
+    Hard links of the same file are hashed once. They are listed in its group but free nothing when removed,
+    and links of one file with no other copy are not duplicates.
+
+    :param df: DataFrame from get_file_distribution for the directory.
+    :param directory: The directory that was scanned.
+    :param max_workers: Number of threads hashing files (default is the ThreadPoolExecutor default).
+    :return: DataFrame with one row per duplicated file and columns Group Id, Full Path, Size, Hash, File Count
+            and Reclaimable Size. Reclaimable Size is 0 for the first file of each group and Size for the others,
+            so its sum over a group is the number of bytes removing the copies would free.
+            It is 0 for the additional hard links of a file as well.
+    """
+    columns = ['Group Id', 'Full Path', 'Size', 'Hash', 'File Count', 'Reclaimable Size']
+    df = add_full_path(df)
+    candidates = df.loc[(df['Size'] > 0) & df['Size'].duplicated(keep=False), ['Full Path', 'Size']]
+    if candidates.empty:
+        return pd.DataFrame(columns=columns)
+
+    candidates = candidates.sort_values(['Size', 'Full Path'], kind='stable')
+    full_paths = candidates['Full Path'].tolist()
+    paths = [os.path.join(directory, full_path) for full_path in full_paths]
+    sizes = [int(size) for size in candidates['Size']]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Only the first path of each file is hashed, its other hard links are added back to its group
+        first_links: Dict[Tuple[int, int], int] = {}
+        links: Dict[int, List[str]] = {}
+        unique = []
+        for position, file_id in enumerate(executor.map(get_file_id, paths)):
+            if file_id is not None and file_id in first_links:
+                links.setdefault(first_links[file_id], []).append(full_paths[position])
+                continue
+            if file_id is not None:
+                first_links[file_id] = len(unique)
+            unique.append(position)
+        full_paths = [full_paths[position] for position in unique]
+        paths = [paths[position] for position in unique]
+        sizes = [sizes[position] for position in unique]
+
+        edge_groups = group_by_hash(paths, sizes, hash_file_edges, executor)
+
+        # The edge hash already covered files up to twice EDGE_SIZE, the rest are hashed fully in one batch
+        content_groups = [(digest, group) for digest, group in edge_groups if sizes[group[0]] <= 2 * EDGE_SIZE]
+        colliding = [position for _, group in edge_groups if sizes[group[0]] > 2 * EDGE_SIZE for position in group]
+        for digest, group in group_by_hash([paths[position] for position in colliding],
+                                           [sizes[position] for position in colliding],
+                                           lambda path, _: hash_file(path), executor):
+            content_groups.append((digest, [colliding[member] for member in group]))
+
+    rows = []
+    for group_id, (digest, group) in enumerate(content_groups):
+        file_count = sum(1 + len(links.get(position, [])) for position in group)
+        for rank, position in enumerate(group):
+            rows.append((group_id, full_paths[position], sizes[position], digest.hex(), file_count,
+                         0 if rank == 0 else sizes[position]))
+            rows.extend((group_id, link, sizes[position], digest.hex(), file_count, 0)
+                        for link in links.get(position, []))
+
+    return pd.DataFrame(rows, columns=columns)
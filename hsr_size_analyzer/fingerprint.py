@@ -0,0 +1,153 @@
+import sqlite3
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+SCAN_FINGERPRINT_TABLE = 'HsrScanFingerprint'
+DIR_FINGERPRINT_TABLE = 'HsrDirFingerprints'
+DIR_TOTALS_TABLE = 'HsrDirTotals'
+FINGERPRINT_TABLES = (SCAN_FINGERPRINT_TABLE, DIR_FINGERPRINT_TABLE, DIR_TOTALS_TABLE)
+# Extension and Directory are derived from Full Path, hashing them as well would only cost time
+DERIVED_COLUMNS = ('Extension', 'Directory')
+
+
+def hash_rows(df: pd.DataFrame) -> pd.Series:
+    """
+    Hash every file of a scan result from its Full Path, Size, Modified Time and other stored columns.
+    Sizes are hashed as floats, so a scan read back from the REAL Size column hashes the same as the original.
+
+    :param df: DataFrame from get_file_distribution with modified_time.
+    :return: uint64 hash of each row
+    """
+    columns = sorted(column for column in df.columns if column not in DERIVED_COLUMNS)
+    size_columns = {column: 'float64' for column in ('Size', 'Allocated Size') if column in columns}
+    return pd.util.hash_pandas_object(df[columns].astype(size_columns), index=False)
+
+
+class ScanFingerprint:
+    """
+    Cheap fingerprint of a scan result, to tell whether the stored analysis is still current.
+
+    Each file is hashed from its relative path, size and modification time, and the hashes are summed modulo 2^64
+    per directory. The sum does not depend on the order of the files, so a directory fingerprints the same however
+    it was walked, and the scan's fingerprint is the sum of its directories'. Comparing the directories of two
+    fingerprints finds the subtrees that changed.
+    The columns of the scan and the extra tables saved with it are part of the fingerprint, since a different set
+    of either changes the stored results without changing any file.
+    """
+
+    def __init__(self, directories: pd.Series, columns: str, tables: str) -> None:
+        """
+        :param directories: Fingerprint of each directory, indexed by directory.
+        :param columns: Comma-separated columns of the scan result.
+        :param tables: Comma-separated names of the extra tables saved with it.
+        """
+        self.directories = directories
+        self.columns = columns
+        self.tables = tables
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, table_names: Sequence[str] = ()) -> 'ScanFingerprint':
+        """
+        :param df: DataFrame from get_file_distribution with modified_time.
+        :param table_names: Extra tables saved with the scan.
+        :return: Fingerprint of the scan
+        """
+        hashes = hash_rows(df)
+        directories = hashes.groupby(df['Directory'].to_numpy(), sort=False).sum().astype('uint64')
+        return cls(directories, ','.join(sorted(df.columns)), ','.join(sorted(table_names)))
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> Optional['ScanFingerprint']:
+        """
+        :param conn: Connection to the SQLite database.
+        :return: Fingerprint of the scan the stored results were computed from, or None if there is none
+        """
+        try:
+            row = conn.execute(f'SELECT "Columns", "Tables" FROM "{SCAN_FINGERPRINT_TABLE}"').fetchone()
+            directories = conn.execute(f'SELECT "Directory", "Fingerprint" FROM "{DIR_FINGERPRINT_TABLE}"').fetchall()
+        except sqlite3.OperationalError:
+            return None
+        if row is None:
+            return None
+        # Stored as signed 64-bit integers, the type SQLite has
+        fingerprints = np.array([fingerprint for _, fingerprint in directories], dtype='int64').view('uint64')
+        return cls(pd.Series(fingerprints, index=[directory for directory, _ in directories], dtype='uint64'),
+                   row[0], row[1])
+
+    @property
+    def value(self) -> int:
+        return int(self.directories.to_numpy().sum(dtype='uint64'))
+
+    def compatible(self, other: Optional['ScanFingerprint']) -> bool:
+        """
+        :param other: Fingerprint of the stored results.
+        :return: Whether the stored results were computed from a scan with the same columns and extra tables,
+                so the results of its unchanged directories can be reused
+        """
+        return other is not None and (self.columns, self.tables) == (other.columns, other.tables)
+
+    def matches(self, other: Optional['ScanFingerprint']) -> bool:
+        """
+        :param other: Fingerprint of the stored results.
+        :return: Whether the stored results are current, since every directory fingerprints the same
+        """
+        return self.compatible(other) and self.value == other.value and not self.changed_directories(other)
+
+    def changed_directories(self, other: 'ScanFingerprint') -> List[str]:
+        """
+        :param other: Fingerprint of the stored results.
+        :return: Directories that were added, removed or changed since the stored scan
+        """
+        stored = other.directories.to_dict()
+        changed = [directory for directory, fingerprint in self.directories.to_dict().items()
+                   if stored.pop(directory, None) != fingerprint]
+        # What is left of the stored directories was removed
+        return changed + list(stored)
+
+    def to_dataframes(self) -> Dict[str, pd.DataFrame]:
+        """
+        :return: The HsrScanFingerprint and HsrDirFingerprints tables, keyed by table name
+        """
+        signed = self.directories.to_numpy(dtype='uint64').view('int64')
+        return {
+            SCAN_FINGERPRINT_TABLE: pd.DataFrame({
+                'Fingerprint': [np.uint64(self.value).view('int64')],
+                'Directory Count': [len(self.directories)],
+                'Columns': [self.columns],
+                'Tables': [self.tables],
+            }),
+            DIR_FINGERPRINT_TABLE: pd.DataFrame({'Directory': self.directories.index.astype(str),
+                                                 'Fingerprint': signed}),
+        }
+
+
+def directory_totals(df: pd.DataFrame, dimensions: Sequence[str]) -> pd.DataFrame:
+    """
+    Sum the files of a scan result per directory and value of the other dimensions,
+    the aggregates the proportion tables and the size trie are built from.
+
+    :param df: DataFrame from get_file_distribution.
+    :param dimensions: Columns the proportions are calculated for, see sqlite.get_dimensions.
+    :return: DataFrame with the Directory and dimension columns, File Count, Size, and Allocated Size
+            when the scan has it
+    """
+    keys = ['Directory'] + [dimension for dimension in dimensions if dimension != 'Directory']
+    size_columns = [column for column in ('Size', 'Allocated Size') if column in df.columns]
+    grouped = df[size_columns].fillna(0).groupby([df[key] for key in keys], sort=False, observed=True)
+    totals = grouped.sum()
+    totals.insert(0, 'File Count', grouped.size())
+    return totals.reset_index()
+
+
+def drop_fingerprint_tables(conn: sqlite3.Connection) -> None:
+    """
+    Drop the stored fingerprint, when the results are written without one.
+    A fingerprint left next to results computed from another scan would let a later run skip its analysis.
+
+    :param conn: Connection to the SQLite database.
+    :return: None
+    """
+    for table_name in FINGERPRINT_TABLES:
+        conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
@@ -0,0 +1,154 @@
+import sqlite3
+from datetime import datetime, timezone
+from typing import Optional
+
+import pandas as pd
+
+from hsr_size_analyzer.hsr_size_analyzer import add_full_path
+from hsr_size_analyzer.logger_config import main_logger
+from hsr_size_analyzer.sqlite import SingleTransactionConnection, bulk_load, create_indexes, write_to_sqlite
+
+SNAPSHOT_TABLES = '''
+    CREATE TABLE IF NOT EXISTS HsrSnapshots (
+        "Snapshot Id" INTEGER PRIMARY KEY AUTOINCREMENT,
+        "Timestamp" TEXT NOT NULL,
+        "File Count" INTEGER NOT NULL,
+        "Total Size" INTEGER NOT NULL,
+        "Allocated Size" INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS HsrFileHistory (
+        "Id" INTEGER PRIMARY KEY,
+        "Full Path" TEXT NOT NULL,
+        "Extension" TEXT,
+        "Directory" TEXT,
+        "Size" INTEGER,
+        "Allocated Size" INTEGER,
+        "First Snapshot" INTEGER NOT NULL,
+        "Removed Snapshot" INTEGER
+    );
+'''
+
+
+def create_history_tables(conn: sqlite3.Connection) -> None:
+    """
+    Create the snapshot history tables if they do not exist yet.
+
+    HsrSnapshots has one row per run. HsrFileHistory has one row per version of a file, valid from its
+    First Snapshot up to, but not including, its Removed Snapshot, which stays NULL while the version is current.
+    A file that did not change between runs keeps its row, so the table grows with the changes only.
+
+    :param conn: Connection to the SQLite database.
+    :return: None
+    """
+    for statement in SNAPSHOT_TABLES.split(';'):
+        if statement.strip():
+            conn.execute(statement)
+    create_indexes(conn, 'HsrFileHistory', ['Removed Snapshot'])
+
+
+def append_snapshot(conn: sqlite3.Connection, df: pd.DataFrame, retention: Optional[int] = None) -> int:
+    """
+    Record a scan result as a new snapshot on an open connection.
+    The scan is compared with the current file versions on Full Path. Only new and changed files are inserted,
+    and the previous versions of changed and removed files are closed with the new snapshot id.
+
+    :param conn: Connection to the SQLite database.
+    :param df: DataFrame from get_file_distribution. The scans of several installs share Full Paths
+                and cannot be recorded.
+    :param retention: Number of snapshots to keep, older ones are compacted away. None keeps every snapshot.
+    :return: Id of the new snapshot
+    """
+    if 'Install' in df.columns:
+        raise ValueError("The snapshot history does not support the scans of several installs")
+    create_history_tables(conn)
+    df = add_full_path(df)
+    allocated = 'Allocated Size' in df.columns
+    total_allocated = int(df['Allocated Size'].sum()) if allocated else None
+    snapshot_id = conn.execute(
+        'INSERT INTO HsrSnapshots ("Timestamp", "File Count", "Total Size", "Allocated Size") VALUES (?, ?, ?, ?)',
+        (datetime.now(timezone.utc).isoformat(timespec='seconds'), len(df), int(df['Size'].sum()), total_allocated)
+    ).lastrowid
+
+    current = pd.read_sql_query('SELECT "Id", "Full Path", "Size", "Allocated Size" FROM HsrFileHistory '
+                                'WHERE "Removed Snapshot" IS NULL', conn,
+                                dtype={'Id': 'int64', 'Size': 'float64', 'Allocated Size': 'float64'})
+    scanned = df[['Full Path', 'Size']].assign(**{'Allocated Size': df['Allocated Size'] if allocated else float('nan')})
+    merged = scanned.merge(current, on='Full Path', how='outer', suffixes=('', ' Previous'), indicator=True)
+
+    # Missing allocated sizes compare equal, so scans without that column do not mark every file as changed
+    changed = (merged['_merge'] == 'both') & (
+        merged['Size'].ne(merged['Size Previous']) |
+        merged['Allocated Size'].fillna(-1).ne(merged['Allocated Size Previous'].fillna(-1))
+    )
+    closed_ids = merged.loc[changed | (merged['_merge'] == 'right_only'), 'Id']
+    conn.executemany('UPDATE HsrFileHistory SET "Removed Snapshot" = ? WHERE "Id" = ?',
+                     ((snapshot_id, int(file_id)) for file_id in closed_ids))
+
+    new_paths = merged.loc[changed | (merged['_merge'] == 'left_only'), 'Full Path']
+    columns = ['Full Path', 'Extension', 'Directory', 'Size'] + (['Allocated Size'] if allocated else [])
+    new_rows = df.loc[df['Full Path'].isin(new_paths), columns].assign(**{'First Snapshot': snapshot_id})
+    write_to_sqlite(conn, new_rows, 'HsrFileHistory', if_exists='append', index=False)
+
+    if retention is not None:
+        compact_history(conn, retention)
+    return snapshot_id
+
+
+def compact_history(conn: sqlite3.Connection, retention: int) -> None:
+    """
+    Keep only the latest snapshots. Snapshots older than those are deleted, together with the file versions
+    that were removed before the oldest kept snapshot. Versions still visible in a kept snapshot stay.
+
+    :param conn: Connection to the SQLite database.
+    :param retention: Number of snapshots to keep, at least 1.
+    :return: None
+    """
+    if retention < 1:
+        raise ValueError(f"Snapshot retention must be at least 1, got {retention}")
+
+    oldest_kept = conn.execute('SELECT "Snapshot Id" FROM HsrSnapshots ORDER BY "Snapshot Id" DESC LIMIT 1 OFFSET ?',
+                               (retention - 1,)).fetchone()
+    if oldest_kept is None:
+        return
+    conn.execute('DELETE FROM HsrSnapshots WHERE "Snapshot Id" < ?', oldest_kept)
+    conn.execute('DELETE FROM HsrFileHistory WHERE "Removed Snapshot" <= ?', oldest_kept)
+
+
+def save_snapshot_to_db(df: pd.DataFrame, db: str = 'hsr_size_analyzer.db',
+                        retention: Optional[int] = None) -> Optional[int]:
+    """
+    Append a scan result to the snapshot history of an SQLite database in one transaction, see append_snapshot.
+
+    :param df: DataFrame from get_file_distribution, not from get_installs_distribution.
+    :param db: Name of the SQLite database file (default is 'hsr_size_analyzer.db').
+    :param retention: Number of snapshots to keep, older ones are compacted away. None keeps every snapshot.
+    :return: Id of the new snapshot, or None if it could not be saved
+    """
+    if 'Install' in df.columns:
+        raise ValueError("The snapshot history does not support the scans of several installs")
+    try:
+        with sqlite3.connect(db, factory=SingleTransactionConnection) as conn, bulk_load(conn):
+            conn.execute('BEGIN')
+            return append_snapshot(conn, df, retention)
+    except sqlite3.OperationalError as e:
+        main_logger.error(f"OperationalError during saving snapshot to database {db}: {e}", exc_info=True)
+    except Exception as e:
+        main_logger.error(f"Unexpected error during saving snapshot to database {db}: {e}", exc_info=True)
+    return None
+
+
+def load_history_snapshot(db: str, snapshot_id: Optional[int] = None) -> pd.DataFrame:
+    """
+    Rebuild the scan result of one snapshot from the history tables.
+
+    :param db: Path of the SQLite database file.
+    :param snapshot_id: Id of the snapshot, the latest one when None.
+    :return: DataFrame with columns for Extension, Size, Directory, Full Path and Allocated Size
+    """
+    with sqlite3.connect(db) as conn:
+        if snapshot_id is None:
+            snapshot_id = conn.execute('SELECT MAX("Snapshot Id") FROM HsrSnapshots').fetchone()[0]
+        return pd.read_sql_query(
+            'SELECT "Extension", "Size", "Directory", "Full Path", "Allocated Size" FROM HsrFileHistory '
+            'WHERE "First Snapshot" <= ? AND ("Removed Snapshot" IS NULL OR "Removed Snapshot" > ?) '
+            'ORDER BY "Id"', conn, params=(snapshot_id, snapshot_id))
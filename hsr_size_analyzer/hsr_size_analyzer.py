@@ -1,42 +1,394 @@
 import os
-from typing import Any, Dict, List, Tuple
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
+from hsr_size_analyzer.logger_config import main_logger
+from hsr_size_analyzer.manifest import DirectoryManifest
+from hsr_size_analyzer.metrics import count, instrument, run_metrics
+from hsr_size_analyzer.parallel_scan import parallel_walk_files
 
-def get_file_distribution(directory: str) -> pd.DataFrame:
+
+@instrument()
+def get_file_distribution(directory: str, max_workers: Optional[int] = None, manifest: Optional[str] = None,
+                          batch_size: Optional[int] = None, compact: bool = False,
+                          modified_time: bool = False) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
     """
     Generate a DataFrame containing file distribution information for a given directory.
     :param directory: The path to the directory to analyze.
                     This can be either an absolute path or relative path.
-    :return: Pandas DataFrame containing file distribution information.
+    :param max_workers: Number of threads for a parallel scan. The scan runs serially when this is None.
+                    Not supported together with manifest.
+    :param manifest: Path of a manifest file for an incremental scan, see manifest.get_manifest_path.
+                    Only directories that changed since the previous scan are listed again.
+                    The number of skipped and rescanned directories is stored in the DataFrame's attrs.
+    :param batch_size: Stream the scan as DataFrames of at most this many files instead of one DataFrame.
+                    The batches can be passed to sqlite.save_to_db as they are.
+    :param compact: Return categorical Extension and Directory columns and a File Name column
+                    instead of Full Path, see create_compact_dataframe. Not supported together with batch_size.
+    :param modified_time: Add a Modified Time column with each file's st_mtime_ns.
+                    sqlite.save_to_db fingerprints such a scan and skips the analysis of unchanged directories.
+                    Not supported together with compact.
+    :return: Pandas DataFrame containing file distribution information,
+            or an iterator of DataFrame batches when batch_size is given.
     """
     directory = normalize_directory_path(directory)
     directory = os.path.abspath(directory)
 
-    file_data = collect_file_data(directory)
-    return create_dataframe(file_data)
+    if compact and modified_time:
+        raise ValueError("compact is not supported together with modified_time")
+    # The incremental walker lists directories serially, it would silently ignore the thread count
+    if manifest is not None and max_workers is not None:
+        raise ValueError("max_workers is not supported together with manifest")
+
+    if batch_size is not None:
+        if compact:
+            raise ValueError("compact is not supported together with batch_size")
+        return iter_file_batches(directory, batch_size, max_workers, manifest, modified_time)
+
+    if manifest is None:
+        return scan_dataframe(directory, compact, max_workers, modified_time=modified_time)
+
+    directory_manifest = DirectoryManifest(manifest)
+    directory_manifest.load()
+    df = scan_dataframe(directory, compact, manifest=directory_manifest, modified_time=modified_time)
+    directory_manifest.save()
+
+    df.attrs['manifest'] = {
+        'skipped_directories': directory_manifest.skipped,
+        'rescanned_directories': directory_manifest.rescanned,
+    }
+    log_manifest_stats(directory, directory_manifest)
+    return df
+
+
+def scan_dataframe(directory: str, compact: bool, max_workers: Optional[int] = None,
+                   manifest: Optional[DirectoryManifest] = None, modified_time: bool = False) -> pd.DataFrame:
+    """
+    Scan the directory into a single DataFrame.
+    :param directory: Absolute path to the directory to analyze.
+    :param compact: Build the compact DataFrame from create_compact_dataframe.
+    :param max_workers: Number of threads for a parallel scan. The scan runs serially when this is None.
+    :param manifest: Loaded manifest for an incremental scan. It takes precedence over max_workers.
+    :param modified_time: Add the Modified Time column.
+    :return: Pandas DataFrame containing file distribution information.
+    """
+    if compact:
+        return create_compact_dataframe(collect_compact_file_data(directory, max_workers, manifest))
+    return create_dataframe(collect_file_data(directory, max_workers, manifest, modified_time))
+
+
+def iter_file_batches(directory: str, batch_size: int, max_workers: Optional[int] = None,
+                      manifest: Optional[str] = None, modified_time: bool = False) -> Iterator[pd.DataFrame]:
+    """
+    Scan the directory and yield the file distribution as DataFrames of at most batch_size rows.
+    The index of each batch continues from the previous one, as if the batches were one DataFrame.
+    :param directory: Absolute path to the directory to analyze.
+    :param batch_size: Maximum number of files in each DataFrame.
+    :param max_workers: Number of threads for a parallel scan. The scan runs serially when this is None.
+    :param manifest: Path of a manifest file for an incremental scan. It is saved after the last batch.
+    :param modified_time: Add the Modified Time column.
+    :return: Iterator of DataFrames with columns for Extension, Size, Directory, Full Path, and Allocated Size
+    """
+    directory_manifest = None
+    if manifest is not None:
+        directory_manifest = DirectoryManifest(manifest)
+        directory_manifest.load()
+
+    start = 0
+    for file_data in iter_file_data(directory, batch_size, max_workers, directory_manifest, modified_time):
+        batch = create_dataframe(file_data)
+        batch.index = pd.RangeIndex(start, start + len(batch))
+        start += len(batch)
+        yield batch
+
+    if directory_manifest is not None:
+        directory_manifest.save()
+        log_manifest_stats(directory, directory_manifest)
+
+
+def log_manifest_stats(directory: str, manifest: DirectoryManifest) -> None:
+    """
+    Log how many directories an incremental scan skipped and rescanned.
+    :param directory: The scanned directory.
+    :param manifest: The manifest used for the scan.
+    :return: None
+    """
+    main_logger.info(f"Incremental scan of {directory}: {manifest.skipped} directories skipped, "
+                     f"{manifest.rescanned} rescanned")
 
 
-def collect_file_data(directory: str) -> Dict[str, List[Any]]:
+@instrument()
+def collect_file_data(directory: str, max_workers: Optional[int] = None,
+                      manifest: Optional[DirectoryManifest] = None, modified_time: bool = False) -> Dict[str, List[Any]]:
     """
     Collect file data from the given directory and its subdirectories.
     :param directory: Path to the directory to analyze
+    :param max_workers: Number of threads for a parallel scan. The scan runs serially when this is None.
+    :param manifest: Loaded manifest for an incremental scan. It takes precedence over max_workers.
+    :param modified_time: Collect the st_mtime_ns of each file as well.
     :return: Dictionary containing lists of file information
     """
+    return next(iter_file_data(directory, None, max_workers, manifest, modified_time))
+
+
+def iter_file_data(directory: str, batch_size: Optional[int], max_workers: Optional[int] = None,
+                   manifest: Optional[DirectoryManifest] = None,
+                   modified_time: bool = False) -> Iterator[Dict[str, List[Any]]]:
+    """
+    Collect file data from the given directory and its subdirectories in batches.
+    :param directory: Path to the directory to analyze
+    :param batch_size: Maximum number of files in each batch. All files go into one batch when this is None.
+    :param max_workers: Number of threads for a parallel scan. The scan runs serially when this is None.
+    :param manifest: Loaded manifest for an incremental scan. It takes precedence over max_workers.
+    :param modified_time: Collect the st_mtime_ns of each file as well.
+    :return: Iterator of dictionaries containing lists of file information.
+            At least one, possibly empty, dictionary is yielded.
+    """
+    files = select_walker(directory, max_workers, manifest)
+
+    files_left = batch_size
+    batch_yielded = False
+    seen_inodes: Set[Tuple[int, int]] = set()
+    file_data = new_file_data(modified_time)
+    # Bind the list appends once, this loop runs once per file in the install
+    append_ext = file_data['Extension'].append
+    append_size = file_data['Size'].append
+    append_allocated = file_data['Allocated Size'].append
+    append_dir = file_data['Directory'].append
+    append_path = file_data['Full Path'].append
+    append_mtime = file_data['Modified Time'].append if modified_time else None
+
+    for file_dir, full_file_path, file_name, file_stat in files:
+        append_ext(get_file_extension(file_name) or 'No extension')
+        append_size(file_stat.st_size)
+        append_allocated(get_allocated_size(file_stat, seen_inodes))
+        append_dir(file_dir)
+        append_path(full_file_path)
+        if append_mtime is not None:
+            append_mtime(file_stat.st_mtime_ns)
+
+        if files_left is not None:
+            files_left -= 1
+            if not files_left:
+                count_file_data(file_data)
+                yield file_data
+                batch_yielded = True
+                files_left = batch_size
+                file_data = new_file_data(modified_time)
+                append_ext = file_data['Extension'].append
+                append_size = file_data['Size'].append
+                append_allocated = file_data['Allocated Size'].append
+                append_dir = file_data['Directory'].append
+                append_path = file_data['Full Path'].append
+                append_mtime = file_data['Modified Time'].append if modified_time else None
+
+    if file_data['Size'] or not batch_yielded:
+        count_file_data(file_data)
+        yield file_data
+
+
+def count_file_data(file_data: Dict[str, List[Any]]) -> None:
+    """
+    Add the files and bytes of a batch of file data to the run metrics counters.
+    :param file_data: Dictionary containing lists of file information
+    :return: None
+    """
+    if run_metrics.enabled:
+        count('Files', len(file_data['Size']))
+        count('Bytes', sum(file_data['Size']))
+
+
+@instrument()
+def collect_compact_file_data(directory: str, max_workers: Optional[int] = None,
+                              manifest: Optional[DirectoryManifest] = None) -> Dict[str, Any]:
+    """
+    Collect file data in a compact columnar form.
+    Each directory and extension string is stored once, and files refer to them by integer codes.
+    :param directory: Path to the directory to analyze
+    :param max_workers: Number of threads for a parallel scan. The scan runs serially when this is None.
+    :param manifest: Loaded manifest for an incremental scan. It takes precedence over max_workers.
+    :return: Dictionary with the 'directories' and 'extensions' tables,
+            and the 'dir_ids', 'ext_codes', 'names', 'sizes' and 'allocated_sizes' file columns
+    """
+    directories: List[str] = []
+    extensions: List[str] = []
+    ext_lookup: Dict[str, int] = {}
+    dir_ids = array('i')
+    ext_codes = array('i')
+    sizes = array('q')
+    allocated_sizes = array('q')
+    names: List[str] = []
+    seen_inodes: Set[Tuple[int, int]] = set()
+
+    last_dir = None
+    dir_id = -1
+    for file_dir, _, file_name, file_stat in select_walker(directory, max_workers, manifest):
+        # The walkers yield every file of a directory together, so a new directory is a new id
+        if file_dir != last_dir:
+            last_dir = file_dir
+            dir_id = len(directories)
+            directories.append(file_dir)
+
+        file_ext = get_file_extension(file_name) or 'No extension'
+        ext_code = ext_lookup.get(file_ext)
+        if ext_code is None:
+            ext_code = ext_lookup[file_ext] = len(extensions)
+            extensions.append(file_ext)
+
+        dir_ids.append(dir_id)
+        ext_codes.append(ext_code)
+        sizes.append(file_stat.st_size)
+        allocated_sizes.append(get_allocated_size(file_stat, seen_inodes))
+        names.append(file_name)
+
+    count('Files', len(sizes))
+    count('Bytes', sum(sizes))
+    return {
+        'directories': directories,
+        'extensions': extensions,
+        'dir_ids': np.frombuffer(dir_ids, dtype=np.int32) if dir_ids else np.empty(0, dtype=np.int32),
+        'ext_codes': np.frombuffer(ext_codes, dtype=np.int32) if ext_codes else np.empty(0, dtype=np.int32),
+        'names': names,
+        'sizes': np.frombuffer(sizes, dtype=np.int64) if sizes else np.empty(0, dtype=np.int64),
+        'allocated_sizes': (np.frombuffer(allocated_sizes, dtype=np.int64) if allocated_sizes
+                            else np.empty(0, dtype=np.int64)),
+    }
+
+
+@instrument()
+def create_compact_dataframe(compact_data: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Create a pandas DataFrame with categorical Extension and Directory columns from compact file data.
+    The Full Path column is left out, add_full_path builds it when it is needed.
+    :param compact_data: Dictionary from collect_compact_file_data
+    :return: DataFrame with columns for Extension, Size, Directory, File Name, and Allocated Size
+    """
+    return pd.DataFrame({
+        'Extension': pd.Categorical.from_codes(compact_data['ext_codes'], categories=compact_data['extensions']),
+        'Size': compact_data['sizes'],
+        'Directory': pd.Categorical.from_codes(compact_data['dir_ids'], categories=compact_data['directories']),
+        'File Name': compact_data['names'],
+        'Allocated Size': compact_data['allocated_sizes'],
+    })
+
+
+def add_full_path(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replace the File Name column of a compact DataFrame with the Full Path column.
+    DataFrames that already have a Full Path column are returned unchanged.
+    :param df: DataFrame from create_compact_dataframe
+    :return: DataFrame with the File Name column replaced by Full Path
+    """
+    if 'Full Path' in df.columns or 'File Name' not in df.columns:
+        return df
+
+    directory = df['Directory']
+    if isinstance(directory.dtype, pd.CategoricalDtype):
+        # Build the prefix once per directory instead of once per file
+        prefixes = ['' if d == 'Root Directory' else d + os.sep for d in directory.cat.categories]
+        prefix = directory.cat.rename_categories(prefixes).astype(str)
+    else:
+        prefix = (directory + os.sep).where(directory != 'Root Directory', '')
+
+    position = df.columns.get_loc('File Name')
+    full_path = prefix + df['File Name']
+    df = df.drop(columns='File Name')
+    df.insert(position, 'Full Path', full_path)
+    return df
+
+
+def new_file_data(modified_time: bool = False) -> Dict[str, List[Any]]:
+    """
+    Create an empty file_data dictionary.
+    :param modified_time: Include the Modified Time list.
+    :return: Dictionary with an empty list for each file information column
+    """
     file_data: Dict[str, List[Any]] = {
         'Extension': [],
         'Size': [],
         'Directory': [],
-        'Full Path': []
+        'Full Path': [],
+        'Allocated Size': []
     }
+    if modified_time:
+        file_data['Modified Time'] = []
+    return file_data
 
-    for root, _, files in os.walk(directory):
-        for file in files:
-            file_info = get_file_info(root, file, directory)
-            append_file_info(file_data, file_info)
 
-    return file_data
+def get_allocated_size(file_stat: os.stat_result, seen_inodes: Set[Tuple[int, int]]) -> int:
+    """
+    Get the on-disk allocated size of a file, counting each hardlinked inode once.
+    :param file_stat: Stat result of the file.
+    :param seen_inodes: (st_dev, st_ino) of the hardlinked files counted so far. Updated in place.
+    :return: st_blocks * 512, the apparent size where st_blocks is not available,
+            or 0 for another link to an inode that was already counted
+    """
+    if file_stat.st_nlink > 1:
+        inode = (file_stat.st_dev, file_stat.st_ino)
+        if inode in seen_inodes:
+            return 0
+        seen_inodes.add(inode)
+
+    blocks = getattr(file_stat, 'st_blocks', None)
+    return file_stat.st_size if blocks is None else blocks * 512
+
+
+def select_walker(directory: str, max_workers: Optional[int] = None,
+                  manifest: Optional[DirectoryManifest] = None) -> Iterator[Tuple[str, str, str, os.stat_result]]:
+    """
+    Pick the walker for the requested scan mode.
+    :param directory: Path to the directory to walk.
+    :param max_workers: Number of threads for a parallel scan. The scan runs serially when this is None.
+    :param manifest: Loaded manifest for an incremental scan. It takes precedence over max_workers.
+    :return: Iterator of tuples containing directory, relative file path, file name and stat result
+    """
+    if manifest is not None:
+        return manifest.walk_files(directory)
+    if max_workers is None:
+        return walk_files(directory)
+    return parallel_walk_files(directory, max_workers)
+
+
+def walk_files(directory: str) -> Iterator[Tuple[str, str, str, os.stat_result]]:
+    """
+    Walk the directory tree with os.scandir and yield every file in it.
+
+    Directories are visited depth-first in the same order as os.walk with sorted names,
+    using an explicit stack instead of recursion. Sizes come from the cached DirEntry.stat() result,
+    and relative paths are built by joining prefixes instead of calling os.path.relpath.
+    Directories that cannot be listed are skipped, like os.walk does, and symlinked directories are not followed.
+
+    :param directory: Path to the directory to walk.
+    :return: Iterator of tuples containing directory, relative file path, file name and stat result
+    """
+    sep = os.sep
+    # Each stack item holds the absolute directory path and its relative prefix ('' for the root)
+    stack: List[Tuple[str, str]] = [(directory, '')]
+
+    while stack:
+        current_dir, prefix = stack.pop()
+        try:
+            with os.scandir(current_dir) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            count('Scan Errors')
+            continue
+        count('Directories')
+
+        file_dir = prefix[:-1] if prefix else 'Root Directory'
+        subdirs: List[Tuple[str, str]] = []
+        for entry in entries:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    subdirs.append((entry.path, prefix + entry.name + sep))
+            else:
+                yield file_dir, prefix + entry.name, entry.name, entry.stat()
+
+        # Push in reverse so the first subdirectory is visited next
+        stack.extend(reversed(subdirs))
 
 
 def get_file_info(root: str, file: str, base_directory: str) -> Tuple[str, int, str, str]:
@@ -71,13 +423,17 @@ def append_file_info(file_data: Dict[str, List[Any]], file_info: Tuple[str, int,
     file_data['Full Path'].append(full_file_path)
 
 
+@instrument()
 def create_dataframe(file_data: Dict[str, List[Any]]) -> pd.DataFrame:
     """
     Create a pandas DataFrame from the collected file data.
     :param file_data: Dictionary containing lists of file information
-    :return: DataFrame with columns for Extension, Size, Directory, and Full Path
+    :return: DataFrame with columns for Extension, Size, Directory, and Full Path,
+            followed by Allocated Size and Modified Time when the file data has them
     """
-    return pd.DataFrame(file_data, columns=['Extension', 'Size', 'Directory', 'Full Path'])
+    columns = ['Extension', 'Size', 'Directory', 'Full Path']
+    columns.extend(column for column in ('Allocated Size', 'Modified Time') if column in file_data)
+    return pd.DataFrame(file_data, columns=columns)
 
 
 def get_file_extension(file: str) -> str:
@@ -3,7 +3,7 @@ import logging
 
 def get_logger(name: str, log_level: int = logging.WARNING) -> logging.Logger:
     """
-    Create and return a logger with a specific format: time | lvl | module | func | line.
+    Create and return a logger with a specific format: time | lvl | module | func | line | message.
 
     :param name: Name of the logger, typically the module name.
     :param log_level: Log level to set for the logger (default is logging.WARNING).
@@ -16,7 +16,7 @@ def get_logger(name: str, log_level: int = logging.WARNING) -> logging.Logger:
     logger.setLevel(log_level)
 
     # Define the log format
-    log_format = "%(asctime)s | %(levelname)s | %(module)s | %(funcName)s | %(lineno)d"
+    log_format = "%(asctime)s | %(levelname)s | %(module)s | %(funcName)s | %(lineno)d | %(message)s"
 
     # Create a formatter with the specified format
     formatter = logging.Formatter(log_format)
@@ -32,4 +32,5 @@ def get_logger(name: str, log_level: int = logging.WARNING) -> logging.Logger:
     return logger
 
 
-main_logger = get_logger(name='main', log_level=logging.WARNING)
+# INFO shows the run status: incremental scan counts, skipped analyses, the watched directory and the server address
+main_logger = get_logger(name='main', log_level=logging.INFO)
@@ -0,0 +1,171 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from hsr_size_analyzer.logger_config import main_logger
+from hsr_size_analyzer.metrics import count
+
+MANIFEST_VERSION = 2
+
+
+def get_manifest_path(db: str) -> str:
+    """
+    Get the path of the scan manifest stored next to an SQLite database.
+
+    :param db: Path of the SQLite database file.
+    :return: Path of the manifest file.
+    """
+    return os.path.splitext(db)[0] + '.manifest.json'
+
+
+class DirectoryManifest:
+    """
+    Persisted record of every scanned directory (mtime, inode, child count, subdirectories)
+    and every file in it (size, mtime, allocated blocks, device, inode, link count),
+    used to skip listing directories that did not change.
+
+    A directory's mtime changes when entries are created, deleted or renamed inside it,
+    which is how game patches replace files. A file rewritten in place keeps its directory's mtime,
+    so its cached row is reused until that directory changes.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: Path of the manifest file. It does not need to exist yet.
+        """
+        self.path = path
+        self.root: Optional[str] = None
+        self.directories: Dict[str, Dict[str, Any]] = {}
+        self.skipped = 0
+        self.rescanned = 0
+
+    def load(self) -> None:
+        """
+        Load the manifest file. A missing, unreadable or outdated manifest starts a full scan.
+
+        :return: None
+        """
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            main_logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+            return
+
+        if data.get('version') == MANIFEST_VERSION:
+            self.root = data['root']
+            self.directories = data['directories']
+
+    def save(self) -> None:
+        """
+        Write the manifest file, replacing the previous one atomically.
+
+        :return: None
+        """
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'root': self.root, 'directories': self.directories}, f,
+                      separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+    def walk_files(self, directory: str) -> Iterator[Tuple[str, str, str, os.stat_result]]:
+        """
+        Walk the directory tree like hsr_size_analyzer.walk_files,
+        listing only the directories whose mtime or inode changed since the manifest was written.
+        The manifest is updated in place, call save() once the walk is finished.
+
+        :param directory: Path to the directory to walk.
+        :return: Iterator of tuples containing directory, relative file path, file name and stat result
+        """
+        previous = self.directories if self.root == directory else {}
+        self.root = directory
+        self.directories = {}
+        self.skipped = 0
+        self.rescanned = 0
+
+        sep = os.sep
+        stack: List[Tuple[str, str]] = [(directory, '')]
+
+        while stack:
+            current_dir, prefix = stack.pop()
+            try:
+                dir_stat = os.stat(current_dir)
+            except OSError:
+                count('Scan Errors')
+                continue
+
+            cached = previous.get(prefix)
+            if cached is not None and cached['mtime'] == dir_stat.st_mtime_ns and cached['inode'] == dir_stat.st_ino:
+                self.skipped += 1
+                record = cached
+            else:
+                record = self._list_directory(current_dir, dir_stat)
+                if record is None:
+                    count('Scan Errors')
+                    continue
+                self.rescanned += 1
+            count('Directories')
+            self.directories[prefix] = record
+
+            file_dir = prefix[:-1] if prefix else 'Root Directory'
+            for name, *file_fields in record['files']:
+                yield file_dir, prefix + name, name, _cached_stat(*file_fields)
+
+            stack.extend((os.path.join(current_dir, name), prefix + name + sep)
+                         for name in reversed(record['subdirs']))
+
+    def _list_directory(self, current_dir: str, dir_stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        """
+        List one directory and build its manifest record.
+
+        :param current_dir: Absolute path of the directory.
+        :param dir_stat: Stat result of the directory, taken before it was listed.
+        :return: Manifest record of the directory, or None if it cannot be listed
+        """
+        try:
+            with os.scandir(current_dir) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            return None
+
+        subdirs: List[str] = []
+        files: List[List[Any]] = []
+        for entry in entries:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    subdirs.append(entry.name)
+            else:
+                file_stat = entry.stat()
+                files.append([entry.name, file_stat.st_size, file_stat.st_mtime_ns,
+                              getattr(file_stat, 'st_blocks', None), file_stat.st_dev, file_stat.st_ino,
+                              file_stat.st_nlink])
+
+        return {
+            'mtime': dir_stat.st_mtime_ns,
+            'inode': dir_stat.st_ino,
+            'child_count': len(entries),
+            'subdirs': subdirs,
+            'files': files,
+        }
+
+
+def _cached_stat(size: int, mtime_ns: int, blocks: Optional[int], dev: int, ino: int,
+                 nlink: int) -> os.stat_result:
+    """
+    Build a stat result carrying the cached fields of a file.
+
+    :param size: File size in bytes.
+    :param mtime_ns: File modification time in nanoseconds.
+    :param blocks: Number of allocated 512-byte blocks, None where the platform does not report it.
+    :param dev: Device of the file.
+    :param ino: Inode of the file.
+    :param nlink: Number of hard links to the file.
+    :return: Stat result with the other fields set to 0
+    """
+    mtime = mtime_ns // 1_000_000_000
+    extra_fields = {'st_mtime_ns': mtime_ns}
+    if blocks is not None:
+        extra_fields['st_blocks'] = blocks
+    return os.stat_result((0, ino, dev, nlink, 0, 0, size, 0, mtime, 0), extra_fields)
@@ -0,0 +1,224 @@
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+from functools import wraps
+from typing import Any, Callable, ContextManager, Dict, List, Optional, TypeVar
+
+import pandas as pd
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+# Counters shown as columns of the HsrRunMetrics table, in this order, before any other counter
+COUNTERS = ('Files', 'Directories', 'Bytes', 'Scan Errors', 'Rows')
+# Returned by span() while the metrics are disabled, so an instrumented stage costs one attribute check
+NO_SPAN = nullcontext()
+
+
+class Span:
+    """
+    One timed stage of a run, with the counters recorded while it was open.
+    """
+    __slots__ = ('name', 'parent', 'depth', 'start', 'wall_time', 'cpu_time', 'peak_memory', 'counters',
+                 '_wall_start', '_cpu_start')
+
+    def __init__(self, name: str, parent: Optional['Span'], start: float) -> None:
+        self.name = name
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.start = start
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_memory: Optional[int] = None
+        self.counters: Dict[str, int] = {}
+
+
+class SpanContext:
+    """
+    Context manager opening a span on a RunMetrics recorder.
+    """
+    __slots__ = ('run_metrics', 'name', 'span')
+
+    def __init__(self, run_metrics: 'RunMetrics', name: str) -> None:
+        self.run_metrics = run_metrics
+        self.name = name
+        self.span: Optional[Span] = None
+
+    def __enter__(self) -> Span:
+        self.span = self.run_metrics.open_span(self.name)
+        return self.span
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.run_metrics.close_span(self.span)
+
+
+class RunMetrics:
+    """
+    Recorder of the wall time, CPU time, peak traced memory and counters of each stage of a run.
+
+    Spans nest: a span opened while another is open becomes its child, and counters are added to every open span,
+    so a stage's counters include those of its children. Worker threads count into the spans of the thread
+    that opened them. CPU time is the CPU time of the whole process, worker threads included.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.trace_memory = False
+        self.spans: List[Span] = []
+        self._open: List[Span] = []
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+        self._run_start = 0.0
+
+    def enable(self, trace_memory: bool = False) -> None:
+        """
+        Start recording spans, discarding those of a previous run.
+
+        :param trace_memory: Record the peak memory of each span with tracemalloc.
+                            Tracing makes a scan several times slower, so the timings of such a run are inflated.
+        :return: None
+        """
+        self.reset()
+        self.enabled = True
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._run_start = time.perf_counter()
+
+    def disable(self) -> None:
+        """
+        Stop recording. The recorded spans are kept, and tracemalloc is stopped if enable() started it.
+
+        :return: None
+        """
+        self.enabled = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def reset(self) -> None:
+        """
+        Discard the recorded spans.
+
+        :return: None
+        """
+        self.spans = []
+        self._open = []
+
+    def span(self, name: str) -> ContextManager[Any]:
+        """
+        :param name: Name of the stage.
+        :return: Context manager timing the stage, or a no-op context manager while disabled
+        """
+        return SpanContext(self, name) if self.enabled else NO_SPAN
+
+    def open_span(self, name: str) -> Span:
+        parent = self._open[-1] if self._open else None
+        span = Span(name, parent, time.perf_counter() - self._run_start)
+        if self.trace_memory and tracemalloc.is_tracing():
+            # The traced peak is process-wide, so the parent keeps the peak reached so far before it is reset
+            peak = tracemalloc.get_traced_memory()[1]
+            for open_span in self._open:
+                open_span.peak_memory = max(open_span.peak_memory or 0, peak)
+            tracemalloc.reset_peak()
+        self.spans.append(span)
+        self._open.append(span)
+        span._cpu_start = time.process_time()
+        span._wall_start = time.perf_counter()
+        return span
+
+    def close_span(self, span: Span) -> None:
+        span.wall_time = time.perf_counter() - span._wall_start
+        span.cpu_time = time.process_time() - span._cpu_start
+        if self.trace_memory and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            for open_span in self._open:
+                open_span.peak_memory = max(open_span.peak_memory or 0, peak)
+        # Spans close in reverse order of opening, unless a generator was abandoned with a span open
+        if span in self._open:
+            del self._open[self._open.index(span):]
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Add to a counter of every open span. Does nothing while disabled or when no span is open.
+
+        :param name: Name of the counter, e.g. one of COUNTERS.
+        :param amount: Amount to add.
+        :return: None
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            for open_span in self._open:
+                open_span.counters[name] = open_span.counters.get(name, 0) + amount
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        :return: The HsrRunMetrics table: one row per span in the order they were opened, with its Stage,
+                Parent Stage, Depth, Start Time (seconds since enable()), Wall Time and CPU Time in seconds,
+                Peak Memory in bytes (empty without tracemalloc), and one column per counter
+        """
+        counter_names = list(COUNTERS)
+        for span in self.spans:
+            counter_names.extend(name for name in span.counters if name not in counter_names)
+
+        rows = []
+        for span in self.spans:
+            rows.append([span.name, span.parent.name if span.parent else None, span.depth, span.start,
+                         span.wall_time, span.cpu_time, span.peak_memory]
+                        + [span.counters.get(name) for name in counter_names])
+        columns = ['Stage', 'Parent Stage', 'Depth', 'Start Time', 'Wall Time', 'CPU Time', 'Peak Memory']
+        df = pd.DataFrame(rows, columns=columns + counter_names)
+        df['Peak Memory'] = df['Peak Memory'].astype('Int64')
+        df[counter_names] = df[counter_names].astype('Int64')
+        return df
+
+
+# Recorder used by the instrumented stages of the package
+run_metrics = RunMetrics()
+
+
+def span(name: str) -> ContextManager[Any]:
+    """
+    Time a stage with the package's recorder, see RunMetrics.span.
+
+    :param name: Name of the stage.
+    :return: Context manager timing the stage, or a no-op context manager while the metrics are disabled
+    """
+    return SpanContext(run_metrics, name) if run_metrics.enabled else NO_SPAN
+
+
+def instrument(name: Optional[str] = None) -> Callable[[F], F]:
+    """
+    Decorator timing every call of a function as a span of the package's recorder.
+    While the metrics are disabled, a call costs one attribute check on top of the function itself.
+
+    :param name: Name of the stage (default is the function name).
+    :return: The decorator
+    """
+    def decorator(func: F) -> F:
+        stage = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not run_metrics.enabled:
+                return func(*args, **kwargs)
+            with SpanContext(run_metrics, stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, amount: int = 1) -> None:
+    """
+    Add to a counter of the open spans of the package's recorder, see RunMetrics.count.
+
+    :param name: Name of the counter, e.g. one of COUNTERS.
+    :param amount: Amount to add.
+    :return: None
+    """
+    if run_metrics.enabled:
+        run_metrics.count(name, amount)
@@ -0,0 +1,138 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Set, Tuple
+
+from hsr_size_analyzer.metrics import count
+
+# Directories with more files than this have their stat calls split into chunks of this size,
+# so one huge folder such as StarRail_Data/StreamingAssets is spread over all workers.
+SPLIT_THRESHOLD = 256
+# No new directory listing is started while this many stat results wait to be yielded
+MAX_BUFFERED_FILES = 65536
+
+
+def list_directory(current_dir: str, prefix: str) -> Tuple[str, List[Tuple[str, str]], List[os.DirEntry],
+                                                           List[Tuple[str, os.stat_result]]]:
+    """
+    List one directory and split its entries into subdirectories and files.
+    Files are stat-ed right away unless there are more of them than SPLIT_THRESHOLD.
+
+    :param current_dir: Absolute path of the directory to list.
+    :param prefix: Relative prefix of the directory ('' for the root directory).
+    :return: Tuple containing the prefix, the subdirectories to walk,
+            the file entries left to stat and the stat results of the files already stat-ed
+    """
+    try:
+        with os.scandir(current_dir) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        count('Scan Errors')
+        return prefix, [], [], []
+    count('Directories')
+
+    subdirs: List[Tuple[str, str]] = []
+    files: List[os.DirEntry] = []
+    for entry in entries:
+        if entry.is_dir():
+            if not entry.is_symlink():
+                subdirs.append((entry.path, prefix + entry.name + os.sep))
+        else:
+            files.append(entry)
+
+    if len(files) <= SPLIT_THRESHOLD:
+        return prefix, subdirs, [], stat_files(files)
+    return prefix, subdirs, files, []
+
+
+def stat_files(entries: List[os.DirEntry]) -> List[Tuple[str, os.stat_result]]:
+    """
+    Stat a chunk of file entries.
+
+    :param entries: File entries from os.scandir.
+    :return: List of tuples containing the file name and its stat result
+    """
+    return [(entry.name, entry.stat()) for entry in entries]
+
+
+def parallel_walk_files(directory: str, max_workers: int) -> Iterator[Tuple[str, str, str, os.stat_result]]:
+    """
+    Walk the directory tree on a bounded thread pool and yield every file in it.
+
+    Every directory listing is its own task, and each listed subdirectory becomes a new task,
+    so idle workers pick up whichever part of the tree is still pending.
+    Directories with many files are split on demand into chunks of stat calls.
+    Results are yielded in the same depth-first, sorted-name order as walk_files, so the output is deterministic.
+    A directory is yielded as soon as it and the directories before it are done, and no new listing is started
+    while MAX_BUFFERED_FILES stat results wait to be yielded, so memory stays bounded however large the tree is.
+
+    :param directory: Path to the directory to walk.
+    :param max_workers: Maximum number of worker threads.
+    :return: Iterator of tuples containing directory, relative file path, file name and stat result
+    """
+    subdirs_by_prefix: Dict[str, List[str]] = {}
+    chunks_by_prefix: Dict[str, List[List[Tuple[str, os.stat_result]]]] = {}
+    chunks_left: Dict[str, int] = {}
+    # Directories found but not listed yet, by prefix, and the prefixes as a stack in depth-first order
+    unlisted: Dict[str, str] = {'': directory}
+    unlisted_order: List[str] = ['']
+    buffered_files = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: Set[Future] = set()
+        chunk_slots: Dict[Future, Tuple[str, int]] = {}
+
+        def submit_listing(prefix: str) -> None:
+            pending.add(executor.submit(list_directory, unlisted.pop(prefix), prefix))
+
+        # Prefixes left to yield, the next one on top
+        stack = ['']
+        while stack:
+            prefix = stack[-1]
+            if prefix in chunks_left and not chunks_left[prefix]:
+                stack.pop()
+                file_dir = prefix[:-1] if prefix else 'Root Directory'
+                for chunk in chunks_by_prefix.pop(prefix):
+                    buffered_files -= len(chunk)
+                    for name, file_stat in chunk:
+                        yield file_dir, prefix + name, name, file_stat
+                del chunks_left[prefix]
+                stack.extend(reversed(subdirs_by_prefix.pop(prefix)))
+                continue
+
+            # The directory to yield next is listed even when the buffer is full, so the walk always progresses
+            if prefix in unlisted:
+                submit_listing(prefix)
+            while unlisted_order and len(pending) < 2 * max_workers and buffered_files < MAX_BUFFERED_FILES:
+                next_prefix = unlisted_order.pop()
+                if next_prefix in unlisted:
+                    submit_listing(next_prefix)
+
+            done, pending_left = wait(pending, return_when=FIRST_COMPLETED)
+            pending.intersection_update(pending_left)
+            for future in done:
+                if future in chunk_slots:
+                    chunk_prefix, index = chunk_slots.pop(future)
+                    chunks_by_prefix[chunk_prefix][index] = future.result()
+                    chunks_left[chunk_prefix] -= 1
+                    continue
+
+                listed_prefix, subdirs, files, file_stats = future.result()
+                subdirs_by_prefix[listed_prefix] = [sub_prefix for _, sub_prefix in subdirs]
+                for sub_dir, sub_prefix in subdirs:
+                    unlisted[sub_prefix] = sub_dir
+                unlisted_order.extend(sub_prefix for _, sub_prefix in reversed(subdirs))
+                buffered_files += len(files) + len(file_stats)
+
+                if not files:
+                    chunks_by_prefix[listed_prefix] = [file_stats]
+                    chunks_left[listed_prefix] = 0
+                    continue
+
+                chunk_count = (len(files) + SPLIT_THRESHOLD - 1) // SPLIT_THRESHOLD
+                chunks_by_prefix[listed_prefix] = [[] for _ in range(chunk_count)]
+                chunks_left[listed_prefix] = chunk_count
+                for index in range(chunk_count):
+                    chunk = files[index * SPLIT_THRESHOLD:(index + 1) * SPLIT_THRESHOLD]
+                    chunk_future = executor.submit(stat_files, chunk)
+                    chunk_slots[chunk_future] = (listed_prefix, index)
+                    pending.add(chunk_future)
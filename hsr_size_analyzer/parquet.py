@@ -0,0 +1,156 @@
+import hashlib
+import os
+import re
+import shutil
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+import duckdb
+import pandas as pd
+
+from hsr_size_analyzer.analysis import AnalysisSession, create_grouping_sets_query, create_size_histogram_query, \
+    get_grouping_id, quote
+from hsr_size_analyzer.hsr_size_analyzer import add_full_path
+from hsr_size_analyzer.logger_config import main_logger
+from hsr_size_analyzer.metrics import count, instrument, span
+from hsr_size_analyzer.size_trie import build_size_trie
+from hsr_size_analyzer.sqlite import get_dimensions
+from hsr_size_analyzer.top_n import find_top_sizes
+
+# DuckDB dictionary-encodes low-cardinality columns such as Extension and Directory on its own
+PARQUET_OPTIONS = 'FORMAT PARQUET, COMPRESSION ZSTD'
+# Proportion table of each dimension, as in the SQLite database
+PROPORTION_TABLES = {'Extension': 'HsrSizeDist', 'Directory': 'HsrDirDist', 'Category': 'HsrCategoryDist'}
+# Characters of an install label replaced in its partition folder name
+UNSAFE_PARTITION_CHARACTERS = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+def get_parquet_path(db: str) -> str:
+    """
+    Get the path of the Parquet export stored next to an SQLite database.
+
+    :param db: Path of the SQLite database file.
+    :return: Path of the directory with one Parquet dataset per table.
+    """
+    return os.path.splitext(db)[0] + '_parquet'
+
+
+def get_next_snapshot(directory: str) -> int:
+    """
+    :param directory: Directory of the Parquet export.
+    :return: One more than the largest Snapshot partition of the exported HsrSizeAnalysis, 1 for a new export
+    """
+    try:
+        names = os.listdir(os.path.join(directory, 'HsrSizeAnalysis'))
+    except FileNotFoundError:
+        return 1
+    snapshots = [int(name.split('=', 1)[1]) for name in names
+                 if name.startswith('Snapshot=') and name.split('=', 1)[1].isdigit()]
+    return max(snapshots, default=0) + 1
+
+
+def get_partition_labels(labels: Iterable[str]) -> Dict[str, str]:
+    """
+    Turn install labels, which are full paths when install folder names repeat, into Install partition values
+    that are plain folder names. Labels that become the same name get a hash of the label appended.
+
+    :param labels: Install labels.
+    :return: Dictionary mapping each label to its partition value
+    """
+    names = {label: UNSAFE_PARTITION_CHARACTERS.sub('_', label).strip('_.') or '_' for label in set(labels)}
+    counts = Counter(names.values())
+    return {label: name if counts[name] == 1 else f'{name}_{hashlib.blake2b(label.encode(), digest_size=4).hexdigest()}'
+            for label, name in names.items()}
+
+
+def copy_to_parquet(con: duckdb.DuckDBPyConnection, query: str, path: str, snapshot: int) -> int:
+    """
+    Write the result of a DuckDB query as a Parquet dataset, hive-partitioned by Snapshot,
+    and by Install when the result has that column. The rows go from DuckDB to the file without pandas.
+    Partitions of other snapshots are kept, the partition of a snapshot written again is replaced as a whole.
+
+    :param con: DuckDB connection the query runs on.
+    :param query: SQL query.
+    :param path: Directory of the dataset.
+    :param snapshot: Value of the Snapshot partition column.
+    :return: Number of rows written
+    """
+    query = query.strip().rstrip(';')
+    partition_columns = ['Snapshot'] + (['Install'] if 'Install' in con.sql(query).columns else [])
+    partition_by = ', '.join(quote(column) for column in partition_columns)
+    target = path.replace("'", "''")
+    with span(f'copy_to_parquet {os.path.basename(path)}'):
+        # OVERWRITE_OR_IGNORE would keep the files and Install folders of an earlier write the new one does not replace
+        partition = os.path.join(path, f'Snapshot={int(snapshot)}')
+        if os.path.isdir(partition):
+            shutil.rmtree(partition)
+        rows = con.execute(f"COPY (SELECT *, {int(snapshot)} AS Snapshot FROM ({query})) TO '{target}' "
+                           f"({PARQUET_OPTIONS}, PARTITION_BY ({partition_by}), OVERWRITE_OR_IGNORE)").fetchone()[0]
+        count('Rows', rows)
+    return rows
+
+
+@instrument()
+def save_to_parquet(df: pd.DataFrame, directory: str = 'hsr_size_analyzer_parquet',
+                    extra_tables: Optional[Dict[str, pd.DataFrame]] = None, snapshot: Optional[int] = None) -> int:
+    """
+    Save the scan and its analysis as Parquet, one dataset per table named as in the SQLite database.
+    Every run adds a Snapshot partition, and the tables of several installs are partitioned by Install as well.
+    Size columns keep their integer type, which the SQLite database stores as real.
+    Install labels become folder names, see get_partition_labels.
+
+    The scan is registered in DuckDB once. The proportion and histogram queries are copied to Parquet straight
+    from DuckDB, the tables computed in Python (size trie, largest files and directories, extra tables) are read
+    by DuckDB from their DataFrames.
+
+    :param df: DataFrame from get_file_distribution or get_installs_distribution.
+    :param directory: Directory of the Parquet export (default is 'hsr_size_analyzer_parquet').
+    :param extra_tables: Additional results to save, keyed by table name.
+    :param snapshot: Snapshot partition to write, e.g. the id from history.save_snapshot_to_db.
+                    The next one after the largest exported snapshot when None.
+    :return: The snapshot written
+    """
+    if snapshot is None:
+        snapshot = get_next_snapshot(directory)
+    extra_tables = {'HsrSizeAnalysis': df, **(extra_tables or {})}
+    labelled = [table_name for table_name, table_df in extra_tables.items() if 'Install' in table_df.columns]
+    partition_labels = get_partition_labels(label for table_name in labelled
+                                            for label in extra_tables[table_name]['Install'].astype(str).unique())
+    for table_name in labelled:
+        table_df = extra_tables[table_name]
+        extra_tables[table_name] = table_df.assign(Install=table_df['Install'].astype(str).map(partition_labels))
+    df = extra_tables.pop('HsrSizeAnalysis')
+    dimensions = get_dimensions(df)
+    top_files_df, top_dirs_df = find_top_sizes(df)
+    tables = {'HsrDirTree': build_size_trie(df).to_dataframe(), 'HsrTopFiles': top_files_df,
+              'HsrTopDirs': top_dirs_df, **extra_tables}
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with AnalysisSession(add_full_path(df)) as session:
+            con = session.con
+            copy_to_parquet(con, 'SELECT * FROM df', os.path.join(directory, 'HsrSizeAnalysis'), snapshot)
+
+            allocated = 'Allocated Size' in df.columns
+            partition_column = 'Install' if 'Install' in df.columns else None
+            con.execute(f'CREATE TEMP TABLE proportions AS '
+                        f'{create_grouping_sets_query(dimensions, allocated, partition_column)}')
+            key_columns = [partition_column] if partition_column else []
+            proportion_columns = ['Proportion', 'Allocated Proportion'] if allocated else ['Proportion']
+            for dimension in dimensions:
+                columns = ', '.join(quote(column) for column in key_columns + [dimension] + proportion_columns)
+                copy_to_parquet(con, f'SELECT {columns} FROM proportions '
+                                     f'WHERE grouping_id = {get_grouping_id(dimensions, dimension)}',
+                                os.path.join(directory, PROPORTION_TABLES[dimension]), snapshot)
+            copy_to_parquet(con, create_size_histogram_query(['Extension', 'Directory'], partition_column),
+                            os.path.join(directory, 'HsrSizeHistogram'), snapshot)
+
+            for table_name, table_df in tables.items():
+                con.register('result', table_df)
+                copy_to_parquet(con, 'SELECT * FROM result', os.path.join(directory, table_name), snapshot)
+                con.unregister('result')
+    except duckdb.Error as e:
+        main_logger.error(f"DuckDB error during saving to Parquet in {directory}: {e}", exc_info=True)
+    except Exception as e:
+        main_logger.error(f"Unexpected error during saving to Parquet in {directory}: {e}", exc_info=True)
+    return snapshot
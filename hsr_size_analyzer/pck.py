@@ -0,0 +1,235 @@
+import json
+import mmap
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from hsr_size_analyzer.hsr_size_analyzer import add_full_path
+from hsr_size_analyzer.logger_config import main_logger
+
+PCK_MAGIC = b'AKPK'
+PCK_CACHE_VERSION = 1
+# Lookup tables of a Wwise file package, in the order they follow the language map
+SECTIONS = ('Sound Bank', 'Streamed File', 'External')
+
+
+def get_pck_cache_path(db: str) -> str:
+    """
+    Get the path of the .pck inspection cache stored next to an SQLite database.
+
+    :param db: Path of the SQLite database file.
+    :return: Path of the cache file.
+    """
+    return os.path.splitext(db)[0] + '.pck-cache.json'
+
+
+def read_language_map(data: memoryview, byteorder: str) -> Dict[int, str]:
+    """
+    Read the language map of a file package: a count, then (string offset, language id) pairs,
+    then the language names as null-terminated UTF-16 or UTF-8 strings, offsets being relative to the map.
+
+    :param data: Bytes of the language map.
+    :param byteorder: '<' or '>' for the package's byte order.
+    :return: Dictionary mapping language ids to language names
+    """
+    (count,) = struct.unpack_from(byteorder + 'I', data, 0)
+    languages = {}
+    for string_offset, language_id in struct.iter_unpack(byteorder + 'II', data[4:4 + count * 8]):
+        raw = bytes(data[string_offset:string_offset + 128])
+        # Older packages store the names in UTF-16, where ASCII names have every other byte zero
+        if len(raw) > 1 and raw[1 if byteorder == '<' else 0] == 0:
+            encoding = 'utf-16-le' if byteorder == '<' else 'utf-16-be'
+            name = raw.decode(encoding, errors='replace').split('\0', 1)[0]
+        else:
+            name = raw.split(b'\0', 1)[0].decode('utf-8', errors='replace')
+        languages[language_id] = name
+    return languages
+
+
+def read_file_table(data: memoryview, byteorder: str, section: str) -> List[List[Any]]:
+    """
+    Read a lookup table of a file package: a count, then one entry per file with its id, block size,
+    size, start block and language id. File ids are 32 bits, or 64 bits in newer packages.
+
+    :param data: Bytes of the lookup table.
+    :param byteorder: '<' or '>' for the package's byte order.
+    :param section: Name of the table, one of SECTIONS.
+    :return: List of [section, file id, language id, size, offset] entries
+    """
+    if len(data) < 4:
+        return []
+    (count,) = struct.unpack_from(byteorder + 'I', data, 0)
+    if count == 0:
+        return []
+
+    entry_size = (len(data) - 4) // count
+    entry_format = byteorder + ('QIIII' if entry_size == 24 else 'IIIII')
+    entries = []
+    for file_id, block_size, size, start_block, language_id in struct.iter_unpack(
+            entry_format, data[4:4 + count * struct.calcsize(entry_format)]):
+        entries.append([section, file_id, language_id, size, start_block * max(block_size, 1)])
+    return entries
+
+
+def parse_pck(file_path: str) -> Dict[str, Any]:
+    """
+    Parse the header and lookup tables of a Wwise file package (AKPK) through a memory map.
+    Only the header pages are read, the audio payload is never touched.
+
+    :param file_path: Path to the .pck file.
+    :return: Dictionary with the languages, mapping language ids to names,
+            and the files, as [section, file id, language id, size, offset] entries
+    """
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if mapped[:4] != PCK_MAGIC:
+            raise ValueError(f"{file_path} is not a Wwise file package")
+
+        # The version is 1, which tells the byte order of the package
+        byteorder = '<' if struct.unpack_from('<I', mapped, 8)[0] < 0x10000 else '>'
+        header_size, _, language_map_size, bank_table_size, stream_table_size = \
+            struct.unpack_from(byteorder + 'IIIII', mapped, 4)
+        table_sizes = [bank_table_size, stream_table_size]
+        offset = 24
+        # Newer packages add a fourth size, for the table of external files, which the header size accounts for
+        (external_table_size,) = struct.unpack_from(byteorder + 'I', mapped, offset)
+        if header_size == 20 + language_map_size + bank_table_size + stream_table_size + external_table_size:
+            table_sizes.append(external_table_size)
+            offset += 4
+        end = offset + language_map_size + sum(table_sizes)
+        if end > len(mapped):
+            raise ValueError(f"{file_path} has a truncated header")
+
+        header = memoryview(mapped[offset:end])
+
+    languages = read_language_map(header[:language_map_size], byteorder)
+    files = []
+    start = language_map_size
+    for section, table_size in zip(SECTIONS, table_sizes):
+        files.extend(read_file_table(header[start:start + table_size], byteorder, section))
+        start += table_size
+    return {'languages': languages, 'files': files}
+
+
+class PckCache:
+    """
+    Persisted parse results of .pck files, reused while a file keeps its inode, size and mtime.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        """
+        :param path: Path of the cache file. It does not need to exist yet. None keeps the cache in memory only.
+        """
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+    def load(self) -> None:
+        """
+        Load the cache file. A missing, unreadable or outdated cache is ignored.
+
+        :return: None
+        """
+        if self.path is None:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            main_logger.warning(f"Ignoring unreadable .pck cache {self.path}: {e}")
+            return
+
+        if data.get('version') == PCK_CACHE_VERSION:
+            self.files = data['files']
+
+    def save(self) -> None:
+        """
+        Write the cache file, replacing the previous one atomically.
+
+        :return: None
+        """
+        if self.path is None:
+            return
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': PCK_CACHE_VERSION, 'files': self.files}, f, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+    def get(self, full_path: str, file_stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        """
+        :param full_path: Path of the file relative to the scanned directory.
+        :param file_stat: Current stat result of the file.
+        :return: The cached parse result, or None if the file is not cached or changed since
+        """
+        cached = self.files.get(full_path)
+        if cached is not None and cached['key'] == [file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns]:
+            return cached['pck']
+        return None
+
+    def put(self, full_path: str, file_stat: os.stat_result, pck: Dict[str, Any]) -> None:
+        """
+        :param full_path: Path of the file relative to the scanned directory.
+        :param file_stat: Stat result of the file when it was parsed.
+        :param pck: Parse result from parse_pck.
+        :return: None
+        """
+        self.files[full_path] = {'key': [file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns], 'pck': pck}
+
+
+def inspect_pck_files(df: pd.DataFrame, directory: str, max_workers: Optional[int] = None,
+                      cache: Optional[str] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Inspect every .pck file of a scan result on a thread pool and attribute its bytes to languages and sound banks.
+
+    :param df: DataFrame from get_file_distribution for the directory.
+    :param directory: The directory that was scanned.
+    :param max_workers: Number of threads parsing files (default is the ThreadPoolExecutor default).
+    :param cache: Path of the cache file, see get_pck_cache_path. None parses every file.
+    :return: A tuple of two DataFrames joinable on Full Path: the HsrPckLanguages table with the File Count and Size
+            per Section and language of each package, and the HsrPckBanks table with one row per sound bank.
+    """
+    df = add_full_path(df)
+    full_paths = df.loc[df['Extension'] == '.pck', 'Full Path'].tolist()
+    pck_cache = PckCache(cache)
+    pck_cache.load()
+
+    def inspect(full_path: str) -> Optional[Dict[str, Any]]:
+        path = os.path.join(directory, full_path)
+        try:
+            file_stat = os.stat(path)
+            pck = pck_cache.get(full_path, file_stat)
+            if pck is None:
+                pck = parse_pck(path)
+                # JSON object keys are strings, so the parsed result is stored as it will be read back
+                pck['languages'] = {str(language_id): name for language_id, name in pck['languages'].items()}
+                pck_cache.put(full_path, file_stat, pck)
+            return pck
+        except (OSError, ValueError, struct.error) as e:
+            main_logger.warning(f"Cannot inspect {path}: {e}")
+            return None
+
+    rows = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for full_path, pck in zip(full_paths, executor.map(inspect, full_paths)):
+            if pck is None:
+                continue
+            for section, file_id, language_id, size, offset in pck['files']:
+                rows.append((full_path, section, file_id, language_id, pck['languages'].get(str(language_id)),
+                             size, offset))
+
+    # Drop the files that are gone, so the cache does not grow with every patch
+    pck_cache.files = {full_path: pck_cache.files[full_path] for full_path in full_paths
+                       if full_path in pck_cache.files}
+    pck_cache.save()
+
+    files = pd.DataFrame(rows, columns=['Full Path', 'Section', 'File Id', 'Language Id', 'Language', 'Size',
+                                        'Offset'])
+    languages_df = (files.groupby(['Full Path', 'Section', 'Language Id'], sort=False, dropna=False)
+                    .agg(**{'Language': ('Language', 'first'), 'File Count': ('File Id', 'size'),
+                            'Size': ('Size', 'sum')})
+                    .reset_index())
+    banks_df = files.loc[files['Section'] == 'Sound Bank'].drop(columns='Section').reset_index(drop=True)
+    return languages_df, banks_df
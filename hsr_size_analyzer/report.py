@@ -0,0 +1,91 @@
+import numbers
+import os
+import sqlite3
+from typing import Any, Dict, List, Sequence, Tuple
+from urllib.parse import quote
+
+# Reports only use the standard library, so they start without loading pandas or DuckDB.
+# Report name -> table and ORDER BY clause
+REPORTS: Dict[str, Tuple[str, str]] = {
+    'extensions': ('HsrSizeDist', '"Proportion" DESC'),
+    'directories': ('HsrDirDist', '"Proportion" DESC'),
+    'categories': ('HsrCategoryDist', '"Proportion" DESC'),
+    'top-files': ('HsrTopFiles', '"Rank"'),
+    'top-dirs': ('HsrTopDirs', '"Rank"'),
+    'snapshots': ('HsrSnapshots', '"Snapshot Id" DESC'),
+    'metrics': ('HsrRunMetrics', 'rowid'),
+}
+
+
+def connect_read_only(db: str) -> sqlite3.Connection:
+    """
+    Open an existing SQLite database read-only.
+
+    :param db: Path of the SQLite database file.
+    :return: Connection that cannot create or change the database
+    """
+    return sqlite3.connect(f'file:{quote(os.path.abspath(db))}?mode=ro', uri=True)
+
+
+def query_report(db: str, name: str, limit: int = 20) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+    """
+    Read the first rows of a result table.
+
+    :param db: Path of the SQLite database file.
+    :param name: Name of the report, one of REPORTS.
+    :param limit: Maximum number of rows.
+    :return: Column names, without the index column write_to_sqlite adds, and rows
+    """
+    table_name, order_by = REPORTS[name]
+    with connect_read_only(db) as conn:
+        cursor = conn.execute(f'SELECT * FROM "{table_name}" ORDER BY {order_by} LIMIT ?', (limit,))
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+    if 'index' in columns:
+        position = columns.index('index')
+        del columns[position]
+        rows = [row[:position] + row[position + 1:] for row in rows]
+    return columns, rows
+
+
+def query_summary(db: str) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+    """
+    :param db: Path of the SQLite database file.
+    :return: Column names and one row with the number of files and their total and allocated size
+    """
+    with connect_read_only(db) as conn:
+        columns = [row[1] for row in conn.execute('PRAGMA table_info("HsrSizeAnalysis")')]
+        allocated = 'CAST(SUM("Allocated Size") AS INTEGER)' if 'Allocated Size' in columns else 'NULL'
+        row = conn.execute(f'SELECT COUNT(*), CAST(SUM("Size") AS INTEGER), {allocated} '
+                           f'FROM "HsrSizeAnalysis"').fetchone()
+    return ['File Count', 'Total Size', 'Allocated Size'], [row]
+
+
+def format_value(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return f'{value:.2f}'
+    return str(value)
+
+
+def format_table(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> str:
+    """
+    Format rows as a plain text table, numbers aligned right.
+
+    :param columns: Column names.
+    :param rows: Rows of values.
+    :return: The table, one line per row after the header
+    """
+    cells = [[format_value(value) for value in row] for row in rows]
+    widths = [max([len(column)] + [len(row[i]) for row in cells]) for i, column in enumerate(columns)]
+    numeric = [bool(rows) and all(isinstance(row[i], numbers.Number) or row[i] is None for row in rows)
+               for i in range(len(columns))]
+
+    def format_line(values: Sequence[str]) -> str:
+        return '  '.join(value.rjust(width) if is_numeric else value.ljust(width)
+                         for value, width, is_numeric in zip(values, widths, numeric)).rstrip()
+
+    lines = [format_line(columns), format_line(['-' * width for width in widths])]
+    lines.extend(format_line(row) for row in cells)
+    return '\n'.join(lines)
@@ -0,0 +1,365 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from hsr_size_analyzer.analysis import MEASURES, AnalysisSession
+from hsr_size_analyzer.diff import diff_snapshots
+from hsr_size_analyzer.history import load_history_snapshot
+from hsr_size_analyzer.logger_config import main_logger
+
+# Rows of the file diff returned by /diff unless the request asks for another limit
+DIFF_LIMIT = 100
+# Measures returned by /aggregate unless the request asks for others
+AGGREGATE_MEASURES = ['sum', 'count', 'proportion']
+# Cached responses kept per version of the database, so varying query strings cannot grow the cache without bound
+MAX_CACHED_RESPONSES = 256
+
+
+class QueryError(Exception):
+    """
+    A request that cannot be answered, with the HTTP status to answer it with.
+    """
+
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def to_json(df: pd.DataFrame) -> str:
+    """
+    :param df: Table read from the database.
+    :return: JSON array with one object per row, without the index column write_to_sqlite adds
+    """
+    return df.drop(columns='index', errors='ignore').to_json(orient='records')
+
+
+def read_table(conn: sqlite3.Connection, table_name: str) -> pd.DataFrame:
+    """
+    :param conn: Connection to the SQLite database.
+    :param table_name: Name of a result table.
+    :return: The whole table
+    """
+    try:
+        return pd.read_sql_query(f'SELECT * FROM "{table_name}"', conn)
+    except pd.errors.DatabaseError:
+        raise QueryError(HTTPStatus.NOT_FOUND, f"{table_name} is not in the database, run the analysis first")
+
+
+def get_int_param(params: Dict[str, List[str]], name: str) -> Optional[int]:
+    values = params.get(name)
+    if not values:
+        return None
+    try:
+        return int(values[-1])
+    except ValueError:
+        raise QueryError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+
+
+def get_list_param(params: Dict[str, List[str]], name: str) -> List[str]:
+    """
+    :param params: Parsed query string.
+    :param name: Name of the parameter, given once with comma-separated values or repeated.
+    :return: All values of the parameter in order, empty when it is not given
+    """
+    return [value.strip() for values in params.get(name, []) for value in values.split(',') if value.strip()]
+
+
+def get_extensions(db: str, params: Dict[str, List[str]]) -> str:
+    """/extensions: the HsrSizeDist table, the share of each file extension."""
+    with sqlite3.connect(db) as conn:
+        return to_json(read_table(conn, 'HsrSizeDist'))
+
+
+def get_directories(db: str, params: Dict[str, List[str]]) -> str:
+    """/directories: the HsrDirDist table, the share of each directory."""
+    with sqlite3.connect(db) as conn:
+        return to_json(read_table(conn, 'HsrDirDist'))
+
+
+def get_top(db: str, params: Dict[str, List[str]]) -> str:
+    """/top: the largest files and directories from HsrTopFiles and HsrTopDirs."""
+    with sqlite3.connect(db) as conn:
+        return f'{{"files":{to_json(read_table(conn, "HsrTopFiles"))},' \
+               f'"directories":{to_json(read_table(conn, "HsrTopDirs"))}}}'
+
+
+def get_diff(db: str, params: Dict[str, List[str]]) -> str:
+    """
+    /diff: compare two snapshots of the history tables, by default the latest two.
+    The old, new and limit query parameters pick the snapshot ids and the number of files returned.
+    """
+    old_id, new_id = get_int_param(params, 'old'), get_int_param(params, 'new')
+    limit = get_int_param(params, 'limit')
+    with sqlite3.connect(db) as conn:
+        try:
+            snapshot_ids = [row[0] for row in conn.execute(
+                'SELECT "Snapshot Id" FROM HsrSnapshots ORDER BY "Snapshot Id" DESC')]
+        except sqlite3.OperationalError:
+            raise QueryError(HTTPStatus.NOT_FOUND, "HsrSnapshots is not in the database, enable SNAPSHOT_HISTORY")
+    if new_id is None:
+        new_id = snapshot_ids[0] if snapshot_ids else None
+    if old_id is None:
+        older = [snapshot_id for snapshot_id in snapshot_ids if new_id is not None and snapshot_id < new_id]
+        old_id = older[0] if older else None
+    if old_id not in snapshot_ids or new_id not in snapshot_ids:
+        raise QueryError(HTTPStatus.NOT_FOUND, "Both snapshots to compare must be in HsrSnapshots")
+
+    file_diff_df, dir_diff_df, ext_diff_df = diff_snapshots(load_history_snapshot(db, old_id),
+                                                            load_history_snapshot(db, new_id))
+    files = file_diff_df.head(DIFF_LIMIT if limit is None else max(limit, 0))
+    return f'{{"old":{old_id},"new":{new_id},"files":{to_json(files)},' \
+           f'"directories":{to_json(dir_diff_df)},"extensions":{to_json(ext_diff_df)}}}'
+
+
+ENDPOINTS: Dict[str, Callable[[str, Dict[str, List[str]]], str]] = {
+    '/extensions': get_extensions,
+    '/directories': get_directories,
+    '/top': get_top,
+    '/diff': get_diff,
+}
+
+
+class ResultCache:
+    """
+    Responses of the endpoints, serialized once and reused until the database changes.
+
+    The database counts as changed when the size or mtime of its file, or of its WAL file, changes.
+    That is checked at most once per check_interval, so a poll that hits the cache does not even stat the files.
+    """
+
+    def __init__(self, db: str, check_interval: float = 1.0) -> None:
+        """
+        :param db: Path of the SQLite database file with the analysis results.
+        :param check_interval: Seconds between checks for a changed database.
+        """
+        self.db = db
+        self.check_interval = check_interval
+        self.responses: Dict[str, Tuple[int, bytes, str]] = {}
+        self.version: Optional[Tuple[int, ...]] = None
+        self.next_check = 0.0
+        self.lock = threading.Lock()
+        self.endpoints: Dict[str, Callable[[str, Dict[str, List[str]]], str]] = {
+            **ENDPOINTS, '/aggregate': self.get_aggregate}
+        # HsrSizeAnalysis of the database version in session_version, loaded by the first /aggregate request
+        self.session: Optional[AnalysisSession] = None
+        self.session_version: Optional[Tuple[int, ...]] = None
+
+    def close(self) -> None:
+        """
+        Close the DuckDB session of /aggregate.
+
+        :return: None
+        """
+        with self.lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+    def get_version(self) -> Tuple[int, ...]:
+        version = []
+        for path in (self.db, self.db + '-wal'):
+            try:
+                file_stat = os.stat(path)
+                version.extend((file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino))
+            except FileNotFoundError:
+                version.extend((0, 0, 0))
+        return tuple(version)
+
+    def check(self) -> None:
+        """
+        Drop the cached responses if the database changed since they were built.
+
+        :return: None
+        """
+        now = time.monotonic()
+        if now < self.next_check:
+            return
+        self.next_check = now + self.check_interval
+        version = self.get_version()
+        if version != self.version:
+            self.version = version
+            self.responses = {}
+
+    def get(self, target: str) -> Tuple[int, bytes, str]:
+        """
+        :param target: Request target, the path with its query string.
+        :return: HTTP status, JSON body and ETag of the response
+        """
+        self.check()
+        response = self.responses.get(target)
+        if response is not None:
+            return response
+
+        with self.lock:
+            # Another thread may have built it while this one waited
+            response = self.responses.get(target)
+            if response is None:
+                version = self.version
+                response = self.build(target)
+                # A response built while the database changed may be stale, so it is only cached for this request
+                if version == self.version:
+                    if len(self.responses) >= MAX_CACHED_RESPONSES:
+                        self.responses = {}
+                    self.responses[target] = response
+        return response
+
+    def get_aggregate(self, db: str, params: Dict[str, List[str]]) -> str:
+        """
+        /aggregate: group HsrSizeAnalysis by the dimensions in the by query parameter (Extension, Directory,
+        Install, Directory Prefix) and compute the measures in measures (sum, count, proportion, min, max, median),
+        e.g. /aggregate?by=Install,Directory Prefix&depth=2&measures=sum,count.
+
+        The table is loaded into one DuckDB session kept for the life of the server, and replaced there when
+        the database changes. Each shape of query is prepared once, so a dashboard refreshing its queries
+        only executes the prepared statements, even after a new scan.
+        """
+        dimensions = get_list_param(params, 'by')
+        measures = get_list_param(params, 'measures') or AGGREGATE_MEASURES
+        depth = get_int_param(params, 'depth')
+        if self.session is None or self.session_version != self.version:
+            with sqlite3.connect(db) as conn:
+                df = read_table(conn, 'HsrSizeAnalysis').drop(columns='index', errors='ignore')
+            if self.session is None:
+                self.session = AnalysisSession(df, copy=True)
+            else:
+                self.session.replace(df)
+            self.session_version = self.version
+
+        missing = [dimension for dimension in dimensions
+                   if dimension != 'Directory Prefix' and dimension not in self.session.columns]
+        if missing:
+            raise QueryError(HTTPStatus.BAD_REQUEST, f"HsrSizeAnalysis has no {', '.join(missing)} column")
+        try:
+            return to_json(self.session.aggregate(dimensions, measures, 1 if depth is None else depth))
+        except ValueError:
+            raise QueryError(HTTPStatus.BAD_REQUEST, f"Unsupported dimensions {dimensions} or measures {measures}, "
+                                                     f"the measures are {', '.join(MEASURES)}")
+
+    def build(self, target: str) -> Tuple[int, bytes, str]:
+        url = urlsplit(target)
+        endpoint = self.endpoints.get(url.path.rstrip('/') or '/')
+        try:
+            if endpoint is None:
+                raise QueryError(HTTPStatus.NOT_FOUND, f"Unknown endpoint, use one of {', '.join(self.endpoints)}")
+            if not os.path.exists(self.db):
+                raise QueryError(HTTPStatus.SERVICE_UNAVAILABLE, f"{self.db} does not exist yet")
+            status, body = HTTPStatus.OK, endpoint(self.db, parse_qs(url.query)).encode()
+        except QueryError as e:
+            status, body = e.status, json.dumps({'error': str(e)}).encode()
+        except Exception as e:
+            main_logger.error(f"Unexpected error during building {target}: {e}", exc_info=True)
+            status, body = HTTPStatus.INTERNAL_SERVER_ERROR, json.dumps({'error': str(e)}).encode()
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        return status, body, etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    :param if_none_match: Value of the If-None-Match header.
+    :param etag: Current ETag of the response.
+    :return: Whether the client's copy is current, comparing weakly as RFC 9110 asks for If-None-Match
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in (tag[2:] if tag.startswith('W/') else tag for tag in tags)
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    Answers GET requests from the server's ResultCache, with 304 Not Modified when the client's ETag is current.
+    """
+    # Keep-alive connections, so a polling dashboard does not pay a TCP handshake per request
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, which Nagle's algorithm would delay by the client's ACK delay
+    disable_nagle_algorithm = True
+    server: 'QueryServer'
+
+    def do_GET(self) -> None:
+        status, body, etag = self.server.cache.get(self.path)
+        if status == HTTPStatus.OK and etag_matches(self.headers.get('If-None-Match'), etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        # Clients may keep the response but must revalidate it, which the ETag makes cheap
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        # Logging every poll to stderr would cost more than answering it
+        pass
+
+
+class QueryServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], cache: ResultCache) -> None:
+        super().__init__(address, QueryHandler)
+        self.cache = cache
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.cache.close()
+
+
+def create_server(db: str = 'hsr_size_analyzer.db', host: str = '127.0.0.1', port: int = 8000,
+                  check_interval: float = 1.0) -> QueryServer:
+    """
+    Create the HTTP service answering /extensions, /directories, /top, /diff and /aggregate
+    from the results in a database.
+    Call serve_forever() on it to start answering, and shutdown() from another thread to stop.
+
+    :param db: Path of the SQLite database file with the analysis results (default is 'hsr_size_analyzer.db').
+    :param host: Address to listen on (default is localhost only).
+    :param port: Port to listen on, 0 picks a free one.
+    :param check_interval: Seconds between checks for a changed database, see ResultCache.
+    :return: The server, listening but not answering yet
+    """
+    return QueryServer((host, port), ResultCache(db, check_interval))
+
+
+def start_server(db: str = 'hsr_size_analyzer.db', host: str = '127.0.0.1', port: int = 8000) -> QueryServer:
+    """
+    Create the HTTP service, see create_server, and answer requests on a background thread.
+
+    :param db: Path of the SQLite database file with the analysis results (default is 'hsr_size_analyzer.db').
+    :param host: Address to listen on (default is localhost only).
+    :param port: Port to listen on.
+    :return: The running server
+    """
+    server = create_server(db, host, port)
+    threading.Thread(target=server.serve_forever, name='query-server', daemon=True).start()
+    main_logger.info(f"Serving {db} on http://{host}:{server.server_address[1]}")
+    return server
+
+
+def wait_until_interrupted(server: QueryServer) -> None:
+    """
+    Keep a server started with start_server answering until the process is interrupted with Ctrl+C.
+
+    :param server: The running server.
+    :return: None
+    """
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,167 @@
+import heapq
+import os
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from hsr_size_analyzer.metrics import instrument
+
+ROOT_DIRECTORY = 'Root Directory'
+
+
+class SizeTrieNode:
+    """
+    One directory in a SizeTrie, holding the cumulative size and file count of its whole subtree.
+    """
+    __slots__ = ('name', 'path', 'parent', 'depth', 'children', 'size', 'file_count')
+
+    def __init__(self, name: str, path: str, parent: Optional['SizeTrieNode']) -> None:
+        self.name = name
+        self.path = path
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.children: Dict[str, SizeTrieNode] = {}
+        self.size = 0
+        self.file_count = 0
+
+
+class SizeTrie:
+    """
+    Prefix tree over the directory components of the scanned files.
+    Sizes are added to every ancestor on insert, so subtree totals are read in O(1) at any depth.
+    """
+
+    def __init__(self) -> None:
+        self.root = SizeTrieNode(ROOT_DIRECTORY, ROOT_DIRECTORY, None)
+
+    def add(self, directory: str, size: int, file_count: int = 1) -> None:
+        """
+        Add files to a directory and all of its ancestors.
+
+        :param directory: Directory relative to the scanned root, as in the Directory column.
+        :param size: Total size of the added files in bytes.
+        :param file_count: Number of added files.
+        :return: None
+        """
+        node = self.root
+        node.size += size
+        node.file_count += file_count
+        if directory == ROOT_DIRECTORY:
+            return
+
+        for name in directory.split(os.sep):
+            child = node.children.get(name)
+            if child is None:
+                path = name if node is self.root else node.path + os.sep + name
+                child = node.children[name] = SizeTrieNode(name, path, node)
+            node = child
+            node.size += size
+            node.file_count += file_count
+
+    def add_dataframe(self, df: pd.DataFrame) -> None:
+        """
+        Add the files of a scan result, aggregating them per directory first.
+        When the DataFrame has an Install column, each install becomes a top-level directory.
+
+        :param df: DataFrame with Size and Directory columns.
+        :return: None
+        """
+        if 'Install' not in df.columns:
+            totals = df.groupby('Directory', sort=False, observed=True)['Size'].agg(['sum', 'count'])
+            for directory, size, file_count in zip(totals.index, totals['sum'], totals['count']):
+                self.add(directory, int(size), int(file_count))
+            return
+
+        totals = df.groupby(['Install', 'Directory'], sort=False, observed=True)['Size'].agg(['sum', 'count'])
+        for (install, directory), size, file_count in zip(totals.index, totals['sum'], totals['count']):
+            path = install if directory == ROOT_DIRECTORY else install + os.sep + directory
+            self.add(path, int(size), int(file_count))
+
+    def get(self, directory: str) -> Optional[SizeTrieNode]:
+        """
+        Look up the node of a directory.
+
+        :param directory: Directory relative to the scanned root, as in the Directory column.
+        :return: The directory's node, or None if no file was added under it
+        """
+        node = self.root
+        if directory == ROOT_DIRECTORY:
+            return node
+        for name in directory.split(os.sep):
+            node = node.children.get(name)
+            if node is None:
+                return None
+        return node
+
+    def subtree_size(self, directory: str) -> int:
+        """
+        :param directory: Directory relative to the scanned root, as in the Directory column.
+        :return: Total size in bytes of all files in the directory and its subdirectories
+        """
+        node = self.get(directory)
+        return 0 if node is None else node.size
+
+    def top_children(self, directory: str, k: int) -> List[SizeTrieNode]:
+        """
+        :param directory: Directory relative to the scanned root, as in the Directory column.
+        :param k: Number of children to return.
+        :return: The k largest subdirectories of the directory, largest first
+        """
+        node = self.get(directory)
+        if node is None:
+            return []
+        return heapq.nlargest(k, node.children.values(), key=lambda child: child.size)
+
+    def iter_nodes(self, max_depth: Optional[int] = None) -> Iterator[SizeTrieNode]:
+        """
+        Iterate over the nodes depth-first with sorted names, parents before their children.
+
+        :param max_depth: Skip nodes deeper than this. The root directory has depth 0.
+        :return: Iterator of nodes
+        """
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            yield node
+            if max_depth is None or node.depth < max_depth:
+                stack.extend(node.children[name] for name in sorted(node.children, reverse=True))
+
+    def to_dataframe(self, max_depth: Optional[int] = None) -> pd.DataFrame:
+        """
+        Export the trie as a parent-pointer table, with the proportion of each subtree in the total size.
+
+        :param max_depth: Roll the tree up to this depth. The root directory has depth 0.
+        :return: DataFrame with columns Id, Parent Id, Name, Directory, Depth, Size, File Count and Proportion
+        """
+        ids: Dict[int, int] = {}
+        rows = []
+        total_size = self.root.size
+        for node in self.iter_nodes(max_depth):
+            ids[id(node)] = len(rows)
+            rows.append((
+                len(rows),
+                None if node.parent is None else ids[id(node.parent)],
+                node.name,
+                node.path,
+                node.depth,
+                node.size,
+                node.file_count,
+                node.size / total_size * 100 if total_size else 0.0,
+            ))
+
+        df = pd.DataFrame(rows, columns=['Id', 'Parent Id', 'Name', 'Directory', 'Depth', 'Size', 'File Count',
+                                         'Proportion'])
+        return df.astype({'Parent Id': 'Int64'})
+
+
+@instrument()
+def build_size_trie(df: pd.DataFrame) -> SizeTrie:
+    """
+    Build a size trie from a scan result.
+
+    :param df: DataFrame with Size and Directory columns.
+    :return: SizeTrie with the cumulative size and file count of every directory
+    """
+    trie = SizeTrie()
+    trie.add_dataframe(df)
+    return trie
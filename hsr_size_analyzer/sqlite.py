@@ -1,10 +1,17 @@
 import sqlite3
-from typing import Dict, Any, Literal, Tuple
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, Iterator, List, Literal, Optional, Sequence, Tuple, Union
 
 import duckdb
 import pandas as pd
 
+from hsr_size_analyzer.analysis import AnalysisSession
+from hsr_size_analyzer.fingerprint import DIR_TOTALS_TABLE, ScanFingerprint, directory_totals, drop_fingerprint_tables
+from hsr_size_analyzer.hsr_size_analyzer import add_full_path
 from hsr_size_analyzer.logger_config import main_logger
+from hsr_size_analyzer.metrics import count, instrument, run_metrics, span
+from hsr_size_analyzer.size_trie import SizeTrie, build_size_trie
+from hsr_size_analyzer.top_n import TopSizes, find_top_sizes
 
 
 def create_proportion_query(group_by_column: str) -> str:
@@ -47,56 +54,345 @@ def get_data_type() -> Dict[str, str]:
         'Size': 'real',
         'Directory': 'text',
         'Proportion': 'real',
-        'Full Path': 'text'
+        'Full Path': 'text',
+        'Allocated Size': 'integer',
+        'Allocated Proportion': 'real',
+        'Category': 'text',
+        'Modified Time': 'integer'
     }
 
 
+def get_sqlite_type(series: pd.Series) -> str:
+    """
+    Choose the SQLite column type for a column without an explicit type, as DataFrame.to_sql does.
+
+    :param series: Column to be written.
+    :return: SQLite type name
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'TIMESTAMP'
+    return 'TEXT'
+
+
+def to_sqlite_values(series: pd.Series) -> List[Any]:
+    """
+    Convert a column to a list of values the sqlite3 module can bind, with missing values as None.
+    NaN floats are bound as NULL by SQLite itself, so float and object columns are passed through tolist.
+
+    :param series: Column to be written.
+    :return: List of Python values
+    """
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series.astype(str).where(series.notna(), None).tolist()
+    if pd.api.types.is_extension_array_dtype(series.dtype) and not isinstance(series.dtype, pd.CategoricalDtype):
+        # Nullable integer, boolean and string columns hold pd.NA, which cannot be bound
+        return series.to_numpy(dtype=object, na_value=None).tolist()
+    return series.tolist()
+
+
+def quote_identifier(name: str) -> str:
+    """
+    Quote a table or column name for SQLite.
+
+    :param name: Name, which may contain spaces.
+    :return: The double-quoted name
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
 def write_to_sqlite(conn: sqlite3.Connection,
                     df: pd.DataFrame,
                     table_name: str,
                     if_exists: Literal["fail", "replace", "append"] = 'replace',
-                    dtype: Dict[str, Any] = None) -> None:
+                    dtype: Dict[str, Any] = None,
+                    index: bool = True) -> None:
     """
     Write a DataFrame to an SQLite database table.
+    The table is created from dtype, or from the column types, and filled with executemany on one prepared INSERT
+    in a single transaction. The result matches DataFrame.to_sql, including the index on the index column,
+    which is built after the rows are inserted.
 
     :param conn: Connection to the SQLite database.
     :param df: DataFrame to be written to the database.
     :param table_name: Name of the table to write the DataFrame to.
     :param if_exists: Action to take if the table already exists ('fail', 'replace', or 'append').
     :param dtype: Dictionary mapping column names to SQL types.
+    :param index: Write the DataFrame index as a column.
     :return: None
     """
-    df.to_sql(table_name, con=conn, if_exists=if_exists, dtype=dtype)
+    if index:
+        index_name = df.index.name or 'index'
+        df = df.reset_index(names=index_name)
 
+    table_exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                (table_name,)).fetchone() is not None
+    if table_exists and if_exists == 'fail':
+        raise ValueError(f"Table '{table_name}' already exists.")
 
-def analyze_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    columns = [str(column) for column in df.columns]
+    table = quote_identifier(table_name)
+    started = not conn.in_transaction
+    if started:
+        conn.execute('BEGIN')
+    try:
+        if table_exists and if_exists == 'replace':
+            conn.execute(f'DROP TABLE {table}')
+        create_table = not table_exists or if_exists == 'replace'
+        if create_table:
+            dtype = dtype or {}
+            column_types = ', '.join(f'{quote_identifier(column)} {dtype.get(column) or get_sqlite_type(df[column])}'
+                                     for column in columns)
+            conn.execute(f'CREATE TABLE {table} ({column_types})')
+
+        placeholders = ', '.join('?' * len(columns))
+        column_list = ', '.join(quote_identifier(column) for column in columns)
+        with span(f'write_to_sqlite {table_name}'):
+            rows = zip(*(to_sqlite_values(df[column]) for column in df.columns))
+            conn.executemany(f'INSERT INTO {table} ({column_list}) VALUES ({placeholders})', rows)
+            count('Rows', len(df))
+
+            if create_table and index:
+                create_indexes(conn, table_name, [index_name])
+        if started:
+            conn.commit()
+    except Exception:
+        if started:
+            conn.rollback()
+        raise
+
+
+def create_indexes(conn: sqlite3.Connection, table_name: str, columns: Sequence[str]) -> None:
+    """
+    Create an index on each column of a table, named ix_<table>_<column> as DataFrame.to_sql names them.
+    Building the indexes once after a load is cheaper than updating them on every insert.
+
+    :param conn: Connection to the SQLite database.
+    :param table_name: Name of the table.
+    :param columns: Columns to index.
+    :return: None
+    """
+    for column in columns:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {quote_identifier(f"ix_{table_name}_{column}")} '
+                     f'ON {quote_identifier(table_name)} ({quote_identifier(column)})')
+
+
+@contextmanager
+def bulk_load(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """
+    Switch a connection to the WAL journal with synchronous=OFF while the with block writes to it.
+    The writes are committed at the end of the block and the previous settings are restored.
+
+    :param conn: Connection to the SQLite database, outside of a transaction.
+    :return: The same connection
+    """
+    journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+    synchronous = conn.execute('PRAGMA synchronous').fetchone()[0]
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    try:
+        yield conn
+        # Commit through the base class, which SingleTransactionConnection leaves alone
+        sqlite3.Connection.commit(conn)
+    except BaseException:
+        sqlite3.Connection.rollback(conn)
+        raise
+    finally:
+        conn.execute(f'PRAGMA synchronous={int(synchronous)}')
+        conn.execute(f'PRAGMA journal_mode={journal_mode}')
+
+
+@instrument()
+def analyze_data(df: pd.DataFrame, dimensions: Sequence[str] = ('Extension', 'Directory'),
+                 size_histogram: bool = False) -> Tuple[pd.DataFrame, ...]:
     """
     Analyze the data in the DataFrame by calculating the proportion based on file extensions and directories.
+    When the DataFrame has an Allocated Size column, the proportion of the allocated size is calculated as well.
+    When it has an Install column, as from batch.get_installs_distribution, proportions are taken within each install.
+
+    All proportions come from one GROUPING SETS query on a single DuckDB connection, see AnalysisSession.
+    The size histogram is computed on the same connection, so the DataFrame is registered in DuckDB only once.
 
     :param df: DataFrame containing the data to be analyzed.
-    :return: A tuple of two DataFrames representing the analysis results for file extensions and directories.
+    :param dimensions: Columns to calculate proportions for, e.g. with Category from classify.add_category.
+    :param size_histogram: Also return the HsrSizeHistogram table, see analyze_size_histogram, after the proportions.
+    :return: A tuple of DataFrames with the analysis results for each dimension,
+            by default for file extensions and directories.
+    """
+    with AnalysisSession(df) as session:
+        proportions = session.proportions(list(dimensions))
+        histogram = (session.size_histogram(['Extension', 'Directory']),) if size_histogram else ()
+    return tuple(proportions[dimension] for dimension in dimensions) + histogram
+
+
+def get_dimensions(df: pd.DataFrame) -> List[str]:
+    """
+    :param df: DataFrame to be analyzed.
+    :return: Columns analyze_data should calculate proportions for, Category included when the data has one
+    """
+    return ['Extension', 'Directory'] + (['Category'] if 'Category' in df.columns else [])
+
+
+@instrument()
+def analyze_size_histogram(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calculate the log2 size histogram and the p50, p90 and p99 file sizes per file extension and per directory.
+    Everything comes from one GROUPING SETS query, see AnalysisSession.size_histogram.
+
+    :param df: DataFrame containing the data to be analyzed.
+    :return: DataFrame with one row per file extension or directory and size bucket.
+    """
+    with AnalysisSession(df) as session:
+        return session.size_histogram(['Extension', 'Directory'])
+
+
+class SingleTransactionConnection(sqlite3.Connection):
+    """
+    SQLite connection that ignores commit() calls, so the per-table commits made by write_to_sqlite
+    join one transaction. Start it with an explicit BEGIN, so table creation is part of it too.
+    The transaction is committed when the connection's with block exits.
     """
-    file_ext_df = execute_duckdb_query(create_proportion_query('Extension'), df)
-    file_dir_df = execute_duckdb_query(create_proportion_query('Directory'), df)
-    return file_ext_df, file_dir_df
 
+    def commit(self) -> None:
+        pass
+
+
+def write_analysis_tables(conn: sqlite3.Connection, df: pd.DataFrame, file_ext_df: pd.DataFrame,
+                          file_dir_df: pd.DataFrame, extra_tables: Optional[Dict[str, pd.DataFrame]] = None) -> None:
+    """
+    Write the original data and the analysis results to an open SQLite connection.
 
+    :param conn: Connection to the SQLite database.
+    :param df: DataFrame containing the original data. The Full Path column of a compact DataFrame is built here.
+    :param file_ext_df: DataFrame with file extension analysis results.
+    :param file_dir_df: DataFrame with directory analysis results.
+    :param extra_tables: Additional analysis results to save, keyed by table name.
+    :return: None
+    """
+    drop_fingerprint_tables(conn)
+    write_to_sqlite(conn, add_full_path(df), 'HsrSizeAnalysis', dtype=get_data_type())
+    create_indexes(conn, 'HsrSizeAnalysis', ['Extension', 'Directory'])
+    write_to_sqlite(conn, file_ext_df, 'HsrSizeDist')
+    write_to_sqlite(conn, file_dir_df, 'HsrDirDist')
+    for table_name, table_df in (extra_tables or {}).items():
+        write_to_sqlite(conn, table_df, table_name, index=False)
+    if 'HsrCategoryDist' not in (extra_tables or {}):
+        # The category shares of an earlier classified scan would no longer match HsrSizeAnalysis
+        conn.execute('DROP TABLE IF EXISTS "HsrCategoryDist"')
+
+
+@instrument()
 def save_analysis_to_db(df: pd.DataFrame, file_ext_df: pd.DataFrame, file_dir_df: pd.DataFrame,
-                        db: str = 'hsr_size_analyzer.db') -> None:
+                        db: str = 'hsr_size_analyzer.db', extra_tables: Optional[Dict[str, pd.DataFrame]] = None) -> None:
     """
     Save the analysis results to an SQLite database.
 
-    :param df: DataFrame containing the original data.
+    :param df: DataFrame containing the original data. The Full Path column of a compact DataFrame is built here.
     :param file_ext_df: DataFrame with file extension analysis results.
     :param file_dir_df: DataFrame with directory analysis results.
     :param db: Name of the SQLite database file to save the analysis results (default is 'hsr_size_analyzer.db').
+    :param extra_tables: Additional analysis results to save, keyed by table name.
     :return: None
     """
     try:
-        with sqlite3.connect(db) as conn:
-            write_to_sqlite(conn, df, 'HsrSizeAnalysis', dtype=get_data_type())
-            write_to_sqlite(conn, file_ext_df, 'HsrSizeDist')
-            write_to_sqlite(conn, file_dir_df, 'HsrDirDist')
+        with sqlite3.connect(db) as conn, bulk_load(conn):
+            write_analysis_tables(conn, df, file_ext_df, file_dir_df, extra_tables)
+    except sqlite3.OperationalError as e:
+        main_logger.error(f"OperationalError during saving to database {db}: {e}", exc_info=True)
+        conn.rollback()
+    except Exception as e:
+        main_logger.error(f"Unexpected error during saving to database {db}: {e}", exc_info=True)
+        conn.rollback()
+
+
+def add_batch_totals(totals: Dict[str, pd.DataFrame], batch: pd.DataFrame) -> None:
+    """
+    Add the total size per file extension, per directory and per category, if the batch has one,
+    of one batch to the running totals.
+
+    :param totals: Running size totals, keyed by the grouping column. Updated in place.
+    :param batch: DataFrame batch from the scanner.
+    :return: None
+    """
+    size_columns = [column for column in ('Size', 'Allocated Size') if column in batch.columns]
+    sizes = batch[size_columns].fillna(0)
+    for column in get_dimensions(batch):
+        batch_totals = sizes.groupby(batch[column], sort=False, observed=True).sum()
+        if column in totals:
+            totals[column] = totals[column].add(batch_totals, fill_value=0)
+        else:
+            totals[column] = batch_totals
+
+
+def totals_to_proportions(totals: pd.DataFrame, column: str) -> pd.DataFrame:
+    """
+    Turn size totals into the same proportion table as analyze_data.
+
+    :param totals: Total Size, and optionally Allocated Size, for each value of the grouping column.
+    :param column: Name of the grouping column.
+    :return: DataFrame with the grouping column and the proportion of the total size in percent.
+    """
+    result = pd.DataFrame({column: totals.index})
+    for size_column, proportion_column in (('Size', 'Proportion'), ('Allocated Size', 'Allocated Proportion')):
+        if size_column in totals.columns:
+            sizes = totals[size_column].astype('float64')
+            result[proportion_column] = (sizes / float(sizes.sum()) * 100).to_numpy()
+    return result
+
+
+@instrument()
+def save_batches_to_db(batches: Iterable[pd.DataFrame], db: str = 'hsr_size_analyzer.db',
+                       extra_tables: Optional[Dict[str, pd.DataFrame]] = None) -> None:
+    """
+    Save streamed DataFrame batches to an SQLite database, analyzing them as they arrive.
+    Each batch is appended to the HsrSizeAnalysis table and added to running totals,
+    so memory use depends on the batch size instead of the number of files.
+    The HsrSizeHistogram table is not written, since its size quantiles need all files at once,
+    and a histogram left from an earlier save is dropped.
+
+    :param batches: DataFrame batches, for example from get_file_distribution with batch_size.
+    :param db: Name of the SQLite database file to save the analysis results (default is 'hsr_size_analyzer.db').
+    :param extra_tables: Additional analysis results to save, keyed by table name.
+    :return: None
+    """
+    totals: Dict[str, pd.DataFrame] = {}
+    size_trie = SizeTrie()
+    top_sizes = TopSizes()
+    try:
+        with sqlite3.connect(db, factory=SingleTransactionConnection) as conn, bulk_load(conn):
+            # All batches are written in one transaction
+            conn.execute('BEGIN')
+            drop_fingerprint_tables(conn)
+            if_exists: Literal["replace", "append"] = 'replace'
+            for batch in batches:
+                write_to_sqlite(conn, batch, 'HsrSizeAnalysis', if_exists=if_exists, dtype=get_data_type())
+                add_batch_totals(totals, batch)
+                size_trie.add_dataframe(batch)
+                top_sizes.add_dataframe(batch)
+                if_exists = 'append'
+            create_indexes(conn, 'HsrSizeAnalysis', ['Extension', 'Directory'])
+
+            empty = pd.DataFrame({'Size': pd.Series(dtype='float64')})
+            write_to_sqlite(conn, totals_to_proportions(totals.get('Extension', empty), 'Extension'), 'HsrSizeDist')
+            write_to_sqlite(conn, totals_to_proportions(totals.get('Directory', empty), 'Directory'), 'HsrDirDist')
+            if 'Category' in totals:
+                write_to_sqlite(conn, totals_to_proportions(totals['Category'], 'Category'), 'HsrCategoryDist')
+            else:
+                conn.execute('DROP TABLE IF EXISTS "HsrCategoryDist"')
+            conn.execute('DROP TABLE IF EXISTS "HsrSizeHistogram"')
+            main_logger.info(f"Streaming save to {db}: the HsrSizeHistogram table is not computed")
+            write_to_sqlite(conn, size_trie.to_dataframe(), 'HsrDirTree', index=False)
+            top_files_df, top_dirs_df = top_sizes.to_dataframes()
+            write_to_sqlite(conn, top_files_df, 'HsrTopFiles', index=False)
+            write_to_sqlite(conn, top_dirs_df, 'HsrTopDirs', index=False)
+            for table_name, table_df in (extra_tables or {}).items():
+                write_to_sqlite(conn, table_df, table_name, index=False)
     except sqlite3.OperationalError as e:
         main_logger.error(f"OperationalError during saving to database {db}: {e}", exc_info=True)
         conn.rollback()
@@ -105,19 +401,160 @@ def save_analysis_to_db(df: pd.DataFrame, file_ext_df: pd.DataFrame, file_dir_df
         conn.rollback()
 
 
-def save_to_db(df: pd.DataFrame, db: str = 'hsr_size_analyzer.db') -> None:
+def update_size_histogram(histogram_df: pd.DataFrame, df: pd.DataFrame, changed_df: pd.DataFrame,
+                          changed_directories: Sequence[str], changed_extensions: Sequence[str]) -> pd.DataFrame:
+    """
+    Update a stored HsrSizeHistogram table, computing the histograms of the changed directories and extensions only.
+
+    :param histogram_df: The stored HsrSizeHistogram table.
+    :param df: DataFrame with the whole new scan.
+    :param changed_df: Files of the new scan in the changed directories.
+    :param changed_directories: Directories that were added, removed or changed.
+    :param changed_extensions: Extensions with files in the changed directories, before or after the change.
+    :return: The updated HsrSizeHistogram table
+    """
+    keep = (((histogram_df['Dimension'] == 'Directory') & ~histogram_df['Value'].isin(changed_directories)) |
+            ((histogram_df['Dimension'] == 'Extension') & ~histogram_df['Value'].isin(changed_extensions)))
+    parts = [histogram_df[keep]]
+    # The files of a changed extension may be in any directory, so its histogram is taken over the whole scan
+    for dimension, files_df in (('Directory', changed_df), ('Extension', df[df['Extension'].isin(changed_extensions)])):
+        if not files_df.empty:
+            with AnalysisSession(files_df) as session:
+                parts.append(session.size_histogram([dimension]))
+    return pd.concat(parts, ignore_index=True).sort_values(['Dimension', 'Value', 'Bucket'], ignore_index=True)
+
+
+@instrument()
+def save_changed_directories_to_db(df: pd.DataFrame, fingerprint: ScanFingerprint, changed_directories: List[str],
+                                   db: str = 'hsr_size_analyzer.db',
+                                   extra_tables: Optional[Dict[str, pd.DataFrame]] = None) -> None:
+    """
+    Update the stored results of a fingerprinted scan, analyzing only the directories that changed since.
+
+    The HsrSizeAnalysis rows of the changed directories are replaced. The proportions and the size trie are built
+    from the stored per-directory totals (HsrDirTotals) of the unchanged directories and fresh totals of the changed
+    ones, and the histograms of the unchanged directories and extensions are kept. The largest files are found again
+    over the whole scan, which takes no query.
+
+    :param df: DataFrame from get_file_distribution with modified_time.
+    :param fingerprint: Fingerprint of the scan, stored with the results.
+    :param changed_directories: Directories that were added, removed or changed, see ScanFingerprint.
+    :param db: Name of the SQLite database file with the stored results (default is 'hsr_size_analyzer.db').
+    :param extra_tables: Additional results to save, keyed by table name.
+    :return: None
+    """
+    main_logger.info(f"{len(changed_directories)} directories changed since the results in {db} were saved, "
+                     f"only those are analyzed again")
+    dimensions = get_dimensions(df)
+    size_columns = [column for column in ('Size', 'Allocated Size') if column in df.columns]
+    changed_df = df[df['Directory'].isin(changed_directories)]
+    try:
+        with sqlite3.connect(db, factory=SingleTransactionConnection) as conn, bulk_load(conn):
+            conn.execute('BEGIN')
+            stored_totals = pd.read_sql_query(f'SELECT * FROM "{DIR_TOTALS_TABLE}"', conn)
+            stored_changed = stored_totals['Directory'].isin(changed_directories)
+            totals = pd.concat([stored_totals[~stored_changed], directory_totals(changed_df, dimensions)],
+                               ignore_index=True)
+            changed_extensions = list(set(stored_totals.loc[stored_changed, 'Extension']) |
+                                      set(changed_df['Extension']))
+            histogram_df = update_size_histogram(pd.read_sql_query('SELECT * FROM "HsrSizeHistogram"', conn),
+                                                 df, changed_df, changed_directories, changed_extensions)
+
+            # Appended rows continue the index column, as in the watch mode
+            next_index = conn.execute('SELECT COALESCE(MAX("index") + 1, 0) FROM HsrSizeAnalysis').fetchone()[0]
+            conn.executemany('DELETE FROM HsrSizeAnalysis WHERE "Directory" = ?',
+                             ((directory,) for directory in changed_directories))
+            rows = add_full_path(changed_df).set_axis(pd.RangeIndex(next_index, next_index + len(changed_df)))
+            write_to_sqlite(conn, rows, 'HsrSizeAnalysis', if_exists='append', dtype=get_data_type())
+
+            proportion_dfs = {dimension: totals_to_proportions(
+                totals.groupby(dimension, sort=False)[size_columns].sum(), dimension) for dimension in dimensions}
+            write_to_sqlite(conn, proportion_dfs['Extension'], 'HsrSizeDist')
+            write_to_sqlite(conn, proportion_dfs['Directory'], 'HsrDirDist')
+
+            size_trie = SizeTrie()
+            directory_sizes = totals.groupby('Directory', sort=False)[['Size', 'File Count']].sum()
+            for directory, size, file_count in zip(directory_sizes.index, directory_sizes['Size'],
+                                                   directory_sizes['File Count']):
+                size_trie.add(directory, int(size), int(file_count))
+            top_files_df, top_dirs_df = find_top_sizes(df)
+            tables = {'HsrDirTree': size_trie.to_dataframe(), 'HsrTopFiles': top_files_df, 'HsrTopDirs': top_dirs_df,
+                      'HsrSizeHistogram': histogram_df}
+            if 'Category' in proportion_dfs:
+                tables['HsrCategoryDist'] = proportion_dfs['Category']
+            else:
+                conn.execute('DROP TABLE IF EXISTS "HsrCategoryDist"')
+            tables.update(extra_tables or {})
+            tables.update(fingerprint.to_dataframes())
+            tables[DIR_TOTALS_TABLE] = totals
+            for table_name, table_df in tables.items():
+                write_to_sqlite(conn, table_df, table_name, index=False)
+    except sqlite3.OperationalError as e:
+        main_logger.error(f"OperationalError during saving to database {db}: {e}", exc_info=True)
+        conn.rollback()
+    except Exception as e:
+        main_logger.error(f"Unexpected error during saving to database {db}: {e}", exc_info=True)
+        conn.rollback()
+
+
+@instrument()
+def save_to_db(df: Union[pd.DataFrame, Iterable[pd.DataFrame]], db: str = 'hsr_size_analyzer.db',
+               extra_tables: Optional[Dict[str, pd.DataFrame]] = None) -> None:
     """
     Save the DataFrame to an SQLite database after analyzing the data based on file extensions and directories.
 
-    :param df: DataFrame containing the data to be saved and analyzed.
+    :param df: DataFrame containing the data to be saved and analyzed,
+            or an iterable of DataFrame batches to save and analyze as they arrive, see save_batches_to_db.
     :param db: Name of the SQLite database file to save the analysis results (default is 'hsr_size_analyzer.db').
+    :param extra_tables: Additional results to save, keyed by table name, e.g. HsrDuplicates from find_duplicates.
     :return: None
     """
-    file_ext_df, file_dir_df = analyze_data(df)
+    if not isinstance(df, pd.DataFrame):
+        save_batches_to_db(df, db, extra_tables)
+        return
+
+    if 'Modified Time' in df.columns:
+        # A scan with modification times is fingerprinted, so unchanged directories need not be analyzed again
+        fingerprint = ScanFingerprint.from_dataframe(df, list(extra_tables or {}))
+        with sqlite3.connect(db) as conn:
+            stored_fingerprint = ScanFingerprint.load(conn)
+        if fingerprint.matches(stored_fingerprint):
+            main_logger.info(f"No file changed since the results in {db} were saved, the analysis is skipped")
+            return
+        if fingerprint.compatible(stored_fingerprint):
+            save_changed_directories_to_db(df, fingerprint, fingerprint.changed_directories(stored_fingerprint),
+                                           db, extra_tables)
+            return
+        extra_tables = {**(extra_tables or {}), **fingerprint.to_dataframes(),
+                        DIR_TOTALS_TABLE: directory_totals(df, get_dimensions(df))}
+
+    file_ext_df, file_dir_df, *category_dfs, histogram_df = analyze_data(df, get_dimensions(df), size_histogram=True)
+    top_files_df, top_dirs_df = find_top_sizes(df)
+    analysis_tables = {'HsrDirTree': build_size_trie(df).to_dataframe(), 'HsrTopFiles': top_files_df,
+                       'HsrTopDirs': top_dirs_df, 'HsrSizeHistogram': histogram_df}
+    if category_dfs:
+        analysis_tables['HsrCategoryDist'] = category_dfs[0]
+    extra_tables = {**analysis_tables, **(extra_tables or {})}
 
     try:
-        save_analysis_to_db(df, file_ext_df, file_dir_df, db)
+        save_analysis_to_db(df, file_ext_df, file_dir_df, db, extra_tables)
     except sqlite3.OperationalError as e:
         main_logger.error(f"OperationalError during saving to database {db}: {e}", exc_info=True)
     except Exception as e:
-        main_logger.error(f"Unexpected error during saving to database {db}: {e}", exc_info=True)
\ No newline at end of file
+        main_logger.error(f"Unexpected error during saving to database {db}: {e}", exc_info=True)
+
+
+def save_run_metrics_to_db(db: str = 'hsr_size_analyzer.db') -> None:
+    """
+    Save the stages recorded by metrics.run_metrics to the HsrRunMetrics table, replacing the previous run's.
+
+    :param db: Name of the SQLite database file to save the metrics (default is 'hsr_size_analyzer.db').
+    :return: None
+    """
+    try:
+        with sqlite3.connect(db) as conn:
+            write_to_sqlite(conn, run_metrics.to_dataframe(), 'HsrRunMetrics', index=False)
+    except sqlite3.OperationalError as e:
+        main_logger.error(f"OperationalError during saving run metrics to database {db}: {e}", exc_info=True)
+    except Exception as e:
+        main_logger.error(f"Unexpected error during saving run metrics to database {db}: {e}", exc_info=True)
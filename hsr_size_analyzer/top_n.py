@@ -0,0 +1,136 @@
+import heapq
+from typing import Any, List, Optional, Tuple
+
+import pandas as pd
+
+from hsr_size_analyzer.hsr_size_analyzer import add_full_path
+from hsr_size_analyzer.metrics import instrument
+
+TOP_N = 100
+
+
+class TopN:
+    """
+    Bounded min-heap keeping the n largest items pushed so far, in O(log n) per push and O(n) memory.
+    """
+
+    def __init__(self, n: int = TOP_N) -> None:
+        self.n = n
+        self.heap: List[Tuple[int, int, Any]] = []
+        # Insertion counter, so items with equal sizes are never compared
+        self.pushed = 0
+
+    def push(self, size: int, item: Any) -> None:
+        """
+        Offer an item, keeping it only if it is among the n largest so far.
+
+        :param size: Size the items are ranked by.
+        :param item: Item to keep.
+        :return: None
+        """
+        entry = (size, -self.pushed, item)
+        self.pushed += 1
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+
+    def largest(self) -> List[Tuple[int, Any]]:
+        """
+        :return: The kept items as (size, item) tuples, largest first, earlier items first among equal sizes
+        """
+        return [(size, item) for size, _, item in sorted(self.heap, reverse=True)]
+
+
+class TopSizes:
+    """
+    Streaming tracker of the largest files and the largest directories of a scan.
+    Directories are ranked by the size of the files directly in them, as in the HsrDirDist table.
+
+    Each batch offers only its n largest rows, taken with nlargest, to the file heap, so memory does not grow with
+    the number of files. Directories are summed per batch and offered to a directory heap as soon as they are
+    complete. The walkers yield the files of a directory together, so only the directory of a batch's last row
+    can go on in the next batch, and its running total is the only one kept between batches.
+    Memory stays constant as long as batches come in walk order, a directory split over batches that are not
+    consecutive would be ranked as two directories.
+    """
+
+    def __init__(self, n: int = TOP_N) -> None:
+        self.files = TopN(n)
+        self.directories = TopN(n)
+        self.file_columns: Optional[List[str]] = None
+        self.directory_columns: Optional[List[str]] = None
+        # Key, total size and file count of the directory of the last row added, which may not be complete yet
+        self.open_directory: Optional[Tuple[Tuple[Any, ...], int, int]] = None
+
+    def push_directory(self, key: Tuple[Any, ...], size: int, file_count: int) -> None:
+        self.directories.push(size, (*key, size, file_count))
+
+    def add_dataframe(self, df: pd.DataFrame) -> None:
+        """
+        Add a batch of scan results.
+
+        :param df: DataFrame with Size and Directory columns, and Full Path or File Name.
+        :return: None
+        """
+        if self.file_columns is None:
+            optional_columns = [column for column in ('Install',) if column in df.columns]
+            self.directory_columns = optional_columns + ['Directory']
+            self.file_columns = optional_columns + ['Full Path', 'Directory', 'Extension', 'Size'] + \
+                [column for column in ('Allocated Size',) if column in df.columns]
+
+        largest = add_full_path(df.nlargest(self.files.n, 'Size'))
+        for row in zip(*(largest[column] for column in self.file_columns)):
+            self.files.push(int(row[self.file_columns.index('Size')]), row)
+
+        if df.empty:
+            return
+        totals = df.groupby(self.directory_columns, sort=False, observed=True)['Size'].agg(['sum', 'count'])
+        last_key = tuple(df[column].iloc[-1] for column in self.directory_columns)
+        open_key, open_size, open_file_count = self.open_directory or (None, 0, 0)
+        self.open_directory = None
+        for key, size, file_count in zip(totals.index, totals['sum'], totals['count']):
+            key = key if isinstance(key, tuple) else (key,)
+            size, file_count = int(size), int(file_count)
+            if key == open_key:
+                size, file_count = size + open_size, file_count + open_file_count
+                open_key = None
+            if key == last_key:
+                self.open_directory = (key, size, file_count)
+            else:
+                self.push_directory(key, size, file_count)
+        if open_key is not None:
+            self.push_directory(open_key, open_size, open_file_count)
+
+    def to_dataframes(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Export the largest files and directories, ranked from 1.
+
+        :return: A tuple of the HsrTopFiles and HsrTopDirs tables
+        """
+        if self.open_directory is not None:
+            self.push_directory(*self.open_directory)
+            self.open_directory = None
+
+        file_columns = self.file_columns or ['Full Path', 'Directory', 'Extension', 'Size']
+        directory_columns = (self.directory_columns or ['Directory']) + ['Size', 'File Count']
+
+        top_files = pd.DataFrame([item for _, item in self.files.largest()], columns=file_columns)
+        top_dirs = pd.DataFrame([item for _, item in self.directories.largest()], columns=directory_columns)
+        top_files.insert(0, 'Rank', range(1, len(top_files) + 1))
+        top_dirs.insert(0, 'Rank', range(1, len(top_dirs) + 1))
+        return top_files, top_dirs
+
+
+@instrument()
+def find_top_sizes(df: pd.DataFrame, n: int = TOP_N) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Find the largest files and directories of a scan result.
+
+    :param df: DataFrame from get_file_distribution or get_installs_distribution.
+    :param n: Number of files and of directories to keep.
+    :return: A tuple of the HsrTopFiles and HsrTopDirs tables
+    """
+    top_sizes = TopSizes(n)
+    top_sizes.add_dataframe(df)
+    return top_sizes.to_dataframes()
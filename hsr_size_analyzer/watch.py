@@ -0,0 +1,519 @@
+import ctypes
+import errno
+import heapq
+import os
+import select
+import sqlite3
+import stat
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from hsr_size_analyzer.hsr_size_analyzer import get_allocated_size, get_file_distribution, get_file_extension, \
+    normalize_directory_path
+from hsr_size_analyzer.logger_config import main_logger
+from hsr_size_analyzer.metrics import count, instrument
+from hsr_size_analyzer.sqlite import SingleTransactionConnection, bulk_load, create_indexes, get_data_type, \
+    save_to_db, totals_to_proportions, write_to_sqlite
+from hsr_size_analyzer.size_trie import SizeTrie
+from hsr_size_analyzer.top_n import TOP_N, TopSizes
+
+# Event flags from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+# IN_MODIFY is left out: it fires on every write of a download, and a written file is picked up on IN_CLOSE_WRITE.
+# Fewer events also keep a large patch under fs.inotify.max_queued_events, above which the queue overflows.
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+              | IN_DONT_FOLLOW)
+# struct inotify_event: int wd, uint32_t mask, uint32_t cookie, uint32_t len, then len bytes of name
+EVENT_HEADER = struct.Struct('iIII')
+READ_SIZE = 64 * 1024
+
+
+class Inotify:
+    """
+    Minimal binding of the Linux inotify API through ctypes, so watch mode needs no extra dependency.
+    """
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+    def add_watch(self, path: str, mask: int = WATCH_MASK) -> int:
+        """
+        :param path: Directory to watch.
+        :param mask: Events to report.
+        :return: Watch descriptor, the same one for a directory that is already watched
+        """
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        """
+        Stop watching a directory. Watches of deleted directories are already gone, which is not an error.
+
+        :param wd: Watch descriptor from add_watch.
+        :return: None
+        """
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self, timeout: Optional[float] = None) -> List[Tuple[int, int, int, str]]:
+        """
+        Wait for events and read all that are queued.
+
+        :param timeout: Seconds to wait for the first event. None waits until one arrives.
+        :return: List of (watch descriptor, mask, cookie, name) events, name being '' for the directory itself
+        """
+        poller = select.poll()
+        poller.register(self.fd, select.POLLIN)
+        if not poller.poll(None if timeout is None else timeout * 1000):
+            return []
+
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                events.append((wd, mask, cookie, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+    def __enter__(self) -> 'Inotify':
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def get_directory(full_path: str) -> str:
+    """
+    :param full_path: Path of a file relative to the scanned directory.
+    :return: Its Directory, as get_file_distribution reports it
+    """
+    return os.path.dirname(full_path) or 'Root Directory'
+
+
+class LiveIndex:
+    """
+    In-memory copy of the scan result, keyed by Full Path, with running size totals per extension and directory.
+    """
+
+    def __init__(self) -> None:
+        self.files: Dict[str, Tuple[str, int, str, int]] = {}
+        # Count, Size and Allocated Size per Extension and per Directory
+        self.totals: Dict[str, Dict[str, List[int]]] = {'Extension': {}, 'Directory': {}}
+
+    def load(self, df: pd.DataFrame) -> None:
+        """
+        Replace the index with a scan result.
+
+        :param df: DataFrame from get_file_distribution.
+        :return: None
+        """
+        self.files = {}
+        self.totals = {'Extension': {}, 'Directory': {}}
+        for extension, size, directory, full_path, allocated_size in zip(
+                df['Extension'], df['Size'], df['Directory'], df['Full Path'], df['Allocated Size']):
+            self.add(full_path, (extension, int(size), directory, int(allocated_size)))
+
+    def add(self, full_path: str, record: Tuple[str, int, str, int]) -> None:
+        self.files[full_path] = record
+        extension, size, directory, allocated_size = record
+        for column, key in (('Extension', extension), ('Directory', directory)):
+            totals = self.totals[column].setdefault(key, [0, 0, 0])
+            totals[0] += 1
+            totals[1] += size
+            totals[2] += allocated_size
+
+    def remove(self, full_path: str) -> None:
+        extension, size, directory, allocated_size = self.files.pop(full_path)
+        for column, key in (('Extension', extension), ('Directory', directory)):
+            totals = self.totals[column][key]
+            totals[0] -= 1
+            totals[1] -= size
+            totals[2] -= allocated_size
+            if not totals[0]:
+                del self.totals[column][key]
+
+    def paths_under(self, prefix: str) -> List[str]:
+        """
+        :param prefix: Relative directory prefix ending with os.sep.
+        :return: Indexed paths inside that directory, at any depth
+        """
+        return [full_path for full_path in self.files if full_path.startswith(prefix)]
+
+    def update(self, directory: str, full_paths: Set[str]) -> Tuple[List[str], pd.DataFrame]:
+        """
+        Stat each changed path once and apply the result to the index.
+
+        :param directory: Absolute path of the watched directory.
+        :param full_paths: Paths relative to it that had events since the last update.
+        :return: The paths whose previous row must be deleted, and the rows to insert for the paths that exist now
+        """
+        removed = []
+        records = []
+        # Hardlinks are counted in full here, the initial scan is the only one that sees all links of an inode
+        for full_path in full_paths:
+            try:
+                file_stat = os.stat(os.path.join(directory, full_path))
+            except OSError:
+                file_stat = None
+            if file_stat is not None and stat.S_ISDIR(file_stat.st_mode):
+                file_stat = None
+
+            previous = self.files.get(full_path)
+            if file_stat is None:
+                if previous is not None:
+                    self.remove(full_path)
+                    removed.append(full_path)
+                continue
+
+            record = (get_file_extension(os.path.basename(full_path)) or 'No extension', file_stat.st_size,
+                      get_directory(full_path), get_allocated_size(file_stat, set()))
+            if record == previous:
+                continue
+            if previous is not None:
+                self.remove(full_path)
+                removed.append(full_path)
+            self.add(full_path, record)
+            records.append((record[0], record[1], record[2], full_path, record[3]))
+
+        rows = pd.DataFrame(records, columns=['Extension', 'Size', 'Directory', 'Full Path', 'Allocated Size'])
+        return removed, rows
+
+    def proportions(self, column: str) -> pd.DataFrame:
+        """
+        :param column: Extension or Directory.
+        :return: The proportion table of that column, as analyze_data returns it
+        """
+        totals = self.totals[column]
+        df = pd.DataFrame([values[1:] for values in totals.values()], index=list(totals),
+                          columns=['Size', 'Allocated Size'], dtype='int64')
+        return totals_to_proportions(df, column)
+
+    def size_trie(self) -> SizeTrie:
+        """
+        :return: The HsrDirTree size trie of the indexed files, built from the directory totals
+        """
+        size_trie = SizeTrie()
+        for directory, (file_count, size, _) in self.totals['Directory'].items():
+            size_trie.add(directory, size, file_count)
+        return size_trie
+
+    def top_sizes(self, n: int = TOP_N) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        :param n: Number of files and of directories to keep.
+        :return: The HsrTopFiles and HsrTopDirs tables of the indexed files, as find_top_sizes returns them
+        """
+        top_sizes = TopSizes(n)
+        top_sizes.file_columns = ['Full Path', 'Directory', 'Extension', 'Size', 'Allocated Size']
+        top_sizes.directory_columns = ['Directory']
+        for full_path, (extension, size, directory, allocated_size) in heapq.nlargest(
+                n, self.files.items(), key=lambda item: item[1][1]):
+            top_sizes.files.push(size, (full_path, directory, extension, size, allocated_size))
+        for directory, (file_count, size, _) in self.totals['Directory'].items():
+            top_sizes.push_directory((directory,), size, file_count)
+        return top_sizes.to_dataframes()
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        :return: The indexed files as a DataFrame like the one from get_file_distribution
+        """
+        return pd.DataFrame([(extension, size, directory, full_path, allocated_size)
+                             for full_path, (extension, size, directory, allocated_size) in self.files.items()],
+                            columns=['Extension', 'Size', 'Directory', 'Full Path', 'Allocated Size'])
+
+
+class DirectoryWatcher:
+    """
+    Keep the HsrSizeAnalysis, HsrSizeDist, HsrDirDist, HsrDirTree, HsrTopFiles and HsrTopDirs tables of a database
+    current while files change.
+
+    One full scan is saved with save_to_db, then inotify events are collected per path and applied in batches:
+    every interval, each path that had events is stat-ed once and the changed rows and the tables above, rebuilt
+    from the in-memory index, are written in one transaction. A patch touching thousands of files therefore costs
+    one write per interval. The full scan is repeated if the kernel's event queue overflows.
+    HsrSizeHistogram needs the size of every file and is dropped at the first change instead of going stale.
+    The watched scan is not classified, so there is no HsrCategoryDist table.
+    """
+
+    def __init__(self, directory: str, db: str = 'hsr_size_analyzer.db', interval: float = 5.0) -> None:
+        """
+        :param directory: The path to the directory to watch.
+        :param db: Name of the SQLite database file (default is 'hsr_size_analyzer.db').
+        :param interval: Seconds between writes of the collected changes.
+        """
+        self.directory = os.path.abspath(normalize_directory_path(directory))
+        self.db = db
+        self.interval = interval
+        self.index = LiveIndex()
+        self.inotify: Optional[Inotify] = None
+        # Watched directories, as watch descriptor -> relative prefix ('' for the root) and back
+        self.prefixes: Dict[int, str] = {}
+        self.watches: Dict[str, int] = {}
+        self.dirty: Set[str] = set()
+        self.next_index = 0
+        # Set when a flush failed, so the next one rewrites all tables from the index
+        self.stale = False
+
+    def start(self) -> None:
+        """
+        Watch the whole tree, then scan it and save the full analysis.
+        Watching first means no change made during the scan is missed, at worst it is applied twice.
+
+        :return: None
+        """
+        if self.inotify is None:
+            self.inotify = Inotify()
+        self.watch_tree('')
+        df = get_file_distribution(self.directory)
+        save_to_db(df, self.db)
+        with sqlite3.connect(self.db) as conn:
+            # Changed rows are replaced by Full Path
+            create_indexes(conn, 'HsrSizeAnalysis', ['Full Path'])
+        self.index.load(df)
+        self.next_index = len(df)
+        self.dirty = set()
+
+    def close(self) -> None:
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+        self.prefixes = {}
+        self.watches = {}
+
+    def watch_tree(self, prefix: str) -> List[str]:
+        """
+        Watch a directory and its subdirectories.
+
+        :param prefix: Relative prefix of the directory ('' for the root).
+        :return: Relative paths of the files found in it
+        """
+        files = []
+        stack = [prefix]
+        while stack:
+            current = stack.pop()
+            path = os.path.join(self.directory, current)
+            try:
+                wd = self.inotify.add_watch(path)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    main_logger.error(f"Cannot watch {path}: out of inotify watches, "
+                                      f"raise fs.inotify.max_user_watches")
+                else:
+                    count('Scan Errors')
+                continue
+            self.prefixes[wd] = current
+            self.watches[current] = wd
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(current + entry.name + os.sep)
+                        else:
+                            files.append(current + entry.name)
+            except OSError:
+                count('Scan Errors')
+        return files
+
+    def unwatch_tree(self, prefix: str) -> None:
+        """
+        Stop watching a directory that was moved or deleted, and mark the files indexed under it as changed.
+
+        :param prefix: Relative prefix of the directory, ending with os.sep.
+        :return: None
+        """
+        for current in [current for current in self.watches if current.startswith(prefix)]:
+            wd = self.watches.pop(current)
+            self.prefixes.pop(wd, None)
+            self.inotify.rm_watch(wd)
+        self.dirty.update(self.index.paths_under(prefix))
+
+    def handle_events(self, events: List[Tuple[int, int, int, str]]) -> None:
+        """
+        Collect the paths of a list of inotify events.
+        Directories are (un)watched right away, so no event inside a new directory is missed,
+        while files are only marked as changed until the next flush.
+
+        :param events: Events from Inotify.read_events.
+        :return: None
+        """
+        for wd, mask, _, name in events:
+            if mask & IN_Q_OVERFLOW:
+                main_logger.warning(f"inotify queue overflowed, rescanning {self.directory}")
+                self.resync()
+                return
+            prefix = self.prefixes.get(wd)
+            if prefix is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.prefixes[wd]
+                self.watches.pop(prefix, None)
+                continue
+            if not name:
+                continue
+
+            full_path = prefix + name
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self.dirty.update(self.watch_tree(full_path + os.sep))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.unwatch_tree(full_path + os.sep)
+            else:
+                self.dirty.add(full_path)
+
+    def poll(self, timeout: Optional[float] = None) -> int:
+        """
+        Wait for events and collect them.
+
+        :param timeout: Seconds to wait. None waits until an event arrives.
+        :return: Number of events read
+        """
+        events = self.inotify.read_events(timeout)
+        self.handle_events(events)
+        return len(events)
+
+    @instrument('watch flush')
+    def flush(self) -> int:
+        """
+        Apply the changed paths to the index and write them to the database in one transaction.
+
+        :return: Number of rows deleted and inserted
+        """
+        dirty, self.dirty = self.dirty, set()
+        removed, rows = self.index.update(self.directory, dirty)
+        if self.stale:
+            return self.rewrite()
+        if not removed and rows.empty:
+            return 0
+        rows.index = pd.RangeIndex(self.next_index, self.next_index + len(rows))
+        self.next_index += len(rows)
+        count('Rows', len(removed) + len(rows))
+
+        try:
+            with sqlite3.connect(self.db, factory=SingleTransactionConnection) as conn, bulk_load(conn):
+                conn.execute('BEGIN')
+                conn.executemany('DELETE FROM HsrSizeAnalysis WHERE "Full Path" = ?',
+                                 ((full_path,) for full_path in removed))
+                write_to_sqlite(conn, rows, 'HsrSizeAnalysis', if_exists='append', dtype=get_data_type())
+                write_to_sqlite(conn, self.index.proportions('Extension'), 'HsrSizeDist')
+                write_to_sqlite(conn, self.index.proportions('Directory'), 'HsrDirDist')
+                top_files_df, top_dirs_df = self.index.top_sizes()
+                for table_name, table_df in (('HsrDirTree', self.index.size_trie().to_dataframe()),
+                                             ('HsrTopFiles', top_files_df), ('HsrTopDirs', top_dirs_df)):
+                    write_to_sqlite(conn, table_df, table_name, index=False)
+                conn.execute('DROP TABLE IF EXISTS "HsrSizeHistogram"')
+        except sqlite3.OperationalError as e:
+            # The index is ahead of the database now, a locked database is usually free again by the next flush
+            main_logger.error(f"OperationalError during saving changes to database {self.db}: {e}", exc_info=True)
+            self.stale = True
+            return 0
+        except Exception as e:
+            # Keep watching, the next flush rewrites all tables from the index
+            main_logger.error(f"Unexpected error during saving changes to database {self.db}: {e}", exc_info=True)
+            self.stale = True
+            return 0
+        return len(removed) + len(rows)
+
+    def rewrite(self) -> int:
+        """
+        Save the whole index with save_to_db, after a flush failed to write its changes.
+
+        :return: Number of rows written
+        """
+        df = self.index.to_dataframe()
+        save_to_db(df, self.db)
+        with sqlite3.connect(self.db) as conn:
+            create_indexes(conn, 'HsrSizeAnalysis', ['Full Path'])
+        self.next_index = len(df)
+        self.stale = False
+        return len(df)
+
+    def resync(self) -> None:
+        """
+        Start over with a full scan, after events were lost.
+
+        :return: None
+        """
+        for wd in list(self.prefixes):
+            self.inotify.rm_watch(wd)
+        self.prefixes = {}
+        self.watches = {}
+        self.start()
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        """
+        Watch the directory until stop is set, writing the collected changes every interval.
+
+        :param stop: Event ending the watch. None watches until the process is interrupted with Ctrl+C.
+        :return: None
+        """
+        self.start()
+        main_logger.info(f"Watching {self.directory} with {len(self.watches)} watches, "
+                         f"HsrSizeHistogram is dropped at the first change")
+        next_flush = time.monotonic() + self.interval
+        try:
+            try:
+                while stop is None or not stop.is_set():
+                    # Wake up at least every second to notice the stop event
+                    self.poll(min(max(next_flush - time.monotonic(), 0), 1.0))
+                    if time.monotonic() >= next_flush:
+                        self.flush()
+                        next_flush = time.monotonic() + self.interval
+            except KeyboardInterrupt:
+                main_logger.info(f"Stopped watching {self.directory}")
+            # Write what was collected since the last flush
+            self.flush()
+        finally:
+            self.close()
+
+
+def watch_directory(directory: str, db: str = 'hsr_size_analyzer.db', interval: float = 5.0,
+                    stop: Optional[threading.Event] = None) -> None:
+    """
+    Scan a directory, save it to an SQLite database, then keep the database current as files change.
+    See DirectoryWatcher. Linux only.
+
+    :param directory: The path to the directory to watch.
+    :param db: Name of the SQLite database file (default is 'hsr_size_analyzer.db').
+    :param interval: Seconds between writes of the collected changes.
+    :param stop: Event ending the watch. None watches until the process is interrupted.
+    :return: None
+    """
+    DirectoryWatcher(directory, db, interval).run(stop)
@@ -1,13 +1,245 @@
+import argparse
 import os
-from dotenv import load_dotenv
+import sys
+from typing import List, Optional
 
-from hsr_size_analyzer.hsr_size_analyzer import get_file_distribution
-from hsr_size_analyzer.sqlite import save_to_db
+# pandas, DuckDB and python-dotenv are imported inside the commands that need them,
+# so the read-only report command starts with the standard library alone.
 
-# Load environment variables from .env file
-load_dotenv()
+DB = 'hsr_size_analyzer.db'
 
 
-game_directory = os.getenv("GAME_DIR")
-df = get_file_distribution(game_directory)
-save_to_db(df)
\ No newline at end of file
+def main(argv: Optional[List[str]] = None) -> int:
+    args = create_parser().parse_args(argv)
+    return args.func(args) or 0
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Analyze the size of a Honkai: Star Rail install.')
+    parser.add_argument('--db', default=DB, help=f'SQLite database with the results (default: {DB})')
+    parser.set_defaults(func=scan_command, directory=None, format=None)
+    # --db is accepted after the command too, without its default replacing one given before the command
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', default=argparse.SUPPRESS, help=f'SQLite database with the results (default: {DB})')
+    subparsers = parser.add_subparsers(title='commands', metavar='COMMAND')
+
+    scan_parser = subparsers.add_parser(
+        'scan', parents=[common], help='scan the game directory, analyze it and save the results (the default)',
+        description='Scan the game directory, analyze it and save the results. '
+                    'The optional features are configured in the .env file, see the README.')
+    scan_parser.add_argument('directory', nargs='?', help='game directory (default: GAME_DIR from the .env file)')
+    scan_parser.add_argument('--format', choices=['sqlite', 'parquet', 'both'],
+                             help='output format (default: OUTPUT_FORMAT from the .env file, or sqlite)')
+    scan_parser.set_defaults(func=scan_command)
+
+    analyze_parser = subparsers.add_parser(
+        'analyze', parents=[common], help='analyze the stored scan again without scanning',
+        description='Analyze the scan stored in the database again, e.g. after changing the classification rules.')
+    analyze_parser.add_argument('--rules', help='classification rules file (default: CLASSIFICATION_RULES)')
+    analyze_parser.set_defaults(func=analyze_command)
+
+    report_parser = subparsers.add_parser(
+        'report', parents=[common], help='print stored results',
+        description='Print stored results. Only reads the database, and starts without loading pandas.')
+    report_parser.add_argument('report', nargs='?', default='summary',
+                               choices=['summary', 'extensions', 'directories', 'categories', 'top-files',
+                                        'top-dirs', 'snapshots', 'metrics'],
+                               help='what to print (default: summary)')
+    report_parser.add_argument('--limit', type=int, default=20, help='maximum number of rows (default: 20)')
+    report_parser.add_argument('--json', action='store_true', help='print the rows as JSON')
+    report_parser.set_defaults(func=report_command)
+
+    diff_parser = subparsers.add_parser(
+        'diff', parents=[common], help='compare two scans',
+        description='Compare two scans: two snapshot ids of the history in --db, two databases, '
+                    'or by default the latest two snapshots.')
+    diff_parser.add_argument('old', nargs='?', help='older snapshot id or database')
+    diff_parser.add_argument('new', nargs='?', help='newer snapshot id or database')
+    diff_parser.add_argument('--limit', type=int, default=20, help='maximum number of rows per table (default: 20)')
+    diff_parser.set_defaults(func=diff_command)
+    return parser
+
+
+def scan_command(args: argparse.Namespace) -> None:
+    from dotenv import load_dotenv
+
+    from hsr_size_analyzer.metrics import run_metrics
+    from hsr_size_analyzer.server import start_server, wait_until_interrupted
+    from hsr_size_analyzer.sqlite import save_run_metrics_to_db
+
+    # Load environment variables from .env file
+    load_dotenv()
+
+    db = args.db
+    directory = args.directory
+    output_format = args.format or os.getenv("OUTPUT_FORMAT") or 'sqlite'
+
+    server = None
+    if os.getenv("SERVE"):
+        # Answer the dashboard over HTTP from cached results, also while a watch run keeps them current
+        server = start_server(db, port=int(os.getenv("SERVE_PORT") or 8000))
+
+    if not os.getenv("RUN_METRICS"):
+        run(db, directory, output_format)
+    else:
+        # Time every stage of the run and store the timings and counters next to the results
+        run_metrics.enable(trace_memory=os.getenv("RUN_METRICS") == 'memory')
+        try:
+            run(db, directory, output_format)
+        finally:
+            run_metrics.disable()
+        save_run_metrics_to_db(db)
+
+    if server is not None:
+        wait_until_interrupted(server)
+
+
+def run(db: str, directory: Optional[str] = None, output_format: str = 'sqlite') -> None:
+    from hsr_size_analyzer.batch import get_installs_distribution, save_installs_to_db
+    from hsr_size_analyzer.classify import add_category
+    from hsr_size_analyzer.duplicates import find_duplicates
+    from hsr_size_analyzer.history import save_snapshot_to_db
+    from hsr_size_analyzer.hsr_size_analyzer import get_file_distribution
+    from hsr_size_analyzer.manifest import get_manifest_path
+    from hsr_size_analyzer.parquet import get_parquet_path, save_to_parquet
+    from hsr_size_analyzer.pck import get_pck_cache_path, inspect_pck_files
+    from hsr_size_analyzer.sqlite import save_to_db
+    from hsr_size_analyzer.watch import watch_directory
+
+    game_directories = os.getenv("GAME_DIRS")
+    if game_directories and directory is None:
+        # Several installs, as glob patterns or paths separated by os.pathsep, analyzed together
+        df = get_installs_distribution(game_directories.split(os.pathsep))
+        if output_format != 'parquet':
+            save_installs_to_db(df, db)
+        if output_format != 'sqlite':
+            save_to_parquet(df, get_parquet_path(db))
+        return
+
+    game_directory = directory or os.getenv("GAME_DIR")
+
+    if os.getenv("WATCH"):
+        # Scan once, then keep the tables current while the launcher downloads and patches files
+        interval = os.getenv("WATCH_INTERVAL")
+        watch_directory(game_directory, db, float(interval) if interval else 5.0)
+        return
+
+    # Reuse the previous scan for directories that did not change since the last run
+    manifest = get_manifest_path(db) if os.getenv("INCREMENTAL_SCAN") else None
+
+    # Record modification times, so save_to_db can skip the analysis of directories that did not change
+    df = get_file_distribution(game_directory, manifest=manifest, modified_time=bool(os.getenv("RESULT_CACHE")))
+    rules_path = os.getenv("CLASSIFICATION_RULES")
+    if rules_path:
+        # Label every file with an asset category, analyzed like the extensions and directories
+        df = add_category(df, rules_path)
+    # Finding duplicates reads file contents, so it only runs when asked for
+    extra_tables = {'HsrDuplicates': find_duplicates(df, game_directory)} if os.getenv("FIND_DUPLICATES") else {}
+    if os.getenv("INSPECT_PCK"):
+        # Attribute the bytes of the Wwise audio packages to languages and sound banks
+        languages_df, banks_df = inspect_pck_files(df, game_directory, cache=get_pck_cache_path(db))
+        extra_tables.update({'HsrPckLanguages': languages_df, 'HsrPckBanks': banks_df})
+    if output_format != 'parquet':
+        save_to_db(df, db, extra_tables)
+
+    snapshot_id = None
+    if os.getenv("SNAPSHOT_HISTORY"):
+        # Keep the size of every run, storing only the files that changed since the previous one
+        retention = os.getenv("SNAPSHOT_RETENTION")
+        snapshot_id = save_snapshot_to_db(df, db, int(retention) if retention else None)
+
+    if output_format != 'sqlite':
+        # One Parquet dataset per table next to the database, with a partition per run
+        save_to_parquet(df, get_parquet_path(db), extra_tables, snapshot_id)
+
+
+def analyze_command(args: argparse.Namespace) -> Optional[int]:
+    import sqlite3
+
+    import pandas as pd
+    from dotenv import load_dotenv
+
+    from hsr_size_analyzer.batch import save_installs_to_db
+    from hsr_size_analyzer.classify import add_category
+    from hsr_size_analyzer.sqlite import save_to_db
+
+    load_dotenv()
+    if not os.path.exists(args.db):
+        print(f'{args.db} does not exist, run the scan command first', file=sys.stderr)
+        return 1
+    with sqlite3.connect(args.db) as conn:
+        df = pd.read_sql_query('SELECT * FROM HsrSizeAnalysis', conn)
+    df = df.drop(columns=['index', 'Category'], errors='ignore')
+
+    rules_path = args.rules or os.getenv("CLASSIFICATION_RULES")
+    if rules_path:
+        df = add_category(df, rules_path)
+    if 'Install' in df.columns:
+        save_installs_to_db(df, args.db)
+    else:
+        save_to_db(df, args.db)
+    return None
+
+
+def report_command(args: argparse.Namespace) -> Optional[int]:
+    import json
+    import sqlite3
+
+    from hsr_size_analyzer.report import format_table, query_report, query_summary
+
+    if not os.path.exists(args.db):
+        print(f'{args.db} does not exist, run the scan command first', file=sys.stderr)
+        return 1
+    try:
+        if args.report == 'summary':
+            columns, rows = query_summary(args.db)
+        else:
+            columns, rows = query_report(args.db, args.report, args.limit)
+    except sqlite3.OperationalError as e:
+        print(f'Cannot read the {args.report} report from {args.db}: {e}', file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps([dict(zip(columns, row)) for row in rows]))
+    else:
+        print(format_table(columns, rows))
+    return None
+
+
+def diff_command(args: argparse.Namespace) -> Optional[int]:
+    import sqlite3
+
+    from hsr_size_analyzer.diff import diff_snapshots
+    from hsr_size_analyzer.history import load_history_snapshot
+    from hsr_size_analyzer.report import format_table
+
+    if (args.old is None) != (args.new is None):
+        print('Give both the old and the new scan, or neither for the latest two snapshots', file=sys.stderr)
+        return 1
+    if args.old is None or (args.old.isdigit() and args.new.isdigit()):
+        try:
+            with sqlite3.connect(args.db) as conn:
+                snapshot_ids = [row[0] for row in conn.execute(
+                    'SELECT "Snapshot Id" FROM HsrSnapshots ORDER BY "Snapshot Id" DESC LIMIT 2')]
+        except sqlite3.OperationalError:
+            snapshot_ids = []
+        if args.old is None and len(snapshot_ids) < 2:
+            print(f'{args.db} has fewer than two snapshots, enable SNAPSHOT_HISTORY', file=sys.stderr)
+            return 1
+        old_id, new_id = (int(args.old), int(args.new)) if args.old else (snapshot_ids[1], snapshot_ids[0])
+        old, new = load_history_snapshot(args.db, old_id), load_history_snapshot(args.db, new_id)
+    else:
+        old, new = args.old, args.new
+
+    file_diff_df, dir_diff_df, ext_diff_df = diff_snapshots(old, new)
+    for title, df in (('Files', file_diff_df), ('Directories', dir_diff_df), ('Extensions', ext_diff_df)):
+        df = df.head(args.limit)
+        print(f'{title}:')
+        print(format_table([str(column) for column in df.columns], list(df.itertuples(index=False, name=None))))
+        print()
+    return None
+
+
+# The guard keeps worker processes started by the batch mode from running the script again
+if __name__ == '__main__':
+    sys.exit(main())
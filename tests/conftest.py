@@ -0,0 +1,49 @@
+import os
+
+import dotenv
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.history import save_snapshot_to_db
+from hsr_size_analyzer.sqlite import save_to_db
+
+ENV_EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env.example')
+
+
+@pytest.fixture(autouse=True)
+def clean_environment(monkeypatch):
+    """Keep a developer's .env and shell from switching on WATCH, SERVE or other features during the tests."""
+    with open(ENV_EXAMPLE) as f:
+        for line in f:
+            name = line.split('=', 1)[0].strip()
+            if name and not name.startswith('#'):
+                monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(dotenv, 'load_dotenv', lambda *args, **kwargs: False)
+
+
+def create_scan(sizes):
+    return pd.DataFrame({
+        'Extension': ['.block', '.block', '.pck'][:len(sizes)],
+        'Size': sizes,
+        'Directory': ['Asb', 'Asb', 'Audio'][:len(sizes)],
+        'Full Path': ['Asb/a.block', 'Asb/b.block', 'Audio/v.pck'][:len(sizes)],
+        'Allocated Size': sizes,
+    })
+
+
+@pytest.fixture
+def make_scan():
+    """Build a small scan DataFrame with up to three files of the given sizes."""
+    return create_scan
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Database with two snapshots and the second scan saved as the current results."""
+    db = str(tmp_path / 'results.db')
+    first = create_scan([100, 200])
+    second = create_scan([100, 250, 650])
+    save_snapshot_to_db(first, db)
+    save_to_db(second, db)
+    save_snapshot_to_db(second, db)
+    return db
@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.sqlite import analyze_data
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame({
+        'Extension': ['.txt', '.txt', '.bin'],
+        'Size': [100, 100, 200],
+        'Directory': ['docs', 'docs', 'data'],
+        'Full Path': ['docs/a.txt', 'docs/b.txt', 'data/c.bin'],
+        'Allocated Size': [4096, 4096, 0],
+    })
+
+
+def test_analyze_data_apparent_and_allocated(sample_df):
+    file_ext_df, file_dir_df = analyze_data(sample_df)
+
+    ext = file_ext_df.set_index('Extension')
+    assert list(file_ext_df.columns) == ['Extension', 'Proportion', 'Allocated Proportion']
+    assert float(ext.loc['.txt', 'Proportion']) == pytest.approx(50.0)
+    assert float(ext.loc['.txt', 'Allocated Proportion']) == pytest.approx(100.0)
+    assert float(file_dir_df.set_index('Directory').loc['data', 'Allocated Proportion']) == pytest.approx(0.0)
+
+
+def test_analyze_data_without_allocated_size(sample_df):
+    file_ext_df, _ = analyze_data(sample_df.drop(columns='Allocated Size'))
+
+    assert list(file_ext_df.columns) == ['Extension', 'Proportion']
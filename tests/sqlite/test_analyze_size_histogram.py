@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.sqlite import analyze_data, analyze_size_histogram
+
+
+@pytest.fixture
+def sample_df():
+    rng = np.random.default_rng(0)
+    sizes = np.concatenate([[0, 1, 2, 3, 1023, 1024, 2 ** 50 - 1, 2 ** 50], rng.integers(0, 10 ** 9, 500)])
+    return pd.DataFrame({
+        'Extension': np.where(np.arange(len(sizes)) % 3 == 0, '.block', '.pck'),
+        'Size': sizes,
+        'Directory': np.where(np.arange(len(sizes)) % 2 == 0, 'audio', 'video'),
+    })
+
+
+def expected_buckets(sizes):
+    sizes = np.asarray(sizes, dtype=np.int64)
+    buckets = np.full(len(sizes), -1)
+    positive = sizes > 0
+    buckets[positive] = [int(size).bit_length() - 1 for size in sizes[positive]]
+    return buckets
+
+
+def test_histogram_buckets_match_bit_length(sample_df):
+    histogram = analyze_size_histogram(sample_df)
+
+    for dimension in ('Extension', 'Directory'):
+        for value, group in sample_df.groupby(dimension):
+            rows = histogram[(histogram['Dimension'] == dimension) & (histogram['Value'] == value)]
+            buckets, counts = np.unique(expected_buckets(group['Size']), return_counts=True)
+            assert rows['Bucket'].tolist() == buckets.tolist()
+            assert rows['File Count'].tolist() == counts.tolist()
+
+
+def test_bucket_bounds(sample_df):
+    histogram = analyze_size_histogram(sample_df)
+
+    positive = histogram[histogram['Bucket'] >= 0]
+    buckets = positive['Bucket'].astype('int64')
+    assert (positive['Min Size'] == 2 ** buckets).all()
+    assert (positive['Max Size'] == 2 ** (buckets + 1) - 1).all()
+    # The single empty file is in the .block extension and the audio directory
+    assert histogram.loc[histogram['Bucket'] == -1, ['Min Size', 'Max Size']].values.tolist() == [[0, 0]] * 2
+
+
+def test_quantiles_match_numpy(sample_df):
+    histogram = analyze_size_histogram(sample_df)
+
+    quantiles = histogram.groupby(['Dimension', 'Value'])[['P50 Size', 'P90 Size', 'P99 Size']].first()
+    for value, group in sample_df.groupby('Extension'):
+        expected = np.quantile(group['Size'].astype('float64'), [0.5, 0.9, 0.99])
+        assert quantiles.loc[('Extension', value)].tolist() == pytest.approx(expected.tolist())
+
+
+def test_histogram_per_install():
+    df = pd.DataFrame({
+        'Install': ['live', 'live', 'beta'],
+        'Extension': ['.pck', '.pck', '.pck'],
+        'Size': [10, 20, 1000],
+        'Directory': ['audio', 'audio', 'audio'],
+    })
+
+    histogram = analyze_size_histogram(df)
+
+    extension_rows = histogram[histogram['Dimension'] == 'Extension']
+    assert extension_rows[['Install', 'Bucket', 'File Count']].values.tolist() == [['beta', 9, 1], ['live', 3, 1],
+                                                                                   ['live', 4, 1]]
+
+
+def test_histogram_from_the_analysis_session(sample_df):
+    file_ext_df, file_dir_df, histogram = analyze_data(sample_df, size_histogram=True)
+
+    pd.testing.assert_frame_equal(histogram, analyze_size_histogram(sample_df))
+    assert len(file_ext_df) == 2 and len(file_dir_df) == 2
@@ -0,0 +1,95 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.sqlite import analyze_data, save_to_db
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame({
+        'Extension': ['.txt', '.jpg', '.png', '.txt', '.jpg'],
+        'Size': [100, 200, 300, 400, 0],
+        'Directory': ['docs', 'images', 'images', 'docs', 'images'],
+        'Full Path': ['docs/a.txt', 'images/b.jpg', 'images/c.png', 'docs/d.txt', 'images/e.jpg']
+    })
+
+
+def split_batches(df, batch_size):
+    for start in range(0, len(df), batch_size):
+        yield df.iloc[start:start + batch_size]
+
+
+def read_table(db, table):
+    with sqlite3.connect(db) as conn:
+        return pd.read_sql_query(f'SELECT * FROM {table}', conn)
+
+
+def test_save_batches_matches_analyze_data(sample_df, tmp_path):
+    db = str(tmp_path / 'batches.db')
+
+    save_to_db(split_batches(sample_df, 2), db=db)
+
+    file_ext_df, file_dir_df = analyze_data(sample_df)
+    saved_ext = read_table(db, 'HsrSizeDist').set_index('Extension')['Proportion']
+    saved_dir = read_table(db, 'HsrDirDist').set_index('Directory')['Proportion']
+    pd.testing.assert_series_equal(saved_ext.sort_index(),
+                                   file_ext_df.set_index('Extension')['Proportion'].astype(float).sort_index())
+    pd.testing.assert_series_equal(saved_dir.sort_index(),
+                                   file_dir_df.set_index('Directory')['Proportion'].astype(float).sort_index())
+
+
+def test_save_batches_writes_every_row(sample_df, tmp_path):
+    db = str(tmp_path / 'batches.db')
+
+    save_to_db(split_batches(sample_df, 2), db=db)
+
+    saved = read_table(db, 'HsrSizeAnalysis')
+    assert saved['index'].tolist() == list(range(len(sample_df)))
+    assert saved['Full Path'].tolist() == sample_df['Full Path'].tolist()
+
+
+def test_save_batches_replaces_previous_run(sample_df, tmp_path):
+    db = str(tmp_path / 'batches.db')
+
+    save_to_db(split_batches(sample_df, 2), db=db)
+    save_to_db(split_batches(sample_df, 3), db=db)
+
+    assert len(read_table(db, 'HsrSizeAnalysis')) == len(sample_df)
+
+
+def test_save_batches_writes_dir_tree(sample_df, tmp_path):
+    db = str(tmp_path / 'batches.db')
+
+    save_to_db(split_batches(sample_df, 2), db=db)
+
+    tree_df = read_table(db, 'HsrDirTree').set_index('Directory')
+    assert tree_df.loc['Root Directory', 'Size'] == sample_df['Size'].sum()
+    assert tree_df.loc['images', 'File Count'] == 3
+
+
+def test_save_batches_writes_top_tables(sample_df, tmp_path):
+    db = str(tmp_path / 'batches.db')
+
+    # The walkers yield the files of a directory together
+    save_to_db(split_batches(sample_df.sort_values('Directory', kind='stable'), 2), db=db)
+
+    top_files = read_table(db, 'HsrTopFiles')
+    top_dirs = read_table(db, 'HsrTopDirs')
+    assert top_files['Full Path'].tolist() == ['docs/d.txt', 'images/c.png', 'images/b.jpg', 'docs/a.txt',
+                                               'images/e.jpg']
+    assert top_dirs[['Directory', 'Size']].values.tolist() == [['docs', 500], ['images', 500]]
+
+
+def test_save_batches_writes_category_dist_and_drops_histogram(sample_df, tmp_path):
+    db = str(tmp_path / 'batches.db')
+    save_to_db(sample_df, db=db)
+    categorized = sample_df.assign(Category=['Text', 'Image', 'Image', 'Text', 'Image'])
+
+    save_to_db(split_batches(categorized, 2), db=db)
+
+    proportions = read_table(db, 'HsrCategoryDist').set_index('Category')['Proportion']
+    assert proportions.to_dict() == {'Text': 50.0, 'Image': 50.0}
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'HsrSizeHistogram'").fetchone() is None
@@ -3,7 +3,7 @@ import sqlite3
 import pandas as pd
 from io import StringIO
 
-from hsr_size_analyzer.sqlite import write_to_sqlite
+from hsr_size_analyzer.sqlite import bulk_load, create_indexes, write_to_sqlite
 
 
 @pytest.fixture
@@ -57,3 +57,48 @@ def test_write_to_sqlite_with_dtype(sample_data, test_db_connection):
     assert schema_dict['Size'] == 'INTEGER'
     assert schema_dict['Directory'] == 'TEXT'
     assert schema_dict['Full Path'] == 'TEXT'
+
+
+def test_write_to_sqlite_matches_to_sql(sample_data, test_db_connection):
+    sample_data['Extension'] = sample_data['Extension'].astype('category')
+    sample_data['Allocated Size'] = pd.array([4096, None, 0], dtype='Int64')
+    sample_data.loc[1, 'Directory'] = None
+
+    write_to_sqlite(test_db_connection, sample_data, 'bulk')
+    sample_data.to_sql('expected', con=test_db_connection)
+
+    bulk = pd.read_sql_query("SELECT * FROM bulk", test_db_connection)
+    expected = pd.read_sql_query("SELECT * FROM expected", test_db_connection)
+    pd.testing.assert_frame_equal(bulk, expected)
+    schema = test_db_connection.execute("PRAGMA table_info(bulk)").fetchall()
+    assert [row[2] for row in schema] == ['INTEGER', 'TEXT', 'INTEGER', 'TEXT', 'TEXT', 'INTEGER']
+    indexes = test_db_connection.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'bulk'")
+    assert indexes.fetchall() == [('ix_bulk_index',)]
+
+
+def test_write_to_sqlite_rolls_back_on_error(sample_data, test_db_connection):
+    sample_data['Full Path'] = [object(), 'b', 'c']
+
+    with pytest.raises(sqlite3.Error):
+        write_to_sqlite(test_db_connection, sample_data, 'test_table')
+
+    tables = test_db_connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    assert tables == []
+
+
+def test_bulk_load_restores_settings(sample_data, tmp_path):
+    db = str(tmp_path / 'bulk.db')
+    conn = sqlite3.connect(db)
+
+    with bulk_load(conn):
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 0
+        write_to_sqlite(conn, sample_data, 'test_table')
+        create_indexes(conn, 'test_table', ['Extension', 'Directory'])
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'delete'
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+    conn.close()
+    with sqlite3.connect(db) as conn:
+        indexes = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name").fetchall()
+    assert indexes == [('ix_test_table_Directory',), ('ix_test_table_Extension',), ('ix_test_table_index',)]
@@ -0,0 +1,81 @@
+import os
+
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.analysis import AnalysisSession, create_aggregate_query
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame({
+        'Install': ['live', 'live', 'live', 'beta'],
+        'Extension': ['.pck', '.pck', '.usm', '.pck'],
+        'Size': [100, 300, 200, 50],
+        'Directory': [os.path.join('audio', 'en'), os.path.join('audio', 'jp'), 'Root Directory', 'audio'],
+    })
+
+
+def test_create_aggregate_query_rejects_unknown_names():
+    with pytest.raises(ValueError):
+        create_aggregate_query(['Size; DROP TABLE df'], ['sum'])
+    with pytest.raises(ValueError):
+        create_aggregate_query(['Extension'], ['mode'])
+    with pytest.raises(ValueError):
+        create_aggregate_query(['Extension'], [])
+
+
+def test_directory_prefix_depth(sample_df):
+    with AnalysisSession(sample_df) as session:
+        depth_1 = session.aggregate(['Directory Prefix'], ['sum', 'count'], depth=1)
+        depth_2 = session.aggregate(['Directory Prefix'], ['sum', 'count'], depth=2)
+
+    depth_1 = depth_1.set_index('Directory Prefix')
+    assert depth_1.loc['audio', 'Total Size'] == 450
+    assert depth_1.loc['audio', 'File Count'] == 3
+    assert depth_1.loc['Root Directory', 'Total Size'] == 200
+    assert set(depth_2['Directory Prefix']) == {os.path.join('audio', 'en'), os.path.join('audio', 'jp'),
+                                                'audio', 'Root Directory'}
+
+
+def test_measures_per_install(sample_df):
+    with AnalysisSession(sample_df) as session:
+        result = session.aggregate(['Install', 'Extension'], ['proportion', 'min', 'max', 'median'])
+
+    result = result.set_index(['Install', 'Extension'])
+    assert result.loc[('live', '.pck'), 'Proportion'] == pytest.approx(400 / 600 * 100)
+    assert result.loc[('beta', '.pck'), 'Proportion'] == pytest.approx(100.0)
+    assert result.loc[('live', '.pck'), 'Min Size'] == 100
+    assert result.loc[('live', '.pck'), 'Max Size'] == 300
+    assert result.loc[('live', '.pck'), 'Median Size'] == pytest.approx(200.0)
+
+
+def test_grand_total(sample_df):
+    with AnalysisSession(sample_df) as session:
+        result = session.aggregate([], ['sum', 'count'])
+
+    assert result.to_dict('records') == [{'Total Size': 650, 'File Count': 4}]
+
+
+def test_statement_is_prepared_once_per_shape(sample_df):
+    with AnalysisSession(sample_df) as session:
+        session.aggregate(['Directory Prefix'], ['sum'], depth=1)
+        session.aggregate(['Directory Prefix'], ['sum'], depth=2)
+        session.aggregate(['Extension'], ['sum'])
+
+        assert session.prepared == {
+            (('Directory Prefix',), ('sum',)): 'aggregate_0',
+            (('Extension',), ('sum',)): 'aggregate_1',
+        }
+
+
+def test_replace_rebinds_prepared_statements(sample_df):
+    with AnalysisSession(sample_df, copy=True) as session:
+        session.aggregate(['Install'], ['sum'])
+        session.replace(sample_df.assign(Size=sample_df['Size'] * 2))
+        result = session.aggregate(['Install'], ['sum']).set_index('Install')
+
+    assert result.loc['live', 'Total Size'] == 1200
+    with AnalysisSession(sample_df) as session:
+        with pytest.raises(ValueError):
+            session.replace(sample_df)
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.analysis import AnalysisSession, create_grouping_sets_query
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame({
+        'Install': ['live', 'live', 'live', 'beta'],
+        'Extension': ['.pck', '.pck', '.usm', '.pck'],
+        'Size': [100, 100, 200, 50],
+        'Directory': ['audio', 'audio', 'video', 'audio'],
+        'Full Path': ['audio/a.pck', 'audio/b.pck', 'video/c.usm', 'audio/a.pck'],
+        'Allocated Size': [4096, 4096, 0, 4096],
+    })
+
+
+def test_create_grouping_sets_query():
+    query = create_grouping_sets_query(['Extension', 'Directory'], allocated=True, partition_column='Install')
+
+    assert 'GROUP BY GROUPING SETS (("Install", "Extension"), ("Install", "Directory"))' in query
+    assert '"Allocated Proportion"' in query
+
+
+def test_proportions_per_install(sample_df):
+    with AnalysisSession(sample_df) as session:
+        tables = session.proportions(['Extension', 'Directory'])
+
+    ext = tables['Extension'].set_index(['Install', 'Extension'])
+    assert list(tables['Extension'].columns) == ['Install', 'Extension', 'Proportion', 'Allocated Proportion']
+    assert ext.loc[('live', '.pck'), 'Proportion'] == pytest.approx(50.0)
+    assert ext.loc[('live', '.pck'), 'Allocated Proportion'] == pytest.approx(100.0)
+    assert ext.loc[('beta', '.pck'), 'Proportion'] == pytest.approx(100.0)
+    assert tables['Directory'].groupby('Install')['Proportion'].sum().tolist() == pytest.approx([100.0, 100.0])
+
+
+def test_extra_dimensions_share_the_scan(sample_df):
+    df = sample_df.drop(columns=['Install', 'Allocated Size'])
+
+    with AnalysisSession(df) as session:
+        tables = session.proportions(['Extension', 'Directory', 'Full Path'])
+
+    assert set(tables) == {'Extension', 'Directory', 'Full Path'}
+    paths = tables['Full Path'].set_index('Full Path')['Proportion']
+    assert paths['audio/a.pck'] == pytest.approx(150 / 450 * 100)
+    assert tables['Extension']['Proportion'].sum() == pytest.approx(100.0)
+
+
+def test_session_query_reuses_registration(sample_df):
+    with AnalysisSession(sample_df) as session:
+        assert session.query('SELECT COUNT(*) AS n FROM df')['n'].item() == 4
+        assert session.query('SELECT SUM(Size) AS s FROM df')['s'].item() == 450
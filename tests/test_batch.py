@@ -0,0 +1,69 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.batch import (get_install_labels, get_installs_distribution, resolve_install_directories,
+                                     save_installs_to_db)
+
+
+@pytest.fixture
+def installs(tmp_path):
+    """Fixture to create live, beta and archived installs side by side."""
+    sizes = {'live': 100, 'beta': 300, 'archive_2.0': 50}
+    for name, size in sizes.items():
+        install = tmp_path / 'installs' / name
+        (install / 'audio').mkdir(parents=True)
+        (install / 'game.exe').write_bytes(b'e' * size)
+        (install / 'audio' / 'vo.pck').write_bytes(b'a' * size)
+    (tmp_path / 'installs' / 'notes.txt').write_text('not an install')
+    return tmp_path / 'installs'
+
+
+def test_resolve_install_directories_glob(installs):
+    result = resolve_install_directories(str(installs / '*'))
+
+    assert result == sorted(str(installs / name) for name in ('live', 'beta', 'archive_2.0'))
+
+
+def test_resolve_install_directories_list(installs):
+    result = resolve_install_directories([str(installs / 'live'), str(installs / 'b*'), str(installs / 'live')])
+
+    assert result == [str(installs / 'beta'), str(installs / 'live')]
+
+
+def test_get_install_labels():
+    assert get_install_labels(['/games/live', '/games/beta']) == ['live', 'beta']
+    assert get_install_labels(['/a/hsr', '/b/hsr']) == ['/a/hsr', '/b/hsr']
+
+
+def test_get_installs_distribution(installs):
+    df = get_installs_distribution(str(installs / '*'), max_workers=2)
+
+    assert list(df.columns)[:2] == ['Install', 'Extension']
+    assert sorted(df['Install'].unique()) == ['archive_2.0', 'beta', 'live']
+    live = df[df['Install'] == 'live'].set_index('Full Path')
+    assert live.loc[os.path.join('audio', 'vo.pck'), 'Size'] == 100
+
+
+def test_get_installs_distribution_no_match(tmp_path):
+    with pytest.raises(ValueError):
+        get_installs_distribution(str(tmp_path / 'missing*'))
+
+
+def test_save_installs_to_db(installs, tmp_path):
+    df = get_installs_distribution(str(installs / '*'), max_workers=2)
+    db = str(tmp_path / 'installs.db')
+
+    save_installs_to_db(df, db)
+
+    with sqlite3.connect(db) as conn:
+        ext_df = pd.read_sql_query('SELECT * FROM HsrSizeDist', conn)
+        tree_df = pd.read_sql_query('SELECT * FROM HsrDirTree', conn)
+        assert pd.read_sql_query('SELECT COUNT(*) AS n FROM HsrSizeAnalysis', conn)['n'].item() == 6
+
+    # Proportions are taken within each install
+    assert ext_df.groupby('Install')['Proportion'].sum().tolist() == pytest.approx([100.0, 100.0, 100.0])
+    assert ext_df.set_index(['Install', 'Extension']).loc[('beta', '.pck'), 'Proportion'] == pytest.approx(50.0)
+    assert tree_df.set_index('Directory').loc['beta', 'Size'] == 600
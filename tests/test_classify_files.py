@@ -0,0 +1,118 @@
+import json
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.classify import add_category, classify_files, compile_rule, load_rules
+from hsr_size_analyzer.sqlite import analyze_data, save_to_db
+
+
+def path(*parts):
+    return os.sep.join(parts)
+
+
+@pytest.fixture
+def scan_df():
+    return pd.DataFrame({
+        'Extension': ['.pck', '.PCK', '.pck', '.usm', '.block', '.block', '.exe', ''],
+        'Size': [400, 100, 200, 300, 500, 50, 10, 1],
+        'Directory': [
+            path('StarRail_Data', 'StreamingAssets', 'Audio', 'AudioPackage', 'Windows', 'English(US)'),
+            path('StarRail_Data', 'Persistent', 'Audio', 'AudioPackage', 'Windows', 'Japanese'),
+            path('StarRail_Data', 'StreamingAssets', 'Audio', 'AudioPackage', 'Windows', 'SFX'),
+            path('StarRail_Data', 'StreamingAssets', 'Video', 'Windows'),
+            path('StarRail_Data', 'StreamingAssets', 'Asb', 'Windows'),
+            path('StarRail_Data', 'Persistent', 'Asb', 'Windows'),
+            'Root Directory',
+            'Root Directory',
+        ],
+    })
+
+
+@pytest.fixture
+def rules_path(tmp_path):
+    rules_path = tmp_path / 'rules.json'
+    rules_path.write_text(json.dumps({
+        'default': 'Unclassified',
+        'rules': [
+            {'category': 'Voice-over (EN)', 'path': '*AudioPackage/*/English*', 'extensions': ['.pck']},
+            {'category': 'Voice-over (JP)', 'regex': r'.*/audiopackage/[^/]+/japanese', 'extensions': ['.pck']},
+            {'category': 'Persistent cache', 'path': '*/Persistent/*'},
+            {'category': 'Cutscene video', 'extensions': ['.usm']},
+            {'category': 'Audio', 'extensions': ['.pck']},
+            {'category': 'Streaming assets', 'path': '*/StreamingAssets/*'},
+        ],
+    }))
+    return str(rules_path)
+
+
+def test_first_matching_rule_wins(scan_df, rules_path):
+    rules, default = load_rules(rules_path)
+
+    categories = classify_files(scan_df, rules, default)
+
+    assert categories.tolist() == ['Voice-over (EN)', 'Voice-over (JP)', 'Audio', 'Cutscene video',
+                                   'Streaming assets', 'Persistent cache', 'Unclassified', 'Unclassified']
+    assert list(categories.cat.categories) == ['Voice-over (EN)', 'Voice-over (JP)', 'Persistent cache',
+                                               'Cutscene video', 'Audio', 'Streaming assets', 'Unclassified']
+
+
+def test_categorical_columns_give_the_same_labels(scan_df, rules_path):
+    rules, default = load_rules(rules_path)
+    categorical_df = scan_df.astype({'Extension': 'category', 'Directory': 'category'})
+
+    assert classify_files(categorical_df, rules, default).tolist() == classify_files(scan_df, rules, default).tolist()
+
+
+def test_invalid_rules_are_rejected():
+    with pytest.raises(ValueError):
+        compile_rule({'path': '*'})
+    with pytest.raises(ValueError):
+        compile_rule({'category': 'Audio', 'path': '*', 'regex': '.*'})
+    with pytest.raises(ValueError):
+        compile_rule({'category': 'Audio', 'extension': '.pck'})
+
+
+def test_shipped_rules_file_loads():
+    rules, default = load_rules(os.path.join(os.path.dirname(__file__), '..', 'classification_rules.json'))
+
+    assert rules and default == 'Other'
+
+
+def test_shipped_rules_match_files_directly_in_a_folder():
+    rules, default = load_rules(os.path.join(os.path.dirname(__file__), '..', 'classification_rules.json'))
+    df = pd.DataFrame({
+        'Extension': ['.blk', '.blk', '.blk', '.blk'],
+        'Size': [1, 1, 1, 1],
+        'Directory': [path('StarRail_Data', 'StreamingAssets'), path('StarRail_Data', 'StreamingAssets', 'x'),
+                      path('StarRail_Data', 'Persistent'), path('StarRail_Data', 'PersistentCopy')],
+    })
+
+    assert classify_files(df, rules, default).tolist() == ['Streaming assets', 'Streaming assets',
+                                                           'Persistent cache', 'Other']
+
+
+def test_category_proportions(scan_df, rules_path):
+    df = add_category(scan_df, rules_path)
+    assert 'Category' not in scan_df.columns
+
+    file_ext_df, file_dir_df, category_df = analyze_data(df, ['Extension', 'Directory', 'Category'])
+
+    proportions = category_df.set_index('Category')['Proportion']
+    assert proportions['Streaming assets'] == pytest.approx(500 / 1561 * 100)
+    assert proportions.sum() == pytest.approx(100.0)
+    assert len(file_ext_df) == 6 and len(file_dir_df) == 7
+
+
+def test_unclassified_scan_drops_category_table(scan_df, rules_path, tmp_path):
+    db = str(tmp_path / 'results.db')
+    scan_df = scan_df.assign(**{'Full Path': [f'file{i}' for i in range(len(scan_df))]})
+    save_to_db(add_category(scan_df, rules_path), db)
+
+    save_to_db(scan_df, db)
+
+    with sqlite3.connect(db) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert 'HsrSizeAnalysis' in tables and 'HsrCategoryDist' not in tables
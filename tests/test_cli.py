@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import main
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Import time budget of the report command in microseconds. Loading pandas alone takes several times this.
+REPORT_IMPORT_BUDGET_US = 150_000
+HEAVY_MODULES = ('pandas', 'numpy', 'duckdb', 'dotenv')
+
+
+def test_report_summary(db, capsys):
+    assert main.main(['report', '--db', db]) == 0
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ['File', 'Count', 'Total', 'Size', 'Allocated', 'Size']
+    assert lines[2].split() == ['3', '1000', '1000']
+
+
+def test_report_table_as_json(db, capsys):
+    assert main.main(['--db', db, 'report', 'extensions', '--json']) == 0
+
+    rows = json.loads(capsys.readouterr().out)
+    assert [row['Extension'] for row in rows] == ['.pck', '.block']
+    assert 'index' not in rows[0]
+    assert rows[0]['Proportion'] == pytest.approx(65.0)
+
+
+def test_report_limit(db, capsys):
+    assert main.main(['report', 'top-files', '--db', db, '--limit', '2']) == 0
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 4
+    assert 'Audio/v.pck' in lines[2]
+
+
+def test_report_missing_database(tmp_path, capsys):
+    assert main.main(['report', '--db', str(tmp_path / 'missing.db')]) == 1
+    assert 'does not exist' in capsys.readouterr().err
+    assert not (tmp_path / 'missing.db').exists()
+
+
+def test_diff_latest_snapshots(db, capsys):
+    assert main.main(['diff', '--db', db]) == 0
+
+    out = capsys.readouterr().out
+    assert 'Audio/v.pck' in out
+    assert 'added' in out and 'grown' in out
+
+
+def test_analyze_stored_scan_with_rules(db, tmp_path, capsys):
+    rules = tmp_path / 'rules.json'
+    rules.write_text(json.dumps({'rules': [{'category': 'Audio', 'extensions': ['.pck']}], 'default': 'Assets'}))
+
+    assert main.main(['analyze', '--db', db, '--rules', str(rules)]) == 0
+    assert main.main(['report', 'categories', '--db', db, '--json']) == 0
+
+    rows = json.loads(capsys.readouterr().out)
+    assert {row['Category']: row['Proportion'] for row in rows} == pytest.approx({'Audio': 65.0, 'Assets': 35.0})
+
+
+def test_scan_directory(tmp_path, capsys):
+    game_dir = tmp_path / 'game'
+    game_dir.mkdir()
+    (game_dir / 'StarRail.exe').write_bytes(b'x' * 10)
+    db = str(tmp_path / 'scan.db')
+
+    assert main.main(['scan', str(game_dir), '--db', db]) == 0
+    assert main.main(['report', '--db', db, '--json']) == 0
+    assert json.loads(capsys.readouterr().out)[0]['File Count'] == 1
+
+
+def test_report_cold_start_stays_light(db):
+    result = subprocess.run([sys.executable, '-X', 'importtime', 'main.py', 'report', '--db', db],
+                            cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+
+    # Lines are "import time: self | cumulative | name", nested imports indented under the one importing them
+    imports = [line.split('|') for line in result.stderr.splitlines() if line.startswith('import time:')]
+    imports = [(int(cumulative), name) for _, cumulative, name in imports if cumulative.strip().isdigit()]
+    modules = {name.strip().split('.')[0] for _, name in imports}
+    assert not modules & set(HEAVY_MODULES)
+    # The cumulative times of the top-level imports add up to the whole import time
+    total = sum(cumulative for cumulative, name in imports if not name.startswith('  '))
+    assert total < REPORT_IMPORT_BUDGET_US, f'report imports took {total / 1000:.0f} ms'
@@ -0,0 +1,93 @@
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.hsr_size_analyzer import (add_full_path, collect_compact_file_data,
+                                                 create_compact_dataframe, get_file_distribution)
+from hsr_size_analyzer.sqlite import save_to_db
+
+
+@pytest.fixture
+def game_dir(tmp_path):
+    """Fixture to create a small game tree with repeated directories and extensions."""
+    (tmp_path / 'audio').mkdir()
+    (tmp_path / 'video').mkdir()
+    (tmp_path / 'game.exe').write_bytes(b'e' * 5)
+    (tmp_path / 'readme').write_bytes(b'r' * 1)
+    for i in range(3):
+        (tmp_path / 'audio' / f'vo{i}.pck').write_bytes(b'a' * (10 + i))
+    (tmp_path / 'video' / 'intro.usm').write_bytes(b'v' * 30)
+    return str(tmp_path)
+
+
+def test_collect_compact_file_data(game_dir):
+    compact = collect_compact_file_data(game_dir)
+
+    assert compact['directories'] == ['Root Directory', 'audio', 'video']
+    assert compact['extensions'] == ['.exe', 'No extension', '.pck', '.usm']
+    assert compact['dir_ids'].tolist() == [0, 0, 1, 1, 1, 2]
+    assert compact['ext_codes'].tolist() == [0, 1, 2, 2, 2, 3]
+    assert compact['names'] == ['game.exe', 'readme', 'vo0.pck', 'vo1.pck', 'vo2.pck', 'intro.usm']
+    assert compact['sizes'].dtype == np.int64
+    assert compact['sizes'].tolist() == [5, 1, 10, 11, 12, 30]
+
+
+def test_compact_dataframe_matches_full_dataframe(game_dir):
+    compact_df = get_file_distribution(game_dir, compact=True)
+
+    assert isinstance(compact_df['Extension'].dtype, pd.CategoricalDtype)
+    assert isinstance(compact_df['Directory'].dtype, pd.CategoricalDtype)
+    assert 'Full Path' not in compact_df.columns
+
+    full_df = get_file_distribution(game_dir)
+    expanded = add_full_path(compact_df)
+    assert list(expanded.columns) == ['Extension', 'Size', 'Directory', 'Full Path', 'Allocated Size']
+    pd.testing.assert_frame_equal(expanded.astype({'Extension': object, 'Directory': object}), full_df,
+                                  check_dtype=False)
+
+
+def test_add_full_path_with_plain_columns():
+    df = pd.DataFrame({
+        'Extension': ['.txt', '.bin'],
+        'Size': [1, 2],
+        'Directory': ['Root Directory', 'data'],
+        'File Name': ['a.txt', 'b.bin'],
+    })
+
+    result = add_full_path(df)
+
+    assert result['Full Path'].tolist() == ['a.txt', os.path.join('data', 'b.bin')]
+
+
+def test_add_full_path_keeps_full_dataframes():
+    df = pd.DataFrame({'Extension': [], 'Size': [], 'Directory': [], 'Full Path': []})
+
+    assert add_full_path(df) is df
+
+
+def test_empty_compact_dataframe(tmp_path):
+    df = create_compact_dataframe(collect_compact_file_data(str(tmp_path)))
+
+    assert df.empty
+    assert add_full_path(df)['Full Path'].tolist() == []
+
+
+def test_compact_not_supported_with_batches(game_dir):
+    with pytest.raises(ValueError):
+        get_file_distribution(game_dir, batch_size=10, compact=True)
+
+
+def test_save_compact_dataframe(game_dir, tmp_path_factory):
+    db = str(tmp_path_factory.mktemp('db') / 'compact.db')
+    compact_df = get_file_distribution(game_dir, compact=True)
+
+    save_to_db(compact_df, db=db)
+
+    with sqlite3.connect(db) as conn:
+        saved = pd.read_sql_query('SELECT * FROM HsrSizeAnalysis', conn)
+        proportions = pd.read_sql_query('SELECT * FROM HsrSizeDist', conn)
+    assert saved['Full Path'].tolist() == get_file_distribution(game_dir)['Full Path'].tolist()
+    assert proportions['Proportion'].sum() == pytest.approx(100.0)
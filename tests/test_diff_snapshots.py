@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.diff import diff_snapshots
+from hsr_size_analyzer.hsr_size_analyzer import get_file_distribution
+from hsr_size_analyzer.sqlite import save_to_db
+
+
+@pytest.fixture
+def old_df():
+    return pd.DataFrame({
+        'Extension': ['.pck', '.pck', '.usm', '.exe'],
+        'Size': [100, 200, 300, 50],
+        'Directory': ['audio', 'audio', 'video', 'Root Directory'],
+        'Full Path': ['audio/a.pck', 'audio/b.pck', 'video/intro.usm', 'game.exe'],
+    })
+
+
+@pytest.fixture
+def new_df():
+    return pd.DataFrame({
+        'Extension': ['.pck', '.pck', '.exe', '.block'],
+        'Size': [150, 200, 40, 500],
+        'Directory': ['audio', 'audio', 'Root Directory', 'assets'],
+        'Full Path': ['audio/a.pck', 'audio/b.pck', 'game.exe', 'assets/c.block'],
+    })
+
+
+def test_file_deltas(old_df, new_df):
+    file_diff_df, _, _ = diff_snapshots(old_df, new_df)
+
+    by_path = file_diff_df.set_index('Full Path')
+    assert set(by_path.index) == {'audio/a.pck', 'video/intro.usm', 'game.exe', 'assets/c.block'}
+    assert by_path.loc['assets/c.block', 'Status'] == 'added'
+    assert by_path.loc['video/intro.usm', 'Status'] == 'removed'
+    assert by_path.loc['video/intro.usm', 'Delta'] == -300
+    assert by_path.loc['audio/a.pck', 'Status'] == 'grown'
+    assert by_path.loc['game.exe', 'Status'] == 'shrunk'
+    assert pd.isna(by_path.loc['assets/c.block', 'Old Size'])
+    # Largest changes first
+    assert file_diff_df['Full Path'].iloc[0] == 'assets/c.block'
+
+
+def test_directory_and_extension_growth(old_df, new_df):
+    _, dir_diff_df, ext_diff_df = diff_snapshots(old_df, new_df)
+
+    dirs = dir_diff_df.set_index('Directory')
+    assert dirs.loc['audio', 'Delta'] == 50
+    assert dirs.loc['audio', 'Changed Files'] == 1
+    assert dirs.loc['video', 'Removed Files'] == 1
+    assert dirs.loc['assets', 'Added Files'] == 1
+    assert dir_diff_df['Delta'].sum() == new_df['Size'].sum() - old_df['Size'].sum()
+
+    exts = ext_diff_df.set_index('Extension')
+    assert exts.loc['.block', 'Delta'] == 500
+    assert exts.loc['.usm', 'New Size'] == 0
+    assert 'Directory' not in ext_diff_df.columns
+    for group_diff_df in (dir_diff_df, ext_diff_df):
+        assert (group_diff_df[['Old Size', 'New Size', 'Delta']].dtypes == 'int64').all()
+
+
+def test_identical_snapshots(old_df):
+    file_diff_df, dir_diff_df, _ = diff_snapshots(old_df, old_df.copy())
+
+    assert file_diff_df.empty
+    assert (dir_diff_df['Delta'] == 0).all()
+
+
+def test_diff_stored_snapshots(tmp_path):
+    game_dir = tmp_path / 'game'
+    game_dir.mkdir()
+    (game_dir / 'a.bin').write_bytes(b'a' * 10)
+    old_db = str(tmp_path / 'old.db')
+    save_to_db(get_file_distribution(str(game_dir)), old_db)
+    (game_dir / 'a.bin').write_bytes(b'a' * 25)
+    (game_dir / 'b.bin').write_bytes(b'b' * 5)
+
+    file_diff_df, _, ext_diff_df = diff_snapshots(old_db, get_file_distribution(str(game_dir), compact=True))
+
+    assert file_diff_df.set_index('Full Path')['Delta'].to_dict() == {'a.bin': 15, 'b.bin': 5}
+    assert ext_diff_df.set_index('Extension').loc['.bin', 'Delta'] == 20
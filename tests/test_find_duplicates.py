@@ -0,0 +1,102 @@
+import hashlib
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer import duplicates
+from hsr_size_analyzer.duplicates import find_duplicates, hash_file
+from hsr_size_analyzer.hsr_size_analyzer import get_file_distribution
+from hsr_size_analyzer.sqlite import save_to_db
+
+
+@pytest.fixture
+def game_dir(tmp_path_factory):
+    """Fixture to create a tree with duplicated audio files across language folders."""
+    root = tmp_path_factory.mktemp('game')
+    for language in ('en', 'jp', 'cn'):
+        (root / language).mkdir()
+        (root / language / 'shared.wem').write_bytes(b'shared audio' * 100)
+        (root / language / f'voice_{language}.wem').write_bytes(language.encode() * 600)
+    (root / 'empty1').write_bytes(b'')
+    (root / 'empty2').write_bytes(b'')
+    return root
+
+
+def test_find_duplicates(game_dir):
+    df = get_file_distribution(str(game_dir))
+
+    result = find_duplicates(df, str(game_dir))
+
+    assert list(result.columns) == ['Group Id', 'Full Path', 'Size', 'Hash', 'File Count', 'Reclaimable Size']
+    assert sorted(result['Full Path']) == sorted(os.path.join(language, 'shared.wem')
+                                                 for language in ('en', 'jp', 'cn'))
+    assert result['Group Id'].nunique() == 1
+    assert result['File Count'].tolist() == [3, 3, 3]
+    assert result['Reclaimable Size'].sum() == 2 * 1200
+
+
+def test_same_edges_different_middle(tmp_path, monkeypatch):
+    """Files that only differ outside the hashed edges are told apart by the full hash."""
+    monkeypatch.setattr(duplicates, 'EDGE_SIZE', 4)
+    (tmp_path / 'a.bin').write_bytes(b'HEAD' + b'x' * 100 + b'TAIL')
+    (tmp_path / 'b.bin').write_bytes(b'HEAD' + b'y' * 100 + b'TAIL')
+    (tmp_path / 'c.bin').write_bytes(b'HEAD' + b'x' * 100 + b'TAIL')
+
+    result = find_duplicates(get_file_distribution(str(tmp_path)), str(tmp_path))
+
+    assert sorted(result['Full Path']) == ['a.bin', 'c.bin']
+    assert result['Hash'].iloc[0] == hash_file(str(tmp_path / 'a.bin')).hex()
+
+
+def test_no_duplicates(tmp_path):
+    (tmp_path / 'a.bin').write_bytes(b'a')
+    (tmp_path / 'b.bin').write_bytes(b'bb')
+
+    result = find_duplicates(get_file_distribution(str(tmp_path)), str(tmp_path))
+
+    assert result.empty
+
+
+def test_hard_links_are_not_reclaimable(tmp_path):
+    (tmp_path / 'a.bin').write_bytes(b'x' * 100)
+    os.link(tmp_path / 'a.bin', tmp_path / 'b.bin')
+    (tmp_path / 'c.bin').write_bytes(b'x' * 100)
+    (tmp_path / 'd.bin').write_bytes(b'y' * 100)
+    os.link(tmp_path / 'd.bin', tmp_path / 'e.bin')
+
+    result = find_duplicates(get_file_distribution(str(tmp_path)), str(tmp_path))
+
+    # d.bin and e.bin are one file, only the copy in c.bin takes space of its own
+    assert dict(zip(result['Full Path'], result['Reclaimable Size'])) == {'a.bin': 0, 'b.bin': 0, 'c.bin': 100}
+    assert result['File Count'].tolist() == [3, 3, 3]
+
+
+def test_missing_files_are_skipped(game_dir):
+    df = get_file_distribution(str(game_dir))
+    os.remove(game_dir / 'cn' / 'shared.wem')
+
+    result = find_duplicates(df, str(game_dir))
+
+    assert result['File Count'].tolist() == [2, 2]
+
+
+def test_hash_file_matches_hashlib(tmp_path):
+    content = os.urandom(300000)
+    (tmp_path / 'data.bin').write_bytes(content)
+    (tmp_path / 'empty.bin').write_bytes(b'')
+
+    assert hash_file(str(tmp_path / 'data.bin')) == hashlib.blake2b(content, digest_size=16).digest()
+    assert hash_file(str(tmp_path / 'empty.bin')) == hashlib.blake2b(b'', digest_size=16).digest()
+
+
+def test_save_duplicates_table(game_dir, tmp_path):
+    df = get_file_distribution(str(game_dir))
+    db = str(tmp_path / 'duplicates.db')
+
+    save_to_db(df, db, extra_tables={'HsrDuplicates': find_duplicates(df, str(game_dir))})
+
+    with sqlite3.connect(db) as conn:
+        saved = pd.read_sql_query('SELECT * FROM HsrDuplicates', conn)
+    assert len(saved) == 3
@@ -0,0 +1,98 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.fingerprint import ScanFingerprint
+from hsr_size_analyzer.hsr_size_analyzer import get_file_distribution
+from hsr_size_analyzer.sqlite import save_to_db
+
+
+@pytest.fixture
+def game_dir(tmp_path):
+    game_dir = tmp_path / 'game'
+    (game_dir / 'StarRail_Data' / 'Persistent').mkdir(parents=True)
+    (game_dir / 'StarRail_Data' / 'Video').mkdir()
+    (game_dir / 'StarRail.exe').write_bytes(b'x' * 100)
+    (game_dir / 'StarRail_Data' / 'a.block').write_bytes(b'x' * 200)
+    (game_dir / 'StarRail_Data' / 'Persistent' / 'b.block').write_bytes(b'x' * 3000)
+    (game_dir / 'StarRail_Data' / 'Persistent' / 'c.pck').write_bytes(b'x' * 40)
+    (game_dir / 'StarRail_Data' / 'Video' / 'd.usm').write_bytes(b'x' * 500)
+    return game_dir
+
+
+def read_tables(db):
+    tables = {}
+    with sqlite3.connect(db) as conn:
+        for table_name, sort_columns in (('HsrSizeAnalysis', ['Full Path']), ('HsrSizeDist', ['Extension']),
+                                         ('HsrDirDist', ['Directory']), ('HsrDirTree', ['Directory']),
+                                         ('HsrTopFiles', ['Rank']), ('HsrTopDirs', ['Rank']),
+                                         ('HsrSizeHistogram', ['Dimension', 'Value', 'Bucket'])):
+            df = pd.read_sql_query(f'SELECT * FROM "{table_name}"', conn)
+            df = df.drop(columns=['index', 'Id', 'Parent Id'], errors='ignore')
+            tables[table_name] = df.sort_values(sort_columns, ignore_index=True)
+    return tables
+
+
+def test_unchanged_scan_skips_the_analysis(game_dir, tmp_path):
+    db = str(tmp_path / 'cache.db')
+    save_to_db(get_file_distribution(str(game_dir), modified_time=True), db)
+    with sqlite3.connect(db) as conn:
+        conn.execute('DELETE FROM HsrTopFiles')
+
+    save_to_db(get_file_distribution(str(game_dir), modified_time=True), db)
+
+    with sqlite3.connect(db) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM HsrTopFiles').fetchone()[0] == 0
+        assert conn.execute('SELECT COUNT(*) FROM HsrSizeAnalysis').fetchone()[0] == 5
+
+
+def test_changed_directories_update_matches_full_analysis(game_dir, tmp_path):
+    db = str(tmp_path / 'cache.db')
+    save_to_db(get_file_distribution(str(game_dir), modified_time=True), db)
+
+    (game_dir / 'StarRail_Data' / 'Persistent' / 'b.block').write_bytes(b'x' * 7000)
+    os.utime(game_dir / 'StarRail_Data' / 'Persistent' / 'b.block', ns=(1, 1))
+    (game_dir / 'StarRail_Data' / 'Video' / 'd.usm').unlink()
+    (game_dir / 'StarRail_Data' / 'Video').rmdir()
+    (game_dir / 'StarRail_Data' / 'Audio').mkdir()
+    (game_dir / 'StarRail_Data' / 'Audio' / 'e.pck').write_bytes(b'x' * 9)
+    df = get_file_distribution(str(game_dir), modified_time=True)
+    fingerprint = ScanFingerprint.from_dataframe(df)
+    with sqlite3.connect(db) as conn:
+        stored = ScanFingerprint.load(conn)
+    assert fingerprint.compatible(stored) and not fingerprint.matches(stored)
+    assert sorted(fingerprint.changed_directories(stored)) == [os.path.join('StarRail_Data', directory)
+                                                               for directory in ('Audio', 'Persistent', 'Video')]
+
+    save_to_db(df, db)
+    full_db = str(tmp_path / 'full.db')
+    save_to_db(df, full_db)
+
+    updated, full = read_tables(db), read_tables(full_db)
+    for table_name, full_df in full.items():
+        pd.testing.assert_frame_equal(updated[table_name], full_df, check_dtype=False, obj=table_name)
+
+
+def test_fingerprint_includes_columns_and_extra_tables(game_dir):
+    df = get_file_distribution(str(game_dir), modified_time=True)
+    fingerprint = ScanFingerprint.from_dataframe(df)
+
+    assert fingerprint.matches(ScanFingerprint.from_dataframe(df.sample(frac=1, random_state=0)))
+    assert not fingerprint.compatible(ScanFingerprint.from_dataframe(df, ['HsrDuplicates']))
+    assert not fingerprint.compatible(ScanFingerprint.from_dataframe(df.assign(Category='Other')))
+    touched = df.assign(**{'Modified Time': df['Modified Time'].where(df['Extension'] != '.exe', 0)})
+    assert ScanFingerprint.from_dataframe(touched).changed_directories(fingerprint) == ['Root Directory']
+
+
+def test_save_without_modified_time_drops_the_fingerprint(game_dir, tmp_path):
+    db = str(tmp_path / 'cache.db')
+    df = get_file_distribution(str(game_dir), modified_time=True)
+    save_to_db(df, db)
+    save_to_db(df.drop(columns='Modified Time'), db)
+
+    with sqlite3.connect(db) as conn:
+        assert ScanFingerprint.load(conn) is None
+    with pytest.raises(ValueError):
+        get_file_distribution(str(game_dir), compact=True, modified_time=True)
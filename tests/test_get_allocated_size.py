@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from hsr_size_analyzer.hsr_size_analyzer import get_allocated_size, get_file_distribution
+
+
+def make_stat(size, blocks=None, nlink=1, dev=1, ino=1):
+    extra_fields = {} if blocks is None else {'st_blocks': blocks}
+    return os.stat_result((0, ino, dev, nlink, 0, 0, size, 0, 0, 0), extra_fields)
+
+
+def test_allocated_size_uses_blocks():
+    assert get_allocated_size(make_stat(100, blocks=8), set()) == 4096
+
+
+def test_allocated_size_falls_back_to_apparent_size():
+    assert get_allocated_size(make_stat(100), set()) == 100
+
+
+def test_hardlinked_inode_counted_once():
+    seen_inodes = set()
+
+    first = get_allocated_size(make_stat(100, blocks=8, nlink=2, ino=7), seen_inodes)
+    second = get_allocated_size(make_stat(100, blocks=8, nlink=2, ino=7), seen_inodes)
+    other_device = get_allocated_size(make_stat(100, blocks=8, nlink=2, dev=2, ino=7), seen_inodes)
+
+    assert (first, second, other_device) == (4096, 0, 4096)
+
+
+def test_single_link_files_are_not_tracked():
+    seen_inodes = set()
+
+    get_allocated_size(make_stat(100, blocks=8, ino=7), seen_inodes)
+
+    assert seen_inodes == set()
+
+
+@pytest.mark.skipif(not hasattr(os, 'link'), reason='hard links not supported')
+def test_scan_counts_hardlinks_once(tmp_path):
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'a' / 'original.bin').write_bytes(b'x' * 10000)
+    try:
+        os.link(tmp_path / 'a' / 'original.bin', tmp_path / 'link.bin')
+    except OSError:
+        pytest.skip('cannot create hard links')
+
+    df = get_file_distribution(str(tmp_path)).set_index('Full Path')
+
+    assert df['Size'].tolist() == [10000, 10000]
+    allocated = df['Allocated Size']
+    assert sorted(allocated.tolist())[0] == 0
+    assert allocated.sum() == allocated.max() > 0
+
+
+def test_manifest_scan_keeps_allocated_size(tmp_path_factory):
+    game_dir = tmp_path_factory.mktemp('game')
+    (game_dir / 'file.bin').write_bytes(b'x' * 10000)
+    with open(game_dir / 'sparse.bin', 'wb') as f:
+        f.truncate(1024 * 1024)
+    manifest = str(tmp_path_factory.mktemp('db') / 'hsr.manifest.json')
+
+    get_file_distribution(str(game_dir), manifest=manifest)
+    cached = get_file_distribution(str(game_dir), manifest=manifest)
+
+    assert cached.attrs['manifest']['skipped_directories'] == 1
+    assert cached['Allocated Size'].tolist() == get_file_distribution(str(game_dir))['Allocated Size'].tolist()
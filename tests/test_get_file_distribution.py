@@ -1,4 +1,4 @@
-from unittest.mock import patch
+import os
 
 import pandas as pd
 import pytest
@@ -6,47 +6,49 @@ import pytest
 from hsr_size_analyzer.hsr_size_analyzer import get_file_distribution, normalize_directory_path
 
 
-@pytest.fixture
-def mock_walk():
-    return [
-        ('/root', [], ['file1.txt', 'file2.py', 'file3']),
-        ('/root/subdir', [], ['file4.jpg', 'file5.txt']),
-    ]
+def allocated_sizes(root, paths):
+    """Allocated size of each file, as reported by the filesystem."""
+    sizes = []
+    for path in paths:
+        file_stat = os.stat(os.path.join(root, path))
+        blocks = getattr(file_stat, 'st_blocks', None)
+        sizes.append(file_stat.st_size if blocks is None else blocks * 512)
+    return sizes
+
 
 @pytest.fixture
-def mock_getsize():
-    return {
-        '/root/file1.txt': 100,
-        '/root/file2.py': 200,
-        '/root/file3': 150,
-        '/root/subdir/file4.jpg': 300,
-        '/root/subdir/file5.txt': 250,
-    }
+def make_tree(tmp_path):
+    """Fixture to create files with the given sizes under a temporary directory."""
+
+    def _make_tree(files):
+        for relative_path, size in files.items():
+            file_path = tmp_path / relative_path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_bytes(b'x' * size)
+        return str(tmp_path)
+
+    return _make_tree
+
+
+def test_get_file_distribution(make_tree):
+    root = make_tree({
+        'file1.txt': 100,
+        'file2.py': 200,
+        'file3': 150,
+        'subdir/file4.jpg': 300,
+        'subdir/file5.txt': 250,
+    })
 
-@patch('os.walk')
-@patch('os.path.getsize')
-@patch('os.path.join', lambda *args: '/'.join(args))
-def test_get_file_distribution(mock_getsize, mock_walk):
-    mock_walk.return_value = [
-        ('/root', [], ['file1.txt', 'file2.py', 'file3']),
-        ('/root/subdir', [], ['file4.jpg', 'file5.txt']),
-    ]
-    mock_getsize.side_effect = lambda x: {
-        '/root/file1.txt': 100,
-        '/root/file2.py': 200,
-        '/root/file3': 150,
-        '/root/subdir/file4.jpg': 300,
-        '/root/subdir/file5.txt': 250,
-    }.get(x, 0)
-
-    result = get_file_distribution('/root')
+    result = get_file_distribution(root)
 
     expected_data = {
         'Extension': ['.txt', '.py', 'No extension', '.jpg', '.txt'],
         'Size': [100, 200, 150, 300, 250],
         'Directory': ['Root Directory', 'Root Directory', 'Root Directory', 'subdir', 'subdir'],
-        'Full Path': ['file1.txt', 'file2.py', 'file3', 'subdir/file4.jpg', 'subdir/file5.txt']
+        'Full Path': ['file1.txt', 'file2.py', 'file3', os.path.join('subdir', 'file4.jpg'),
+                      os.path.join('subdir', 'file5.txt')]
     }
+    expected_data['Allocated Size'] = allocated_sizes(root, expected_data['Full Path'])
     expected_df = pd.DataFrame(expected_data)
 
     pd.testing.assert_frame_equal(result, expected_df)
@@ -57,56 +59,39 @@ def test_normalize_directory_path():
     assert normalize_directory_path('/home/user//test') == '/home/user/test'
     assert normalize_directory_path('/home/user/test/') == '/home/user/test/'
 
-@patch('os.walk')
-@patch('os.path.getsize')
-@patch('os.path.join', lambda *args: '/'.join(args))
-def test_empty_directory(mock_getsize, mock_walk):
-    mock_walk.return_value = []
-    mock_getsize.return_value = 0
-
-    result = get_file_distribution('/empty')
+def test_empty_directory(tmp_path):
+    result = get_file_distribution(str(tmp_path))
 
     expected_df = pd.DataFrame({
         'Extension': [],
         'Size': [],
         'Directory': [],
-        'Full Path': []
+        'Full Path': [],
+        'Allocated Size': []
     })
 
     pd.testing.assert_frame_equal(result, expected_df)
 
-@patch('os.walk')
-@patch('os.path.getsize')
-@patch('os.path.join', lambda *args: '/'.join(args))
-def test_directory_with_only_subdirectories(mock_getsize, mock_walk):
-    mock_walk.return_value = [
-        ('/root', ['subdir1', 'subdir2'], []),
-        ('/root/subdir1', [], []),
-        ('/root/subdir2', [], []),
-    ]
-    mock_getsize.return_value = 0
+def test_directory_with_only_subdirectories(tmp_path):
+    (tmp_path / 'subdir1').mkdir()
+    (tmp_path / 'subdir2').mkdir()
 
-    result = get_file_distribution('/root')
+    result = get_file_distribution(str(tmp_path))
 
     expected_df = pd.DataFrame({
         'Extension': [],
         'Size': [],
         'Directory': [],
-        'Full Path': []
+        'Full Path': [],
+        'Allocated Size': []
     })
 
     pd.testing.assert_frame_equal(result, expected_df)
 
-@patch('os.walk')
-@patch('os.path.getsize')
-@patch('os.path.join', lambda *args: '/'.join(args))
-def test_directory_with_hidden_files(mock_getsize, mock_walk):
-    mock_walk.return_value = [
-        ('/root', [], ['.hidden1', '.hidden2', 'visible.txt']),
-    ]
-    mock_getsize.side_effect = lambda x: 100 if 'visible' in x else 50
+def test_directory_with_hidden_files(make_tree):
+    root = make_tree({'.hidden1': 50, '.hidden2': 50, 'visible.txt': 100})
 
-    result = get_file_distribution('/root')
+    result = get_file_distribution(root)
 
     expected_data = {
         'Extension': ['No extension', 'No extension', '.txt'],
@@ -114,20 +99,18 @@ def test_directory_with_hidden_files(mock_getsize, mock_walk):
         'Directory': ['Root Directory', 'Root Directory', 'Root Directory'],
         'Full Path': ['.hidden1', '.hidden2', 'visible.txt']
     }
+    expected_data['Allocated Size'] = allocated_sizes(root, expected_data['Full Path'])
     expected_df = pd.DataFrame(expected_data)
 
     pd.testing.assert_frame_equal(result, expected_df)
 
-@patch('os.walk')
-@patch('os.path.getsize')
-@patch('os.path.join', lambda *args: '/'.join(args))
-def test_directory_with_large_files(mock_getsize, mock_walk):
-    mock_walk.return_value = [
-        ('/root', [], ['large1.bin', 'large2.bin']),
-    ]
-    mock_getsize.side_effect = lambda x: 1024 * 1024 * 1024 if 'large1' in x else 2 * 1024 * 1024 * 1024
+def test_directory_with_large_files(tmp_path):
+    # Sparse files keep the test fast while reporting multi-GiB sizes
+    for name, size in [('large1.bin', 1024 * 1024 * 1024), ('large2.bin', 2 * 1024 * 1024 * 1024)]:
+        with open(tmp_path / name, 'wb') as f:
+            f.truncate(size)
 
-    result = get_file_distribution('/root')
+    result = get_file_distribution(str(tmp_path))
 
     expected_data = {
         'Extension': ['.bin', '.bin'],
@@ -135,6 +118,22 @@ def test_directory_with_large_files(mock_getsize, mock_walk):
         'Directory': ['Root Directory', 'Root Directory'],
         'Full Path': ['large1.bin', 'large2.bin']
     }
+    expected_data['Allocated Size'] = allocated_sizes(str(tmp_path), expected_data['Full Path'])
     expected_df = pd.DataFrame(expected_data)
 
-    pd.testing.assert_frame_equal(result, expected_df)
\ No newline at end of file
+    pd.testing.assert_frame_equal(result, expected_df)
+
+def test_directory_with_nested_subdirectories(make_tree):
+    root = make_tree({
+        'a/b/deep.bin': 10,
+        'a/mid.bin': 20,
+        'z.bin': 30,
+    })
+
+    result = get_file_distribution(root)
+
+    # Directories are visited depth-first with sorted names, like a sorted os.walk
+    assert result['Full Path'].tolist() == ['z.bin', os.path.join('a', 'mid.bin'),
+                                            os.path.join('a', 'b', 'deep.bin')]
+    assert result['Directory'].tolist() == ['Root Directory', 'a', os.path.join('a', 'b')]
+    assert result['Size'].tolist() == [30, 20, 10]
@@ -0,0 +1,120 @@
+import os
+import struct
+
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer import pck
+from hsr_size_analyzer.pck import get_pck_cache_path, inspect_pck_files, parse_pck
+
+BLOCK_SIZE = 16
+
+
+def make_pck(path, languages, banks, streams, externals=None, utf16=True, byteorder='<'):
+    """Write a Wwise file package with the given tables followed by zero-filled payloads."""
+    names = b''
+    entries = b''
+    string_start = 4 + len(languages) * 8
+    for language_id, name in languages.items():
+        entries += struct.pack(byteorder + 'II', string_start + len(names), language_id)
+        names += name.encode('utf-16-le' if byteorder == '<' else 'utf-16-be') + b'\0\0' if utf16 \
+            else name.encode('utf-8') + b'\0'
+    language_map = struct.pack(byteorder + 'I', len(languages)) + entries + names
+    language_map += b'\0' * (-len(language_map) % 4)
+
+    tables = []
+    next_block = 0
+    for files, id_format in ((banks, 'I'), (streams, 'I'), (externals, 'Q')):
+        if files is None:
+            continue
+        table = struct.pack(byteorder + 'I', len(files))
+        for file_id, language_id, size in files:
+            table += struct.pack(byteorder + id_format + 'IIII', file_id, BLOCK_SIZE, size, next_block, language_id)
+            next_block += -(-size // BLOCK_SIZE)
+        tables.append(table)
+
+    header_size = 4 + 4 * (1 + len(tables)) + len(language_map) + sum(len(table) for table in tables)
+    header = b'AKPK' + struct.pack(byteorder + 'II', header_size, 1)
+    header += struct.pack(byteorder + 'I' * (1 + len(tables)), len(language_map), *(len(table) for table in tables))
+    header += language_map + b''.join(tables)
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(b'\0' * (next_block * BLOCK_SIZE))
+
+
+@pytest.fixture
+def game_dir(tmp_path):
+    audio = tmp_path / 'audio'
+    audio.mkdir()
+    make_pck(audio / 'en.pck', {0: 'sfx', 1: 'english(us)'},
+             banks=[(100, 0, 40), (101, 1, 24)], streams=[(200, 1, 1000), (201, 1, 500), (202, 0, 64)])
+    make_pck(audio / 'jp.pck', {0: 'sfx', 2: 'japanese'},
+             banks=[(300, 2, 32)], streams=[(400, 2, 700)], externals=[(2 ** 40, 2, 90)], utf16=False)
+    (audio / 'broken.pck').write_bytes(b'RIFF' + b'\0' * 60)
+    return tmp_path
+
+
+@pytest.fixture
+def scan_df():
+    return pd.DataFrame({
+        'Extension': ['.pck', '.pck', '.pck', '.usm'],
+        'Size': [0, 0, 64, 10],
+        'Directory': ['audio', 'audio', 'audio', 'video'],
+        'Full Path': [os.path.join('audio', 'en.pck'), os.path.join('audio', 'jp.pck'),
+                      os.path.join('audio', 'broken.pck'), os.path.join('video', 'a.usm')],
+    })
+
+
+def test_parse_pck(game_dir):
+    parsed = parse_pck(str(game_dir / 'audio' / 'en.pck'))
+
+    assert parsed['languages'] == {0: 'sfx', 1: 'english(us)'}
+    assert [entry[:4] for entry in parsed['files']] == [
+        ['Sound Bank', 100, 0, 40], ['Sound Bank', 101, 1, 24],
+        ['Streamed File', 200, 1, 1000], ['Streamed File', 201, 1, 500], ['Streamed File', 202, 0, 64],
+    ]
+    assert [entry[4] for entry in parsed['files']] == [0, 48, 80, 1088, 1600]
+
+
+def test_parse_pck_with_externals_and_utf8_names(game_dir):
+    parsed = parse_pck(str(game_dir / 'audio' / 'jp.pck'))
+
+    assert parsed['languages'] == {0: 'sfx', 2: 'japanese'}
+    assert parsed['files'][-1][:4] == ['External', 2 ** 40, 2, 90]
+
+
+def test_parse_big_endian_pck(tmp_path):
+    make_pck(tmp_path / 'be.pck', {3: 'korean'}, banks=[(1, 3, 10)], streams=[], byteorder='>')
+
+    parsed = parse_pck(str(tmp_path / 'be.pck'))
+
+    assert parsed['languages'] == {3: 'korean'}
+    assert parsed['files'] == [['Sound Bank', 1, 3, 10, 0]]
+
+
+def test_inspect_pck_files(game_dir, scan_df):
+    languages_df, banks_df = inspect_pck_files(scan_df, str(game_dir))
+
+    languages = languages_df.set_index(['Full Path', 'Section', 'Language'])
+    en = os.path.join('audio', 'en.pck')
+    assert languages.loc[(en, 'Streamed File', 'english(us)'), ['File Count', 'Size']].tolist() == [2, 1500]
+    assert languages.loc[(en, 'Streamed File', 'sfx'), ['File Count', 'Size']].tolist() == [1, 64]
+    assert set(languages_df['Full Path']) == {en, os.path.join('audio', 'jp.pck')}
+    assert banks_df[['File Id', 'Language', 'Size']].values.tolist() == [[100, 'sfx', 40], [101, 'english(us)', 24],
+                                                                         [300, 'japanese', 32]]
+
+
+def test_inspect_pck_files_reuses_cache(game_dir, scan_df, tmp_path, monkeypatch):
+    cache = get_pck_cache_path(str(tmp_path / 'hsr_size_analyzer.db'))
+    first = inspect_pck_files(scan_df, str(game_dir), cache=cache)
+
+    parsed = []
+    original_parse_pck = pck.parse_pck
+    monkeypatch.setattr(pck, 'parse_pck', lambda path: parsed.append(path) or original_parse_pck(path))
+    make_pck(game_dir / 'audio' / 'en.pck', {1: 'english(us)'}, banks=[(100, 1, 8)], streams=[])
+    second = inspect_pck_files(scan_df, str(game_dir), cache=cache)
+
+    # Only the rewritten package and the unreadable one are parsed again
+    assert sorted(os.path.basename(path) for path in parsed) == ['broken.pck', 'en.pck']
+    pd.testing.assert_frame_equal(first[1].iloc[2:].reset_index(drop=True), second[1].iloc[1:].reset_index(drop=True))
+    assert second[1]['Size'].tolist()[0] == 8
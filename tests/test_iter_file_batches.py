@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.hsr_size_analyzer import get_file_distribution
+
+
+@pytest.fixture
+def game_dir(tmp_path):
+    """Fixture to create a tree with 7 files."""
+    for i in range(4):
+        (tmp_path / f'file{i}.txt').write_bytes(b'x' * i)
+    (tmp_path / 'sub').mkdir()
+    for i in range(3):
+        (tmp_path / 'sub' / f'asset{i}.block').write_bytes(b'y' * (10 + i))
+    return str(tmp_path)
+
+
+def test_batches_concatenate_to_the_full_scan(game_dir):
+    batches = list(get_file_distribution(game_dir, batch_size=3))
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    pd.testing.assert_frame_equal(pd.concat(batches), get_file_distribution(game_dir))
+
+
+def test_batch_size_larger_than_scan(game_dir):
+    batches = list(get_file_distribution(game_dir, batch_size=100))
+
+    assert len(batches) == 1
+    assert len(batches[0]) == 7
+
+
+def test_exact_multiple_of_batch_size(game_dir):
+    batches = list(get_file_distribution(game_dir, batch_size=7))
+
+    assert [len(batch) for batch in batches] == [7]
+
+
+def test_empty_directory_yields_one_empty_batch(tmp_path):
+    batches = list(get_file_distribution(str(tmp_path), batch_size=10))
+
+    assert len(batches) == 1
+    assert list(batches[0].columns) == ['Extension', 'Size', 'Directory', 'Full Path', 'Allocated Size']
+    assert batches[0].empty
+
+
+def test_batches_with_manifest(game_dir, tmp_path_factory):
+    manifest = str(tmp_path_factory.mktemp('db') / 'hsr.manifest.json')
+    list(get_file_distribution(game_dir, manifest=manifest, batch_size=2))
+
+    batches = list(get_file_distribution(game_dir, manifest=manifest, batch_size=2))
+
+    pd.testing.assert_frame_equal(pd.concat(batches), get_file_distribution(game_dir))
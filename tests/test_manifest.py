@@ -0,0 +1,90 @@
+import os
+
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.hsr_size_analyzer import get_file_distribution
+from hsr_size_analyzer.manifest import DirectoryManifest, get_manifest_path
+
+
+@pytest.fixture
+def game_dir(tmp_path):
+    """Fixture to create a small game tree."""
+    root = tmp_path / 'game'
+    (root / 'audio' / 'en').mkdir(parents=True)
+    (root / 'video').mkdir()
+    (root / 'game.exe').write_bytes(b'e' * 10)
+    (root / 'audio' / 'en' / 'vo.pck').write_bytes(b'a' * 20)
+    (root / 'video' / 'intro.usm').write_bytes(b'v' * 30)
+    return root
+
+
+@pytest.fixture
+def manifest_path(tmp_path):
+    return str(tmp_path / 'hsr.manifest.json')
+
+
+def test_get_manifest_path():
+    assert get_manifest_path(os.path.join('data', 'hsr_size_analyzer.db')) == \
+        os.path.join('data', 'hsr_size_analyzer.manifest.json')
+
+
+def test_first_scan_rescans_every_directory(game_dir, manifest_path):
+    df = get_file_distribution(str(game_dir), manifest=manifest_path)
+
+    assert os.path.exists(manifest_path)
+    assert df.attrs['manifest'] == {'skipped_directories': 0, 'rescanned_directories': 4}
+    pd.testing.assert_frame_equal(df, get_file_distribution(str(game_dir)))
+
+
+def test_unchanged_tree_reuses_cached_rows(game_dir, manifest_path, caplog):
+    get_file_distribution(str(game_dir), manifest=manifest_path)
+
+    df = get_file_distribution(str(game_dir), manifest=manifest_path)
+
+    assert df.attrs['manifest'] == {'skipped_directories': 4, 'rescanned_directories': 0}
+    assert '4 directories skipped' in caplog.text
+    pd.testing.assert_frame_equal(df, get_file_distribution(str(game_dir)))
+
+
+def test_changed_directory_is_rescanned(game_dir, manifest_path):
+    get_file_distribution(str(game_dir), manifest=manifest_path)
+    (game_dir / 'audio' / 'en' / 'patch.pck').write_bytes(b'p' * 40)
+    # Make sure the directory mtime changes even on coarse-grained filesystems
+    os.utime(game_dir / 'audio' / 'en', ns=(0, 1))
+
+    df = get_file_distribution(str(game_dir), manifest=manifest_path)
+
+    assert df.attrs['manifest'] == {'skipped_directories': 3, 'rescanned_directories': 1}
+    assert os.path.join('audio', 'en', 'patch.pck') in df['Full Path'].tolist()
+    pd.testing.assert_frame_equal(df, get_file_distribution(str(game_dir)))
+
+
+def test_manifest_for_another_root_is_ignored(game_dir, tmp_path, manifest_path):
+    other = tmp_path / 'other'
+    other.mkdir()
+    (other / 'file.txt').write_text('x')
+    get_file_distribution(str(other), manifest=manifest_path)
+
+    df = get_file_distribution(str(game_dir), manifest=manifest_path)
+
+    assert df.attrs['manifest']['skipped_directories'] == 0
+
+
+def test_unreadable_manifest_starts_a_full_scan(game_dir, manifest_path):
+    with open(manifest_path, 'w') as f:
+        f.write('not json')
+
+    manifest = DirectoryManifest(manifest_path)
+    manifest.load()
+    files = list(manifest.walk_files(str(game_dir)))
+
+    assert len(files) == 3
+    assert manifest.rescanned == 4
+
+
+def test_manifest_not_supported_with_parallel_scan(game_dir, manifest_path):
+    with pytest.raises(ValueError):
+        get_file_distribution(str(game_dir), max_workers=4, manifest=manifest_path)
+    with pytest.raises(ValueError):
+        get_file_distribution(str(game_dir), max_workers=4, manifest=manifest_path, batch_size=10)
@@ -0,0 +1,76 @@
+import pytest
+
+from hsr_size_analyzer import parallel_scan
+from hsr_size_analyzer.hsr_size_analyzer import collect_file_data, walk_files
+from hsr_size_analyzer.parallel_scan import parallel_walk_files
+
+
+@pytest.fixture
+def temp_tree(tmp_path):
+    """Fixture to create a tree with one large folder and several small ones."""
+    streaming = tmp_path / 'StarRail_Data' / 'StreamingAssets'
+    streaming.mkdir(parents=True)
+    for i in range(40):
+        (streaming / f'asset{i:02}.block').write_bytes(b'x' * i)
+    for d in range(5):
+        sub_dir = tmp_path / f'dir{d}' / 'nested'
+        sub_dir.mkdir(parents=True)
+        (sub_dir / f'file{d}.txt').write_bytes(b'y' * d)
+        (tmp_path / f'dir{d}' / 'top.bin').write_bytes(b'z' * (d + 1))
+    (tmp_path / 'root.exe').write_bytes(b'r' * 7)
+    return tmp_path
+
+
+def as_rows(files):
+    return [(file_dir, full_path, name, file_stat.st_size) for file_dir, full_path, name, file_stat in files]
+
+
+@pytest.mark.parametrize('max_workers', [1, 2, 8])
+def test_parallel_walk_files_matches_serial_walk(temp_tree, max_workers):
+    expected = as_rows(walk_files(str(temp_tree)))
+
+    result = as_rows(parallel_walk_files(str(temp_tree), max_workers))
+
+    assert result == expected
+
+
+def test_parallel_walk_files_splits_large_directories(temp_tree, monkeypatch):
+    """Large directories are split into stat chunks without changing the output order."""
+    monkeypatch.setattr(parallel_scan, 'SPLIT_THRESHOLD', 3)
+    expected = as_rows(walk_files(str(temp_tree)))
+
+    result = as_rows(parallel_walk_files(str(temp_tree), 4))
+
+    assert result == expected
+
+
+def test_parallel_walk_files_missing_directory(tmp_path):
+    assert list(parallel_walk_files(str(tmp_path / 'missing'), 2)) == []
+
+
+def test_collect_file_data_parallel(temp_tree):
+    assert collect_file_data(str(temp_tree), max_workers=4) == collect_file_data(str(temp_tree))
+
+
+def test_parallel_walk_files_streams_directories(temp_tree, monkeypatch):
+    """Files are yielded before the whole tree is listed, and the buffer limit does not change the output."""
+    listed = []
+    list_directory = parallel_scan.list_directory
+
+    def counting_list_directory(current_dir, prefix):
+        listed.append(prefix)
+        return list_directory(current_dir, prefix)
+
+    monkeypatch.setattr(parallel_scan, 'list_directory', counting_list_directory)
+    monkeypatch.setattr(parallel_scan, 'MAX_BUFFERED_FILES', 1)
+    monkeypatch.setattr(parallel_scan, 'SPLIT_THRESHOLD', 3)
+    expected = as_rows(walk_files(str(temp_tree)))
+
+    files = parallel_walk_files(str(temp_tree), 1)
+    first = next(files)
+
+    assert as_rows([first]) == expected[:1]
+    assert len(listed) < 13
+    assert as_rows([first, *files]) == expected
+    # Every directory is listed once
+    assert sorted(set(listed)) == sorted(listed) and len(listed) == 13
@@ -0,0 +1,124 @@
+import os
+
+import duckdb
+import pandas as pd
+import pytest
+
+import main
+from hsr_size_analyzer.hsr_size_analyzer import get_file_distribution
+from hsr_size_analyzer.parquet import get_next_snapshot, get_parquet_path, get_partition_labels, save_to_parquet
+from hsr_size_analyzer.sqlite import analyze_data
+
+
+@pytest.fixture
+def game_dir(tmp_path):
+    game_dir = tmp_path / 'game'
+    (game_dir / 'StarRail_Data').mkdir(parents=True)
+    (game_dir / 'StarRail.exe').write_bytes(b'x' * 100)
+    (game_dir / 'StarRail_Data' / 'a.block').write_bytes(b'x' * 200)
+    (game_dir / 'StarRail_Data' / 'b.block').write_bytes(b'x' * 300)
+    return game_dir
+
+
+def read_dataset(directory, table_name):
+    path = os.path.join(directory, table_name, '**', '*.parquet')
+    with duckdb.connect() as con:
+        return con.execute(f"SELECT * FROM read_parquet('{path}', hive_partitioning = true)").fetchdf()
+
+
+def test_tables_saved_as_parquet(game_dir, tmp_path):
+    directory = str(tmp_path / 'export')
+    df = get_file_distribution(str(game_dir))
+
+    assert save_to_parquet(df, directory) == 1
+
+    assert sorted(os.listdir(directory)) == ['HsrDirDist', 'HsrDirTree', 'HsrSizeAnalysis', 'HsrSizeDist',
+                                             'HsrSizeHistogram', 'HsrTopDirs', 'HsrTopFiles']
+    saved = read_dataset(directory, 'HsrSizeAnalysis')
+    assert saved['Size'].dtype == 'int64'
+    assert (saved['Snapshot'] == 1).all()
+    pd.testing.assert_frame_equal(saved.drop(columns='Snapshot').sort_values('Full Path', ignore_index=True),
+                                  df.sort_values('Full Path', ignore_index=True))
+
+    file_ext_df, _ = analyze_data(df)
+    saved_ext_df = read_dataset(directory, 'HsrSizeDist').drop(columns='Snapshot')
+    pd.testing.assert_frame_equal(saved_ext_df.sort_values('Extension', ignore_index=True),
+                                  file_ext_df.sort_values('Extension', ignore_index=True))
+
+    with duckdb.connect() as con:
+        encodings = dict(con.execute(
+            f"SELECT path_in_schema, encodings FROM parquet_metadata('{directory}/HsrSizeAnalysis/*/*.parquet')"
+        ).fetchall())
+    assert 'DICTIONARY' in encodings['Extension'] and 'DICTIONARY' in encodings['Directory']
+
+
+def test_each_run_adds_a_snapshot_partition(game_dir, tmp_path):
+    directory = str(tmp_path / 'export')
+    df = get_file_distribution(str(game_dir))
+    assert get_next_snapshot(directory) == 1
+
+    save_to_parquet(df, directory)
+    assert save_to_parquet(df.head(2), directory) == 2
+    # Writing a snapshot again replaces its partition
+    save_to_parquet(df.head(1), directory, snapshot=2)
+
+    saved = read_dataset(directory, 'HsrSizeAnalysis')
+    assert saved.groupby('Snapshot').size().to_dict() == {1: 3, 2: 1}
+    assert get_next_snapshot(directory) == 3
+
+
+def test_installs_are_partitioned(game_dir, tmp_path):
+    directory = str(tmp_path / 'export')
+    df = get_file_distribution(str(game_dir))
+    installs = pd.concat([df.assign(Install='a'), df.assign(Install='b')], ignore_index=True)
+
+    save_to_parquet(installs, directory)
+
+    assert sorted(os.listdir(os.path.join(directory, 'HsrSizeDist', 'Snapshot=1'))) == ['Install=a', 'Install=b']
+    saved = read_dataset(directory, 'HsrSizeDist')
+    assert saved.groupby('Install')['Proportion'].sum().round(6).to_dict() == {'a': 100.0, 'b': 100.0}
+
+
+def test_rewritten_snapshot_drops_stale_partitions(game_dir, tmp_path):
+    directory = str(tmp_path / 'export')
+    df = get_file_distribution(str(game_dir))
+    save_to_parquet(pd.concat([df.assign(Install='a'), df.assign(Install='b')], ignore_index=True), directory)
+    stale_file = os.path.join(directory, 'HsrSizeAnalysis', 'Snapshot=1', 'Install=a', 'data_1.parquet')
+    os.rename(os.path.join(os.path.dirname(stale_file), 'data_0.parquet'), stale_file)
+
+    save_to_parquet(df.assign(Install='a'), directory, snapshot=1)
+
+    assert os.listdir(os.path.join(directory, 'HsrSizeDist', 'Snapshot=1')) == ['Install=a']
+    assert not os.path.exists(stale_file)
+    assert len(read_dataset(directory, 'HsrSizeAnalysis')) == 3
+
+
+def test_install_paths_become_folder_names(game_dir, tmp_path):
+    directory = str(tmp_path / 'export')
+    df = get_file_distribution(str(game_dir))
+    installs = pd.concat([df.assign(Install='D:/Games/HSR/live'), df.assign(Install='E:/HSR/live')],
+                         ignore_index=True)
+
+    save_to_parquet(installs, directory, extra_tables={'HsrDuplicates': installs[['Install', 'Size']]})
+
+    for table_name in ('HsrSizeAnalysis', 'HsrSizeDist', 'HsrDuplicates'):
+        assert sorted(os.listdir(os.path.join(directory, table_name, 'Snapshot=1'))) == \
+            ['Install=D_Games_HSR_live', 'Install=E_HSR_live']
+
+
+def test_partition_labels_stay_unique():
+    labels = get_partition_labels(['live', 'a/b', 'a:b', '..'])
+
+    assert labels['live'] == 'live'
+    assert labels['..'] == '_'
+    assert labels['a/b'] != labels['a:b']
+    assert all(label.startswith('a_b_') for label in (labels['a/b'], labels['a:b']))
+
+
+def test_scan_command_output_format(game_dir, tmp_path):
+    db = str(tmp_path / 'results.db')
+
+    assert main.main(['scan', str(game_dir), '--db', db, '--format', 'parquet']) == 0
+
+    assert not os.path.exists(db)
+    assert len(read_dataset(get_parquet_path(db), 'HsrSizeAnalysis')) == 3
@@ -0,0 +1,93 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.hsr_size_analyzer import get_file_distribution
+from hsr_size_analyzer.metrics import NO_SPAN, RunMetrics, run_metrics, span
+from hsr_size_analyzer.sqlite import save_run_metrics_to_db, save_to_db
+
+
+@pytest.fixture
+def recording():
+    run_metrics.enable()
+    yield run_metrics
+    run_metrics.disable()
+    run_metrics.reset()
+
+
+@pytest.fixture
+def game_dir(tmp_path):
+    (tmp_path / 'StarRail_Data').mkdir()
+    (tmp_path / 'StarRail.exe').write_bytes(b'x' * 100)
+    (tmp_path / 'StarRail_Data' / 'a.block').write_bytes(b'x' * 200)
+    (tmp_path / 'StarRail_Data' / 'b.block').write_bytes(b'x' * 300)
+    return tmp_path
+
+
+def test_disabled_metrics_record_nothing(game_dir):
+    assert span('stage') is NO_SPAN
+
+    df = get_file_distribution(str(game_dir))
+
+    assert len(df) == 3
+    assert run_metrics.spans == []
+
+
+def test_scan_stages_are_timed_and_counted(recording, game_dir):
+    get_file_distribution(str(game_dir))
+
+    df = recording.to_dataframe().set_index('Stage')
+    assert df.loc['get_file_distribution', 'Depth'] == 0
+    assert df.loc['collect_file_data', 'Parent Stage'] == 'get_file_distribution'
+    assert df.loc['create_dataframe', 'Parent Stage'] == 'get_file_distribution'
+    # Counters add up in the enclosing stages
+    for stage in ('get_file_distribution', 'collect_file_data'):
+        assert df.loc[stage, 'Files'] == 3
+        assert df.loc[stage, 'Directories'] == 2
+        assert df.loc[stage, 'Bytes'] == 600
+    assert pd.isna(df.loc['create_dataframe', 'Files'])
+    assert (df['Wall Time'] >= 0).all()
+    assert df.loc['get_file_distribution', 'Wall Time'] >= df.loc['collect_file_data', 'Wall Time']
+
+
+def test_unlistable_directory_is_counted(recording, tmp_path):
+    get_file_distribution(str(tmp_path / 'missing'))
+
+    df = recording.to_dataframe().set_index('Stage')
+    assert df.loc['collect_file_data', 'Scan Errors'] == 1
+
+
+def test_peak_memory_propagates_to_parent():
+    metrics = RunMetrics()
+    metrics.enable(trace_memory=True)
+    try:
+        with metrics.span('outer'):
+            with metrics.span('inner'):
+                data = bytearray(4 * 1024 * 1024)
+            del data
+            with metrics.span('after'):
+                pass
+    finally:
+        metrics.disable()
+
+    df = metrics.to_dataframe().set_index('Stage')
+    assert df.loc['inner', 'Peak Memory'] >= 4 * 1024 * 1024
+    assert df.loc['outer', 'Peak Memory'] >= df.loc['inner', 'Peak Memory']
+    assert df.loc['after', 'Peak Memory'] < 4 * 1024 * 1024
+
+
+def test_run_metrics_saved_next_to_results(recording, game_dir, tmp_path):
+    db = str(tmp_path / 'metrics.db')
+    save_to_db(get_file_distribution(str(game_dir)), db)
+    recording.disable()
+    save_run_metrics_to_db(db)
+
+    with sqlite3.connect(db) as conn:
+        saved = pd.read_sql_query('SELECT * FROM HsrRunMetrics', conn)
+    stages = saved['Stage'].tolist()
+    assert stages[:2] == ['get_file_distribution', 'collect_file_data']
+    assert {'save_to_db', 'analyze_data', 'save_analysis_to_db', 'write_to_sqlite HsrSizeAnalysis'} <= set(stages)
+    rows = saved.set_index('Stage')['Rows']
+    assert rows['write_to_sqlite HsrSizeAnalysis'] == 3
+    assert rows['save_to_db'] >= 3
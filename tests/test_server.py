@@ -0,0 +1,123 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from hsr_size_analyzer.server import create_server, etag_matches
+from hsr_size_analyzer.sqlite import save_to_db
+
+
+@pytest.fixture
+def server(db):
+    server = create_server(db, port=0, check_interval=0)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path, headers=None):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+    try:
+        conn.request('GET', path, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def test_endpoints_serve_the_results(server):
+    status, headers, body = get(server, '/extensions')
+    assert status == 200
+    assert headers['Content-Type'] == 'application/json'
+    extensions = {row['Extension']: row['Proportion'] for row in json.loads(body)}
+    assert extensions == pytest.approx({'.block': 35.0, '.pck': 65.0})
+
+    status, _, body = get(server, '/directories')
+    assert {row['Directory'] for row in json.loads(body)} == {'Asb', 'Audio'}
+
+    status, _, body = get(server, '/top')
+    top = json.loads(body)
+    assert top['files'][0]['Full Path'] == 'Audio/v.pck'
+    assert top['directories'][0]['Directory'] == 'Audio'
+
+
+def test_diff_compares_latest_snapshots(server):
+    status, _, body = get(server, '/diff')
+    diff = json.loads(body)
+
+    assert status == 200
+    assert (diff['old'], diff['new']) == (1, 2)
+    assert {row['Full Path']: row['Status'] for row in diff['files']} == {'Audio/v.pck': 'added',
+                                                                         'Asb/b.block': 'grown'}
+    status, _, body = get(server, '/diff?limit=1')
+    assert len(json.loads(body)['files']) == 1
+    assert get(server, '/diff?old=7')[0] == 404
+    assert get(server, '/diff?limit=x')[0] == 400
+
+
+def test_aggregate_reuses_prepared_statements(server, db, make_scan):
+    status, _, body = get(server, '/aggregate?by=Extension&measures=sum,count')
+    assert status == 200
+    assert {row['Extension']: (row['Total Size'], row['File Count']) for row in json.loads(body)} == \
+        {'.block': (350, 2), '.pck': (650, 1)}
+    session = server.cache.session
+
+    # A new scan is swapped into the same session, and the query runs from its prepared statement again
+    save_to_db(make_scan([100, 250, 9000]), db)
+    server.cache.check()
+    status, _, body = get(server, '/aggregate?measures=sum,count&by=Extension')
+    assert {row['Extension']: row['Total Size'] for row in json.loads(body)} == {'.block': 350, '.pck': 9000}
+    assert server.cache.session is session
+    assert len(session.prepared) == 1
+
+    status, _, body = get(server, '/aggregate?by=Directory Prefix&measures=proportion'.replace(' ', '%20'))
+    assert {row['Directory Prefix'] for row in json.loads(body)} == {'Asb', 'Audio'}
+    assert get(server, '/aggregate?by=Extension&measures=mode')[0] == 400
+    assert get(server, '/aggregate?by=Install')[0] == 400
+
+
+def test_unknown_endpoint(server):
+    status, _, body = get(server, '/nothing')
+    assert status == 404
+    assert 'error' in json.loads(body)
+
+
+def test_etag_revalidation(server, db, make_scan):
+    _, headers, body = get(server, '/top')
+    etag = headers['ETag']
+
+    status, headers, body = get(server, '/top', {'If-None-Match': etag})
+    assert status == 304
+    assert body == b''
+    assert headers['ETag'] == etag
+    assert '/top' in server.cache.responses
+
+    # A new snapshot invalidates the cache, and the changed response gets a new ETag
+    save_to_db(make_scan([100, 250, 9000]), db)
+    status, headers, body = get(server, '/top', {'If-None-Match': etag})
+    assert status == 200
+    assert headers['ETag'] != etag
+    assert json.loads(body)['files'][0]['Size'] == 9000
+
+
+def test_keep_alive_connection_serves_many_requests(server):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+    try:
+        for _ in range(50):
+            conn.request('GET', '/extensions')
+            response = conn.getresponse()
+            response.read()
+            assert response.status == 200
+    finally:
+        conn.close()
+
+
+def test_etag_matches():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches('*', '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
@@ -0,0 +1,87 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.size_trie import SizeTrie, build_size_trie
+from hsr_size_analyzer.sqlite import save_to_db
+
+
+def path(*parts):
+    return os.sep.join(parts)
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame({
+        'Extension': ['.exe', '.pck', '.pck', '.usm', '.block', '.block'],
+        'Size': [10, 100, 50, 200, 30, 20],
+        'Directory': ['Root Directory', path('Data', 'Audio', 'en'), path('Data', 'Audio', 'jp'),
+                      path('Data', 'Video'), path('Data', 'Assets'), path('Data', 'Assets')],
+        'Full Path': ['game.exe', path('Data', 'Audio', 'en', 'a.pck'), path('Data', 'Audio', 'jp', 'b.pck'),
+                      path('Data', 'Video', 'c.usm'), path('Data', 'Assets', 'd.block'),
+                      path('Data', 'Assets', 'e.block')]
+    })
+
+
+def test_subtree_totals(sample_df):
+    trie = build_size_trie(sample_df)
+
+    assert trie.subtree_size('Root Directory') == 410
+    assert trie.subtree_size('Data') == 400
+    assert trie.subtree_size(path('Data', 'Audio')) == 150
+    assert trie.get(path('Data', 'Assets')).file_count == 2
+    assert trie.get('Data').file_count == 5
+    assert trie.subtree_size('Missing') == 0
+    assert trie.get(path('Data', 'Missing')) is None
+
+
+def test_top_children(sample_df):
+    trie = build_size_trie(sample_df)
+
+    top = trie.top_children('Data', 2)
+
+    assert [node.path for node in top] == [path('Data', 'Video'), path('Data', 'Audio')]
+    assert trie.top_children('Missing', 2) == []
+
+
+def test_add_accumulates_into_ancestors():
+    trie = SizeTrie()
+    trie.add(path('a', 'b'), 5)
+    trie.add(path('a', 'b'), 7, file_count=2)
+    trie.add('a', 1)
+
+    assert trie.get('a').size == 13
+    assert trie.get('a').file_count == 4
+    assert trie.get(path('a', 'b')).depth == 2
+
+
+def test_to_dataframe_parent_pointers(sample_df):
+    tree_df = build_size_trie(sample_df).to_dataframe()
+
+    assert list(tree_df.columns) == ['Id', 'Parent Id', 'Name', 'Directory', 'Depth', 'Size', 'File Count',
+                                     'Proportion']
+    by_directory = tree_df.set_index('Directory')
+    assert pd.isna(by_directory.loc['Root Directory', 'Parent Id'])
+    data_id = by_directory.loc['Data', 'Id']
+    assert by_directory.loc[path('Data', 'Audio'), 'Parent Id'] == data_id
+    assert by_directory.loc['Data', 'Proportion'] == pytest.approx(400 / 410 * 100)
+    # Parents are listed before their children
+    assert (tree_df['Parent Id'].dropna() < tree_df['Id'][tree_df['Parent Id'].notna()]).all()
+
+
+def test_depth_limited_rollup(sample_df):
+    tree_df = build_size_trie(sample_df).to_dataframe(max_depth=1)
+
+    assert tree_df['Directory'].tolist() == ['Root Directory', 'Data']
+
+
+def test_save_to_db_writes_dir_tree(sample_df, tmp_path):
+    db = str(tmp_path / 'tree.db')
+
+    save_to_db(sample_df, db=db)
+
+    with sqlite3.connect(db) as conn:
+        tree_df = pd.read_sql_query('SELECT * FROM HsrDirTree', conn)
+    assert tree_df.loc[tree_df['Directory'] == 'Data', 'Size'].item() == 400
@@ -0,0 +1,90 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.history import load_history_snapshot, save_snapshot_to_db
+
+
+def scan(files):
+    return pd.DataFrame({
+        'Extension': ['.' + path.rsplit('.', 1)[1] for path in files],
+        'Size': list(files.values()),
+        'Directory': [path.rsplit('/', 1)[0] for path in files],
+        'Full Path': list(files),
+        'Allocated Size': [(size + 4095) // 4096 * 4096 for size in files.values()],
+    })
+
+
+@pytest.fixture
+def scans():
+    return [
+        scan({'audio/a.pck': 100, 'audio/b.pck': 200, 'video/c.usm': 300}),
+        scan({'audio/a.pck': 100, 'audio/b.pck': 250, 'video/c.usm': 300, 'video/d.usm': 400}),
+        scan({'audio/a.pck': 100, 'video/c.usm': 300, 'video/d.usm': 400}),
+    ]
+
+
+def count_rows(db, table):
+    with sqlite3.connect(db) as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_each_snapshot_is_rebuilt(scans, tmp_path):
+    db = str(tmp_path / 'history.db')
+
+    snapshot_ids = [save_snapshot_to_db(df, db) for df in scans]
+
+    assert snapshot_ids == [1, 2, 3]
+    for snapshot_id, df in zip(snapshot_ids, scans):
+        snapshot = load_history_snapshot(db, snapshot_id).sort_values('Full Path', ignore_index=True)
+        expected = df.sort_values('Full Path', ignore_index=True)
+        pd.testing.assert_frame_equal(snapshot, expected[snapshot.columns])
+
+
+def test_unchanged_files_are_not_duplicated(scans, tmp_path):
+    db = str(tmp_path / 'history.db')
+
+    for df in scans:
+        save_snapshot_to_db(df, db)
+    save_snapshot_to_db(scans[-1], db)
+
+    # 3 files, then the grown b.pck and the new d.usm, then nothing new
+    assert count_rows(db, 'HsrFileHistory') == 5
+    with sqlite3.connect(db) as conn:
+        totals = conn.execute('SELECT "File Count", "Total Size" FROM HsrSnapshots ORDER BY "Snapshot Id"').fetchall()
+    assert totals == [(3, 600), (4, 1050), (3, 800), (3, 800)]
+
+
+def test_retention_compacts_old_snapshots(scans, tmp_path):
+    db = str(tmp_path / 'history.db')
+
+    for df in scans:
+        save_snapshot_to_db(df, db, retention=2)
+
+    with sqlite3.connect(db) as conn:
+        snapshot_ids = [row[0] for row in conn.execute('SELECT "Snapshot Id" FROM HsrSnapshots')]
+    assert snapshot_ids == [2, 3]
+    # The 200 byte version of b.pck was only part of snapshot 1
+    assert count_rows(db, 'HsrFileHistory') == 4
+    snapshot = load_history_snapshot(db, 2).sort_values('Full Path', ignore_index=True)
+    assert snapshot['Size'].tolist() == [100, 250, 300, 400]
+    assert load_history_snapshot(db)['Full Path'].sort_values().tolist() == ['audio/a.pck', 'video/c.usm',
+                                                                             'video/d.usm']
+
+
+def test_scan_without_allocated_size(tmp_path):
+    db = str(tmp_path / 'history.db')
+    df = scan({'audio/a.pck': 100}).drop(columns='Allocated Size')
+
+    save_snapshot_to_db(df, db)
+    save_snapshot_to_db(df, db)
+
+    assert count_rows(db, 'HsrFileHistory') == 1
+
+
+def test_installs_are_rejected(scans, tmp_path):
+    installs = pd.concat([scans[0].assign(Install='live'), scans[0].assign(Install='beta')], ignore_index=True)
+
+    with pytest.raises(ValueError):
+        save_snapshot_to_db(installs, str(tmp_path / 'history.db'))
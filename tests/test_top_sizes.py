@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer.top_n import TopN, TopSizes, find_top_sizes
+
+
+@pytest.fixture
+def scan_df():
+    # Files of a directory arrive together, as the scanners yield them
+    rng = np.random.default_rng(0)
+    directories = np.repeat([f'dir{i}' for i in range(50)], 20)
+    names = [f'file{i}.dat' for i in range(len(directories))]
+    return pd.DataFrame({
+        'Extension': '.dat',
+        'Size': rng.permutation(len(directories)) * 10,
+        'Directory': directories,
+        'Full Path': [os.path.join(d, n) for d, n in zip(directories, names)],
+    })
+
+
+def test_top_n_keeps_largest():
+    top = TopN(3)
+    for size, item in [(5, 'a'), (1, 'b'), (9, 'c'), (7, 'd'), (5, 'e')]:
+        top.push(size, item)
+
+    assert top.largest() == [(9, 'c'), (7, 'd'), (5, 'a')]
+
+
+def test_find_top_sizes_matches_sort(scan_df):
+    top_files, top_dirs = find_top_sizes(scan_df, n=10)
+
+    expected_files = scan_df.sort_values('Size', ascending=False).head(10)
+    expected_dirs = scan_df.groupby('Directory')['Size'].sum().sort_values(ascending=False).head(10)
+    assert top_files['Rank'].tolist() == list(range(1, 11))
+    assert top_files['Full Path'].tolist() == expected_files['Full Path'].tolist()
+    assert top_dirs['Directory'].tolist() == expected_dirs.index.tolist()
+    assert top_dirs['Size'].tolist() == expected_dirs.tolist()
+    assert top_dirs['File Count'].tolist() == [20] * 10
+
+
+@pytest.mark.parametrize('batch_size', [1, 7, 20, 333])
+def test_streamed_batches_match_whole_dataframe(scan_df, batch_size):
+    top_sizes = TopSizes(10)
+    for start in range(0, len(scan_df), batch_size):
+        top_sizes.add_dataframe(scan_df.iloc[start:start + batch_size])
+
+    streamed_files, streamed_dirs = top_sizes.to_dataframes()
+    top_files, top_dirs = find_top_sizes(scan_df, n=10)
+    pd.testing.assert_frame_equal(streamed_files, top_files)
+    pd.testing.assert_frame_equal(streamed_dirs, top_dirs)
+
+
+def test_streamed_directories_keep_constant_state(scan_df):
+    top_sizes = TopSizes(5)
+    for start in range(0, len(scan_df), 30):
+        top_sizes.add_dataframe(scan_df.iloc[start:start + 30])
+        # Only the n largest complete directories and the one still being read are kept
+        assert len(top_sizes.directories.heap) <= 5
+        assert top_sizes.open_directory[0] == (scan_df['Directory'].iloc[min(start + 29, len(scan_df) - 1)],)
+
+
+def test_compact_dataframe_gets_full_path():
+    df = pd.DataFrame({
+        'Extension': pd.Categorical(['.pck', '.usm']),
+        'Size': [10, 20],
+        'Directory': pd.Categorical(['Root Directory', 'video']),
+        'File Name': ['a.pck', 'b.usm'],
+    })
+
+    top_files, _ = find_top_sizes(df)
+
+    assert top_files['Full Path'].tolist() == [os.path.join('video', 'b.usm'), 'a.pck']
+
+
+def test_installs_are_kept_apart():
+    df = pd.DataFrame({
+        'Install': ['live', 'live', 'beta'],
+        'Extension': ['.pck', '.pck', '.pck'],
+        'Size': [10, 20, 25],
+        'Directory': ['audio', 'audio', 'audio'],
+        'Full Path': ['audio/a.pck', 'audio/b.pck', 'audio/a.pck'],
+    })
+
+    top_files, top_dirs = find_top_sizes(df)
+
+    assert list(top_files.columns) == ['Rank', 'Install', 'Full Path', 'Directory', 'Extension', 'Size']
+    assert top_dirs[['Install', 'Size', 'File Count']].values.tolist() == [['live', 30, 2], ['beta', 25, 1]]
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from hsr_size_analyzer.hsr_size_analyzer import walk_files
+
+
+@pytest.fixture
+def temp_tree(tmp_path):
+    """Fixture to create a small nested directory tree."""
+    (tmp_path / 'b' / 'c').mkdir(parents=True)
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'root.txt').write_text('root')
+    (tmp_path / 'a' / 'one.bin').write_bytes(b'1' * 10)
+    (tmp_path / 'b' / 'two.bin').write_bytes(b'2' * 20)
+    (tmp_path / 'b' / 'c' / 'three.bin').write_bytes(b'3' * 30)
+    return tmp_path
+
+
+def test_walk_files_matches_os_walk(temp_tree):
+    """walk_files should report the same files as os.walk with relpath and getsize."""
+    expected = set()
+    for root, _, files in os.walk(temp_tree):
+        for file in files:
+            file_path = os.path.join(root, file)
+            relative_dir = os.path.relpath(root, temp_tree)
+            expected.add((
+                'Root Directory' if relative_dir == '.' else relative_dir,
+                os.path.relpath(file_path, temp_tree),
+                file,
+                os.path.getsize(file_path),
+            ))
+
+    result = {(file_dir, full_path, name, file_stat.st_size)
+              for file_dir, full_path, name, file_stat in walk_files(str(temp_tree))}
+
+    assert result == expected
+
+
+def test_walk_files_depth_first_order(temp_tree):
+    """Files are yielded depth-first with sorted names."""
+    paths = [full_path for _, full_path, _, _ in walk_files(str(temp_tree))]
+
+    assert paths == [
+        'root.txt',
+        os.path.join('a', 'one.bin'),
+        os.path.join('b', 'two.bin'),
+        os.path.join('b', 'c', 'three.bin'),
+    ]
+
+
+def test_walk_files_missing_directory(tmp_path):
+    """A directory that cannot be listed is skipped like os.walk does."""
+    assert list(walk_files(str(tmp_path / 'missing'))) == []
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='symlinks not supported')
+def test_walk_files_does_not_follow_directory_symlinks(temp_tree):
+    try:
+        os.symlink(temp_tree / 'b', temp_tree / 'link', target_is_directory=True)
+    except OSError:
+        pytest.skip('cannot create symlinks')
+
+    paths = [full_path for _, full_path, _, _ in walk_files(str(temp_tree))]
+
+    assert not any(path.startswith('link') for path in paths)
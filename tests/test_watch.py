@@ -0,0 +1,154 @@
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from hsr_size_analyzer import watch
+from hsr_size_analyzer.hsr_size_analyzer import get_file_distribution
+from hsr_size_analyzer.size_trie import build_size_trie
+from hsr_size_analyzer.top_n import find_top_sizes
+from hsr_size_analyzer.watch import DirectoryWatcher, watch_directory
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='inotify is Linux only')
+
+
+@pytest.fixture
+def game_dir(tmp_path):
+    game_dir = tmp_path / 'game'
+    (game_dir / 'StarRail_Data' / 'Asb').mkdir(parents=True)
+    (game_dir / 'StarRail.exe').write_bytes(b'x' * 100)
+    for i in range(5):
+        (game_dir / 'StarRail_Data' / 'Asb' / f'{i}.block').write_bytes(b'x' * 1000)
+    return game_dir
+
+
+@pytest.fixture
+def watcher(game_dir, tmp_path):
+    watcher = DirectoryWatcher(str(game_dir), str(tmp_path / 'watch.db'), interval=0.1)
+    watcher.start()
+    yield watcher
+    watcher.close()
+
+
+def poll_all(watcher):
+    # Read until the queue stays empty, events of one change can arrive in several reads
+    while watcher.poll(0.2):
+        pass
+
+
+def read_table(db, table):
+    with sqlite3.connect(db) as conn:
+        return pd.read_sql_query(f'SELECT * FROM {table}', conn)
+
+
+def assert_matches_full_scan(watcher):
+    expected = get_file_distribution(watcher.directory)
+    saved = read_table(watcher.db, 'HsrSizeAnalysis').drop(columns='index')
+    columns = ['Full Path', 'Extension', 'Directory', 'Size', 'Allocated Size']
+    pd.testing.assert_frame_equal(saved[columns].sort_values('Full Path').reset_index(drop=True),
+                                  expected[columns].sort_values('Full Path').reset_index(drop=True),
+                                  check_dtype=False)
+
+    size_dist = read_table(watcher.db, 'HsrSizeDist').set_index('Extension')['Proportion']
+    totals = expected.groupby('Extension')['Size'].sum()
+    pd.testing.assert_series_equal(size_dist.sort_index(), (totals / totals.sum() * 100).sort_index(),
+                                   check_names=False)
+
+    # Which of several equally large files make the top list may differ, their sizes may not
+    top_files_df, top_dirs_df = find_top_sizes(expected)
+    assert read_table(watcher.db, 'HsrTopFiles')['Size'].tolist() == top_files_df['Size'].tolist()
+    for table, expected_df in (('HsrTopDirs', top_dirs_df), ('HsrDirTree', build_size_trie(expected).to_dataframe())):
+        saved = read_table(watcher.db, table).drop(columns='Rank', errors='ignore')
+        expected_df = expected_df.drop(columns='Rank', errors='ignore')
+        pd.testing.assert_frame_equal(saved.sort_values(list(saved.columns), ignore_index=True),
+                                      expected_df.sort_values(list(expected_df.columns), ignore_index=True),
+                                      check_dtype=False)
+
+
+def test_create_modify_delete_and_move_are_applied(watcher, game_dir):
+    asb = game_dir / 'StarRail_Data' / 'Asb'
+    (asb / 'new.block').write_bytes(b'x' * 500)
+    (asb / '0.block').write_bytes(b'x' * 3000)
+    (asb / '1.block').unlink()
+    (asb / '2.block').rename(game_dir / 'moved.pck')
+    poll_all(watcher)
+
+    assert watcher.flush() > 0
+    assert_matches_full_scan(watcher)
+
+
+def test_failed_flush_is_rewritten(watcher, game_dir, monkeypatch):
+    (game_dir / 'new.pck').write_bytes(b'x' * 500)
+    poll_all(watcher)
+    with monkeypatch.context() as patch:
+        patch.setattr(watch, 'write_to_sqlite', lambda *args, **kwargs: 1 / 0)
+        assert watcher.flush() == 0
+    assert watcher.stale
+
+    assert watcher.flush() == 7
+    assert not watcher.stale
+    assert_matches_full_scan(watcher)
+
+
+def test_new_and_moved_directories_are_watched(watcher, game_dir):
+    audio = game_dir / 'StarRail_Data' / 'Audio' / 'English(US)'
+    audio.mkdir(parents=True)
+    (audio / 'voice.pck').write_bytes(b'x' * 700)
+    poll_all(watcher)
+    watcher.flush()
+
+    # Files created in the new directory after the first flush are seen through its watch
+    (audio / 'later.pck').write_bytes(b'x' * 10)
+    (game_dir / 'StarRail_Data' / 'Asb').rename(game_dir / 'Asb')
+    poll_all(watcher)
+    watcher.flush()
+    assert_matches_full_scan(watcher)
+
+    shutil.rmtree(game_dir / 'Asb')
+    poll_all(watcher)
+    watcher.flush()
+    assert_matches_full_scan(watcher)
+
+
+def test_many_changes_are_coalesced(watcher, game_dir):
+    asb = game_dir / 'StarRail_Data' / 'Asb'
+    for i in range(200):
+        path = asb / f'patch{i}.block'
+        path.write_bytes(b'x')
+        path.write_bytes(b'x' * 20)
+    poll_all(watcher)
+
+    # One flush writes every file once, in one transaction
+    assert len(watcher.dirty) == 200
+    assert watcher.flush() == 200
+    assert watcher.flush() == 0
+    assert_matches_full_scan(watcher)
+
+
+def test_watch_directory_stops(game_dir, tmp_path):
+    db = str(tmp_path / 'run.db')
+    stop = threading.Event()
+    thread = threading.Thread(target=watch_directory, args=(str(game_dir), db, 0.1, stop))
+    thread.start()
+    try:
+        deadline = time.monotonic() + 10
+        while not os.path.exists(db) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.3)
+        (game_dir / 'late.json').write_bytes(b'{}')
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            if 'late.json' in read_table(db, 'HsrSizeAnalysis')['Full Path'].tolist():
+                break
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        thread.join(10)
+
+    assert not thread.is_alive()
+    assert 'late.json' in read_table(db, 'HsrSizeAnalysis')['Full Path'].tolist()